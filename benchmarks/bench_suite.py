@@ -0,0 +1,36 @@
+"""
+Cases of benchmarks.suite for pytest-benchmark, every round runs "number"
+operations in the event loop (so loop overhead isn't measured per call):
+
+    pytest benchmarks/bench_suite.py --benchmark-json results.json
+"""
+
+import asyncio
+
+import pytest
+
+from benchmarks.suite import CASES, prepare
+
+pytest.importorskip('pytest_benchmark')
+
+
+@pytest.mark.parametrize('name', list(CASES))
+def test_benchmark(benchmark, name):
+    case = CASES[name]
+    loop = asyncio.new_event_loop()
+    try:
+        try:
+            operation = loop.run_until_complete(prepare(case))
+        except ImportError as error:
+            pytest.skip(f'{error.name} is not installed')
+
+        async def run_round():
+            for _ in range(case.number):
+                result = operation()
+                if asyncio.iscoroutine(result):
+                    await result
+
+        benchmark.extra_info['operations_per_round'] = case.number
+        benchmark.pedantic(lambda: loop.run_until_complete(run_round()), rounds=5)
+    finally:
+        loop.close()
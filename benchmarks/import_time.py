@@ -0,0 +1,44 @@
+"""
+Measures time of "import mongomock_motor" in fresh interpreters and lists
+heavy optional modules that got imported along with it.
+
+    python -m benchmarks.import_time [runs]
+"""
+
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ('motor', 'gridfs', 'beanie', 'numpy')
+
+SCRIPT = f"""
+import sys, time
+started = time.perf_counter()
+import mongomock_motor
+elapsed = time.perf_counter() - started
+loaded = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+print(elapsed, ','.join(loaded))
+"""
+
+
+def measure(runs: int):
+    timings = []
+    loaded = ''
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', SCRIPT], text=True)
+        elapsed, loaded = output.split(' ')
+        timings.append(float(elapsed))
+    return timings, loaded.strip()
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    timings, loaded = measure(runs)
+    print(f'import mongomock_motor ({runs} runs)')
+    print(f'  min:    {min(timings) * 1000:.1f} ms')
+    print(f'  median: {statistics.median(timings) * 1000:.1f} ms')
+    print(f'  heavy modules imported: {loaded or "none"}')
+
+
+if __name__ == '__main__':
+    main()
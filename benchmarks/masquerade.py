@@ -0,0 +1,68 @@
+"""
+Compares cost of isinstance checks and attribute access on masqueraded
+mocks with the previous masquerading: "__class__" property defined in
+Python and every attribute of wrapped object looked up via "__getattr__".
+
+    python -m benchmarks.masquerade [number]
+"""
+
+import sys
+import timeit
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from mongomock_motor import AsyncMongoMockClient
+
+
+def previous_masquerade_class(target):
+    def decorator(cls):
+        class Wrapper(cls):
+            @property
+            def __class__(self):
+                return target
+
+        Wrapper.__name__ = Wrapper.__qualname__ = target.__name__
+        return Wrapper
+
+    return decorator
+
+
+@previous_masquerade_class(AsyncIOMotorCollection)
+class PreviousCollection:
+    def __init__(self, collection):
+        self.__collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self.__collection, name)
+
+
+CASES = {
+    'isinstance(motor class)': 'isinstance(c, AsyncIOMotorCollection)',
+    'isinstance(other class)': 'isinstance(c, dict)',
+    '__class__': 'c.__class__',
+    'delegated property': 'c.name',
+    'delegated method': 'c.find_raw_batches',
+}
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    current = AsyncMongoMockClient()['db']['collection']
+    previous = PreviousCollection(current.database.delegate['collection'])
+
+    print(f'{"operation":<26}{"previous":>12}{"current":>12}')
+    for title, statement in CASES.items():
+        timings = []
+        for collection in (previous, current):
+            namespace = {
+                'c': collection,
+                'AsyncIOMotorCollection': AsyncIOMotorCollection,
+            }
+            timer = timeit.Timer(statement, globals=namespace)
+            timings.append(min(timer.repeat(5, number)) / number * 1e9)
+        print(f'{title:<26}{timings[0]:>9.1f} ns{timings[1]:>9.1f} ns')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,378 @@
+"""
+Benchmarks of wrapper overhead and hot paths of the engine, results can be
+saved as JSON and compared with results of another run (e.g. of previous
+release) to spot regressions.
+
+    python -m benchmarks.suite [--number-scale 0.1] [--filter find_one]
+        [--json results.json] [--compare previous.json]
+
+Same cases run with pytest-benchmark:
+
+    pytest benchmarks/bench_suite.py --benchmark-json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from importlib import metadata
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from mongomock_motor import AsyncMongoMockClient
+
+DOCUMENTS_COUNT = 10_000
+CURSOR_SIZE = 1000
+
+
+class Case(NamedTuple):
+    name: str
+    setup: Callable[[AsyncMongoMockClient], Awaitable[Callable[[], Any]]]
+    number: int
+
+
+CASES: Dict[str, Case] = {}
+
+
+def case(name: str, number: int):
+    """
+    Registers benchmark case, decorated function prepares data and returns
+    the operation to measure (either sync or async function).
+    """
+
+    def decorator(setup):
+        CASES[name] = Case(name, setup, number)
+        return setup
+
+    return decorator
+
+
+async def _make_collection(client: AsyncMongoMockClient, name: str, *indexes: str):
+    collection = client['benchmarks'][name]
+    for index in indexes:
+        await collection.create_index(index)
+    await collection.insert_many(
+        [
+            {'_id': i, 'key': f'key{i}', 'group': i % 100, 'value': i}
+            for i in range(DOCUMENTS_COUNT)
+        ]
+    )
+    return collection
+
+
+@case('insert_one', number=5000)
+async def insert_one(client):
+    collection = client['benchmarks']['insert_one']
+
+    async def run():
+        await collection.insert_one({'value': 1})
+
+    return run
+
+
+@case('insert_many(100)', number=100)
+async def insert_many(client):
+    collection = client['benchmarks']['insert_many']
+
+    async def run():
+        await collection.insert_many([{'value': i} for i in range(100)])
+
+    return run
+
+
+@case('insert_one(unique index)', number=5000)
+async def insert_one_unique(client):
+    collection = client['benchmarks']['insert_one_unique']
+    await collection.create_index('key', unique=True)
+    keys = iter(range(sys.maxsize))
+
+    async def run():
+        await collection.insert_one({'key': next(keys)})
+
+    return run
+
+
+@case('find_one(_id)', number=5000)
+async def find_one_by_id(client):
+    collection = await _make_collection(client, 'find_one_by_id')
+
+    async def run():
+        await collection.find_one({'_id': 5000})
+
+    return run
+
+
+@case('find_one(_id) raw mongomock', number=5000)
+async def find_one_by_id_raw(client):
+    collection = await _make_collection(client, 'find_one_by_id_raw')
+    raw = collection.database.delegate[collection.name]
+
+    def run():
+        raw.find_one({'_id': 5000})
+
+    return run
+
+
+@case('find_one(indexed field)', number=5000)
+async def find_one_by_indexed_field(client):
+    collection = await _make_collection(client, 'find_one_by_key', 'key')
+
+    async def run():
+        await collection.find_one({'key': 'key5000'})
+
+    return run
+
+
+@case(f'async for({CURSOR_SIZE})', number=20)
+async def cursor_async_for(client):
+    collection = await _make_collection(client, 'cursor_async_for')
+
+    async def run():
+        async for _ in collection.find().limit(CURSOR_SIZE):
+            pass
+
+    return run
+
+
+@case(f'to_list({CURSOR_SIZE})', number=20)
+async def cursor_to_list(client):
+    collection = await _make_collection(client, 'cursor_to_list')
+
+    async def run():
+        await collection.find().limit(CURSOR_SIZE).to_list(None)
+
+    return run
+
+
+@case('aggregate($match, $group, $sort)', number=10)
+async def aggregate(client):
+    collection = await _make_collection(client, 'aggregate')
+    pipeline = [
+        {'$match': {'value': {'$gte': 1000}}},
+        {'$group': {'_id': '$group', 'total': {'$sum': '$value'}}},
+        {'$sort': {'total': -1}},
+    ]
+
+    async def run():
+        await collection.aggregate(pipeline).to_list(None)
+
+    return run
+
+
+@case('aggregate($group)', number=10)
+async def aggregate_group(client):
+    collection = await _make_collection(client, 'aggregate_group')
+    pipeline = [{'$group': {'_id': '$group', 'total': {'$sum': '$value'}}}]
+
+    async def run():
+        await collection.aggregate(pipeline).to_list(None)
+
+    return run
+
+
+@case('update_many(100)', number=100)
+async def update_many(client):
+    collection = await _make_collection(client, 'update_many', 'group')
+
+    async def run():
+        await collection.update_many({'group': 7}, {'$inc': {'value': 1}})
+
+    return run
+
+
+@case('attribute of wrapper', number=200_000)
+async def wrapper_attribute(client):
+    collection = client['benchmarks']['attribute']
+
+    def run():
+        collection.full_name
+
+    return run
+
+
+@case('attribute raw mongomock', number=200_000)
+async def raw_attribute(client):
+    collection = client['benchmarks'].delegate['attribute']
+
+    def run():
+        collection.full_name
+
+    return run
+
+
+@case('async method of wrapper', number=20_000)
+async def wrapper_method(client):
+    collection = client['benchmarks']['method']
+
+    async def run():
+        await collection.estimated_document_count()
+
+    return run
+
+
+@case('method raw mongomock', number=20_000)
+async def raw_method(client):
+    collection = await _make_collection(client, 'method')
+    raw = collection.database.delegate[collection.name]
+    await collection.estimated_document_count()
+
+    def run():
+        raw.estimated_document_count()
+
+    return run
+
+
+@case('beanie insert + find_one', number=1000)
+async def beanie_round_trip(client):
+    from beanie import Document, init_beanie
+
+    class Item(Document):
+        key: str
+        value: int
+
+    await init_beanie(database=client['beanie'], document_models=[Item])
+    keys = iter(range(sys.maxsize))
+
+    async def run():
+        key = f'key{next(keys)}'
+        await Item(key=key, value=1).insert()
+        await Item.find_one(Item.key == key)
+
+    return run
+
+
+@case('umongo commit + find_one', number=1000)
+async def umongo_round_trip(client):
+    from umongo import Document, fields
+    from umongo.instance import Instance
+
+    instance = Instance.from_db(client['umongo'])
+
+    @instance.register
+    class Item(Document):
+        key = fields.StrField()
+        value = fields.IntField()
+
+    keys = iter(range(sys.maxsize))
+
+    async def run():
+        key = f'key{next(keys)}'
+        await Item(key=key, value=1).commit()  # type: ignore
+        await Item.find_one({'key': key})  # type: ignore
+
+    return run
+
+
+async def prepare(case: Case) -> Callable[[], Any]:
+    return await case.setup(AsyncMongoMockClient())
+
+
+async def measure(
+    operation: Callable[[], Any], number: int, repeat: int
+) -> List[float]:
+    """Returns seconds per operation of every repeat."""
+
+    timings = []
+    is_async = asyncio.iscoroutinefunction(operation)
+    for _ in range(repeat):
+        started = time.perf_counter()
+        if is_async:
+            for _ in range(number):
+                await operation()
+        else:
+            for _ in range(number):
+                operation()
+        timings.append((time.perf_counter() - started) / number)
+    return timings
+
+
+async def run_cases(
+    cases: List[Case], number_scale: float, repeat: int
+) -> List[Dict[str, Any]]:
+    results = []
+    for case in cases:
+        try:
+            operation = await prepare(case)
+        except ImportError as error:
+            print(f'{case.name:<36}skipped ({error.name} is not installed)')
+            continue
+        number = max(1, int(case.number * number_scale))
+        timings = await measure(operation, number, repeat)
+        results.append(
+            {
+                'name': case.name,
+                'number': number,
+                'timings': timings,
+                'min': min(timings),
+                'median': statistics.median(timings),
+            }
+        )
+        print(f'{case.name:<36}{_format_time(min(timings)):>12}')
+    return results
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds * scale >= 1:
+            return f'{seconds * scale:.2f} {unit}'
+    return f'{seconds * 1e9:.1f} ns'
+
+
+def _get_version(package: str) -> Optional[str]:
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def compare(results: List[Dict[str, Any]], previous: Dict[str, Any]) -> None:
+    previous_results = {result['name']: result for result in previous['results']}
+    print(f'\n{"case":<36}{"previous":>12}{"current":>12}{"change":>10}')
+    for result in results:
+        if result['name'] not in previous_results:
+            continue
+        before = previous_results[result['name']]['min']
+        change = (result['min'] - before) / before * 100
+        print(
+            f'{result["name"]:<36}{_format_time(before):>12}'
+            f'{_format_time(result["min"]):>12}{change:>+9.1f}%'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number-scale', type=float, default=1.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--filter', default='')
+    parser.add_argument('--json')
+    parser.add_argument('--compare')
+    args = parser.parse_args()
+
+    cases = [case for case in CASES.values() if args.filter in case.name]
+    results = asyncio.run(run_cases(cases, args.number_scale, args.repeat))
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(
+                {
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'versions': {
+                        package: _get_version(package)
+                        for package in ('mongomock-motor', 'mongomock', 'pymongo')
+                    },
+                    'results': results,
+                },
+                file,
+                indent=2,
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,54 +1,191 @@
 import asyncio
+import functools
 import importlib
+import inspect
+import operator
+import sys
+import time
 from asyncio.events import AbstractEventLoop
 from contextlib import ExitStack, contextmanager
-from functools import wraps
-from typing import Any, List, Optional, Union
+from typing import Any, Callable, Iterable, List, Mapping, Optional, Tuple, Union
 from unittest.mock import patch
 
 from mongomock.collection import Collection as MongoMockCollection
 from mongomock.collection import Cursor as MongoMockCursor
 from mongomock.command_cursor import CommandCursor as MongoMockCommandCursor
 from mongomock.database import Database as MongoMockDatabase
-from mongomock.gridfs import _create_grid_out_cursor
 from mongomock.mongo_client import MongoClient as MongoMockMongoClient
-from pymongo.database import Database as PyMongoDatabase
+from pymongo.cursor import CursorType
 from typing_extensions import Self
 
+from .aggregation import process_pipeline
+from .capped import (
+    TailableCursor,
+    get_capped_store,
+    make_capped,
+    validate_capped_options,
+)
+from .cursor_manager import CursorManager, ManagedCursor
+from .gridfs import GridFSBucket
 from .patches import _patch_client_internals, _patch_collection_internals
+from .prefetch import DEFAULT_MAX_BATCHES, Prefetcher
+from .remote import RemoteCollection, RemoteDatabase, RemoteMongoClient, get_namespace
+from .stats import (
+    OPERATIONS,
+    ServerStats,
+    coll_stats_stage,
+    collection_stats,
+    database_stats,
+    server_status,
+)
+from .ttl import TTLMonitor
 from .typing import BuildInfo, DocumentType
 
 
+def _import_class(module_name: str, name: str) -> Optional[type]:
+    try:
+        return getattr(importlib.import_module(module_name), name)
+    except Exception:
+        return None
+
+
 def masquerade_class(name: str):
+    """
+    Makes instances of the class pretend to be instances of the target class
+    (for isinstance checks falling back to "__class__"). Target class isn't
+    imported until it's needed, so that motor isn't imported along with the
+    package: until then "__class__" is a property importing it. Once target
+    is imported, instances are created as subclass with "__class__" being
+    a plain class attribute, which is way cheaper to look up.
+    """
+
     module_name, target_name = name.rsplit('.', 1)
 
-    try:
-        target = getattr(importlib.import_module(module_name), target_name)
-    except Exception:
-        return lambda cls: cls
+    def decorator(cls):
+        is_resolved = False
+        target = masquerading = None
+
+        def resolve() -> None:
+            nonlocal is_resolved, target, masquerading
+            if not is_resolved:
+                target = _import_class(module_name, target_name)
+                if target is not None:
+                    masquerading = type(
+                        target_name, (Wrapper,), {**namespace, '__class__': target}
+                    )
+                is_resolved = True
+
+        def get_class(self) -> type:
+            resolve()
+            return target or Wrapper
+
+        def new(klass, *args, **kwargs):
+            if klass is Wrapper and (is_resolved or module_name in sys.modules):
+                resolve()
+                klass = masquerading or Wrapper
+            return object.__new__(klass)
+
+        namespace = {
+            '__module__': module_name,
+            '__qualname__': target_name,
+            '__doc__': cls.__doc__,
+        }
+        Wrapper = type(
+            target_name,
+            (cls,),
+            {**namespace, '__class__': property(get_class), '__new__': new},
+        )
+        return Wrapper
+
+    return decorator
+
+
+class _DelegatedAttribute:
+    """
+    Reads attribute of the object wrapped by mock. It's a non-data
+    descriptor, so it can be overridden by attribute of mock instance.
+    """
+
+    __slots__ = ('_get',)
+
+    def __init__(self, path: str) -> None:
+        self._get = operator.attrgetter(path)
+
+    def __get__(self, instance: Any, owner: Any = None) -> Any:
+        if instance is None:
+            return self
+        return self._get(instance)
+
+
+def with_attribute_delegation(source: str):
+    """
+    Puts descriptors for attributes of wrapped object's class on mock class
+    once they are looked up through "__getattr__", so that further lookups
+    don't have to fail first (which is expensive).
+    """
 
     def decorator(cls):
-        @wraps(target, updated=())
-        class Wrapper(cls):
-            @property
-            def __class__(self):
-                return target
+        attribute = f'_{cls.__name__}{source}'
+        fallback = cls.__getattr__
 
-        return Wrapper
+        def __getattr__(self, name: str) -> Any:
+            wrapped = self.__dict__.get(attribute)
+            if not name.startswith('__') and hasattr(type(wrapped), name):
+                setattr(cls, name, _DelegatedAttribute(f'{attribute}.{name}'))
+            return fallback(self, name)
+
+        cls.__getattr__ = __getattr__
+        return cls
 
     return decorator
 
 
-def with_async_methods(source: str, async_methods: List[str]):
+def with_async_methods(
+    source: str,
+    async_methods: List[str],
+    counters: Optional[Tuple[str, str]] = None,
+):
+    """
+    Makes async methods calling methods of wrapped object. With "counters"
+    (paths of client and namespace) methods listed in "OPERATIONS" are
+    counted right in these wrappers, see "with_op_counters".
+    """
+
     def decorator(cls):
+        attribute = f'_{cls.__name__}{source}'
+        get_stats = get_namespace = None
+        if counters is not None:
+            get_stats = operator.attrgetter(f'{counters[0]}.server_stats')
+            get_namespace = operator.attrgetter(counters[1])
+
         for method_name in async_methods:
 
             def make_wrapper(method_name: str):
                 async def wrapper(self, *args, **kwargs):
-                    proxy_source = self.__dict__.get(f'_{cls.__name__}{source}')
+                    proxy_source = self.__dict__.get(attribute)
                     return getattr(proxy_source, method_name)(*args, **kwargs)
 
-                return wrapper
+                async def counting_wrapper(self, *args, **kwargs):
+                    proxy_source = self.__dict__.get(attribute)
+                    stats = get_stats(self)  # type: ignore
+                    if not stats.is_enabled:
+                        return getattr(proxy_source, method_name)(*args, **kwargs)
+                    started = time.perf_counter()
+                    try:
+                        return getattr(proxy_source, method_name)(*args, **kwargs)
+                    finally:
+                        stats.record(
+                            get_namespace(self),  # type: ignore
+                            method_name,
+                            args,
+                            kwargs,
+                            time.perf_counter() - started,
+                        )
+
+                if get_stats is None or method_name not in OPERATIONS:
+                    return wrapper
+                counting_wrapper.is_counted = True  # type: ignore
+                return counting_wrapper
 
             setattr(cls, method_name, make_wrapper(method_name))
 
@@ -59,11 +196,12 @@ def with_async_methods(source: str, async_methods: List[str]):
 
 def with_cursor_chaining_methods(source: str, chaining_methods: List[str]):
     def decorator(cls):
+        attribute = f'_{cls.__name__}{source}'
         for method_name in chaining_methods:
 
             def make_wrapper(method_name: str):
                 def wrapper(self, *args, **kwargs):
-                    proxy_source = self.__dict__.get(f'_{cls.__name__}{source}')
+                    proxy_source = self.__dict__.get(attribute)
                     getattr(proxy_source, method_name)(*args, **kwargs)
                     return self
 
@@ -76,20 +214,93 @@ def with_cursor_chaining_methods(source: str, chaining_methods: List[str]):
     return decorator
 
 
+def with_op_counters(client: str, namespace: str):
+    """
+    Counts calls of methods listed in "OPERATIONS" (and time they take) in
+    stats of the client, which are reported by "serverStatus" and
+    "$collStats", when they are enabled. Should be applied once methods are
+    defined, methods of "with_async_methods" are counted by it instead.
+    """
+
+    def decorator(cls):
+        get_stats = operator.attrgetter(f'{client}.server_stats')
+        get_namespace = operator.attrgetter(namespace)
+        for method_name in OPERATIONS:
+            method = getattr(cls, method_name, None)
+            if method is None or getattr(method, 'is_counted', False):
+                continue
+
+            def make_wrapper(method_name: str, method: Callable):
+                if inspect.iscoroutinefunction(method):
+
+                    @functools.wraps(method)
+                    async def async_wrapper(self, *args, **kwargs):
+                        stats = get_stats(self)
+                        if not stats.is_enabled:
+                            return await method(self, *args, **kwargs)
+                        started = time.perf_counter()
+                        try:
+                            return await method(self, *args, **kwargs)
+                        finally:
+                            stats.record(
+                                get_namespace(self),
+                                method_name,
+                                args,
+                                kwargs,
+                                time.perf_counter() - started,
+                            )
+
+                    return async_wrapper
+
+                @functools.wraps(method)
+                def wrapper(self, *args, **kwargs):
+                    stats = get_stats(self)
+                    if not stats.is_enabled:
+                        return method(self, *args, **kwargs)
+                    started = time.perf_counter()
+                    try:
+                        return method(self, *args, **kwargs)
+                    finally:
+                        stats.record(
+                            get_namespace(self),
+                            method_name,
+                            args,
+                            kwargs,
+                            time.perf_counter() - started,
+                        )
+
+                return wrapper
+
+            setattr(cls, method_name, make_wrapper(method_name, method))
+
+        return cls
+
+    return decorator
+
+
+def _get_command(args: tuple, kwargs: dict) -> Optional[Mapping[str, Any]]:
+    command = args[0] if args else kwargs.get('command')
+    if isinstance(command, str):
+        value = args[1] if len(args) > 1 else kwargs.get('value', 1)
+        options = {key: item for key, item in kwargs.items() if key != 'value'}
+        return {command: value, **options}
+    if isinstance(command, Mapping) and command:
+        return command
+    return None
+
+
 @masquerade_class('motor.motor_asyncio.AsyncIOMotorCursor')
 @with_cursor_chaining_methods(
     '__cursor',
     [
         'add_option',
         'allow_disk_use',
-        'batch_size',
         'collation',
         'comment',
         'hint',
         'limit',
         'max_await_time_ms',
         'max_scan',
-        'max_time_ms',
         'max',
         'min',
         'remove_option',
@@ -102,12 +313,34 @@ def with_cursor_chaining_methods(source: str, chaining_methods: List[str]):
     '__cursor',
     [
         'distinct',
-        'close',
     ],
 )
+@with_attribute_delegation('__cursor')
 class AsyncCursor:
-    def __init__(self, cursor: MongoMockCursor) -> None:
+    def __init__(
+        self,
+        cursor: MongoMockCursor,
+        cursor_manager: Optional[CursorManager] = None,
+        no_cursor_timeout: bool = False,
+        cursor_type: int = CursorType.NON_TAILABLE,
+    ) -> None:
         self.__cursor = cursor
+        self.__no_cursor_timeout = no_cursor_timeout
+        self.__cursor_type = cursor_type
+        self.__tailable = None
+        if cursor_type & CursorType.TAILABLE:
+            self.__tailable = TailableCursor(
+                cursor,
+                await_data=cursor_type == CursorType.TAILABLE_AWAIT,
+            )
+        self.__managed = ManagedCursor(
+            cursor_manager or CursorManager(),
+            getattr(cursor, 'iter_results', cursor.__iter__),
+            cursor.collection.full_name,
+            no_cursor_timeout,
+        )
+        self.__managed.max_time_ms = getattr(cursor, '_max_time_ms', None)
+        self.__prefetcher: Optional[Prefetcher] = None
 
     def __getattr__(self, name: str) -> Any:
         return getattr(self.__cursor, name)
@@ -115,37 +348,105 @@ class AsyncCursor:
     def __aiter__(self) -> Self:
         return self
 
+    @property
+    def alive(self) -> bool:
+        if self.__tailable is not None:
+            return self.__tailable.alive
+        if self.__prefetcher is not None:
+            return self.__prefetcher.alive
+        return self.__managed.alive
+
+    @property
+    def cursor_id(self) -> Optional[int]:
+        return self.__managed.cursor_id
+
+    def batch_size(self, batch_size: int) -> Self:
+        self.__managed.batch_size = batch_size
+        return self
+
+    def max_time_ms(self, max_time_ms: Optional[int]) -> Self:
+        self.__cursor.max_time_ms(max_time_ms)
+        self.__managed.max_time_ms = max_time_ms
+        return self
+
+    def prefetch(self, max_batches: int = DEFAULT_MAX_BATCHES) -> Self:
+        """
+        Makes cursor produce up to "max_batches" next batches in background,
+        while documents of the current one are processed.
+        """
+
+        if self.__tailable is None:
+            self.__prefetcher = Prefetcher(self.__managed, max_batches)
+        return self
+
     async def next(self) -> Any:
+        if self.__tailable is not None:
+            return await self.__tailable.next()
+        if self.__prefetcher is not None:
+            return await self.__prefetcher.next()
         try:
-            return next(self.__cursor)
+            return next(self.__managed)
         except StopIteration:
             raise StopAsyncIteration()
 
     __anext__ = next
 
+    async def close(self) -> None:
+        if self.__tailable is not None:
+            self.__tailable.close()
+        if self.__prefetcher is not None:
+            self.__prefetcher.close()
+        self.__managed.close()
+        self.__cursor.close()
+
+    def rewind(self) -> Self:
+        self.__cursor.rewind()
+        self.__managed.rewind()
+        if self.__tailable is not None:
+            self.__tailable.close()
+            self.__tailable = TailableCursor(
+                self.__cursor,
+                await_data=self.__cursor_type == CursorType.TAILABLE_AWAIT,
+            )
+        if self.__prefetcher is not None:
+            self.__prefetcher.close()
+            self.__prefetcher = Prefetcher(
+                self.__managed, self.__prefetcher.max_batches
+            )
+        return self
+
     def clone(self) -> 'AsyncCursor':
-        return AsyncCursor(self.__cursor.clone())
+        return AsyncCursor(
+            self.__cursor.clone(),
+            self.__managed.manager,
+            self.__no_cursor_timeout,
+            self.__cursor_type,
+        )
 
     async def to_list(self, *args, **kwargs) -> List:
-        return list(self.__cursor)
+        if self.__tailable is not None:
+            return self.__tailable.to_list()
+        if self.__prefetcher is not None:
+            return await self.__prefetcher.to_list()
+        return list(self.__managed)
 
 
 @masquerade_class('motor.motor_asyncio.AsyncIOMotorCommandCursor')
-@with_cursor_chaining_methods(
-    '__cursor',
-    [
-        'batch_size',
-    ],
-)
-@with_async_methods(
-    '__cursor',
-    [
-        'close',
-    ],
-)
+@with_attribute_delegation('__cursor')
 class AsyncCommandCursor:
-    def __init__(self, cursor: MongoMockCommandCursor) -> None:
+    def __init__(
+        self,
+        cursor: MongoMockCommandCursor,
+        cursor_manager: Optional[CursorManager] = None,
+        namespace: str = '',
+    ) -> None:
         self.__cursor = cursor
+        self.__managed = ManagedCursor(
+            cursor_manager or CursorManager(),
+            cursor.__iter__,
+            namespace,
+        )
+        self.__prefetcher: Optional[Prefetcher] = None
 
     def __getattr__(self, name: str) -> Any:
         return getattr(self.__cursor, name)
@@ -153,28 +454,66 @@ class AsyncCommandCursor:
     def __aiter__(self) -> Self:
         return self
 
+    @property
+    def alive(self) -> bool:
+        if self.__prefetcher is not None:
+            return self.__prefetcher.alive
+        return self.__managed.alive
+
+    @property
+    def cursor_id(self) -> Optional[int]:
+        return self.__managed.cursor_id
+
+    def batch_size(self, batch_size: int) -> Self:
+        self.__managed.batch_size = batch_size
+        return self
+
+    def prefetch(self, max_batches: int = DEFAULT_MAX_BATCHES) -> Self:
+        """
+        Makes cursor produce up to "max_batches" next batches in background,
+        while documents of the current one are processed.
+        """
+
+        self.__prefetcher = Prefetcher(self.__managed, max_batches)
+        return self
+
     async def next(self) -> DocumentType:
+        if self.__prefetcher is not None:
+            return await self.__prefetcher.next()
         try:
-            return next(self.__cursor)
+            return next(self.__managed)
         except StopIteration:
             raise StopAsyncIteration()
 
     __anext__ = next
 
+    async def close(self) -> None:
+        if self.__prefetcher is not None:
+            self.__prefetcher.close()
+        self.__managed.close()
+
     async def to_list(self, *args, **kwargs) -> List[DocumentType]:
-        return list(self.__cursor)
+        if self.__prefetcher is not None:
+            return await self.__prefetcher.to_list()
+        return list(self.__managed)
 
 
 @masquerade_class('motor.motor_asyncio.AsyncIOMotorLatentCommandCursor')
-@with_async_methods(
-    '__cursor',
-    [
-        'close',
-    ],
-)
+@with_attribute_delegation('__cursor')
 class AsyncLatentCommandCursor:
-    def __init__(self, cursor: MongoMockCommandCursor) -> None:
+    def __init__(
+        self,
+        cursor: MongoMockCommandCursor,
+        cursor_manager: Optional[CursorManager] = None,
+        namespace: str = '',
+    ) -> None:
         self.__cursor = cursor
+        self.__managed = ManagedCursor(
+            cursor_manager or CursorManager(),
+            cursor.__iter__,
+            namespace,
+        )
+        self.__prefetcher: Optional[Prefetcher] = None
 
     def __getattr__(self, name: str) -> Any:
         return getattr(self.__cursor, name)
@@ -182,27 +521,58 @@ class AsyncLatentCommandCursor:
     def __aiter__(self) -> Self:
         return self
 
+    @property
+    def alive(self) -> bool:
+        if self.__prefetcher is not None:
+            return self.__prefetcher.alive
+        return self.__managed.alive
+
+    @property
+    def cursor_id(self) -> Optional[int]:
+        return self.__managed.cursor_id
+
+    def batch_size(self, batch_size: int) -> Self:
+        self.__managed.batch_size = batch_size
+        return self
+
+    def prefetch(self, max_batches: int = DEFAULT_MAX_BATCHES) -> Self:
+        """
+        Makes cursor produce up to "max_batches" next batches in background,
+        while documents of the current one are processed.
+        """
+
+        self.__prefetcher = Prefetcher(self.__managed, max_batches)
+        return self
+
     async def next(self) -> DocumentType:
+        if self.__prefetcher is not None:
+            return await self.__prefetcher.next()
         try:
-            return next(self.__cursor)
+            return next(self.__managed)
         except StopIteration:
             raise StopAsyncIteration()
 
     __anext__ = next
 
+    async def close(self) -> None:
+        if self.__prefetcher is not None:
+            self.__prefetcher.close()
+        self.__managed.close()
+
     async def to_list(self, *args, **kwargs) -> List[DocumentType]:
-        return list(self.__cursor)
+        if self.__prefetcher is not None:
+            return await self.__prefetcher.to_list()
+        return list(self.__managed)
 
 
 @masquerade_class('motor.motor_asyncio.AsyncIOMotorCollection')
+@with_op_counters('database.client', 'full_name')
 @with_async_methods(
     '__collection',
     [
         'bulk_write',
         'count_documents',
         'count',  # deprecated
-        'create_index',
-        'create_indexes',
         'delete_many',
         'delete_one',
         'drop_index',
@@ -221,7 +591,6 @@ class AsyncLatentCommandCursor:
         'insert_many',
         'insert_one',
         'map_reduce',
-        'options',
         'reindex',
         'rename',
         'replace_one',
@@ -229,7 +598,9 @@ class AsyncLatentCommandCursor:
         'update_many',
         'update_one',
     ],
+    counters=('database.client', 'full_name'),
 )
+@with_attribute_delegation('__collection')
 class AsyncMongoMockCollection:
     def __init__(
         self, database: 'AsyncMongoMockDatabase', collection: MongoMockCollection
@@ -251,31 +622,84 @@ class AsyncMongoMockCollection:
     def __hash__(self) -> int:
         return hash(self.__collection)
 
+    async def create_index(self, *args, **kwargs) -> str:
+        name = self.__collection.create_index(*args, **kwargs)
+        self.__ensure_ttl_monitor()
+        return name
+
+    async def create_indexes(self, *args, **kwargs) -> List[str]:
+        names = self.__collection.create_indexes(*args, **kwargs)
+        self.__ensure_ttl_monitor()
+        return names
+
+    def __ensure_ttl_monitor(self) -> None:
+        if isinstance(self.__collection, RemoteCollection):
+            return
+        if self.__collection._store._ttl_indexes:
+            self.database.client.ttl_monitor.ensure_started(self.get_io_loop())
+
+    async def options(self, *args, **kwargs) -> DocumentType:
+        if isinstance(self.__collection, RemoteCollection):
+            return self.__collection.options(*args, **kwargs)
+        store = get_capped_store(self.__collection)
+        return store.get_options() if store is not None else {}
+
     def find(self, *args, **kwargs) -> AsyncCursor:
-        return AsyncCursor(self.__collection.find(*args, **kwargs))
+        return AsyncCursor(
+            self.__collection.find(*args, **kwargs),
+            self.database.client.cursor_manager,
+            kwargs.get('no_cursor_timeout', False),
+            kwargs.get('cursor_type', CursorType.NON_TAILABLE),
+        )
 
-    def aggregate(self, *args, **kwargs) -> AsyncLatentCommandCursor:
-        return AsyncLatentCommandCursor(self.__collection.aggregate(*args, **kwargs))
+    def aggregate(self, pipeline, *args, **kwargs) -> AsyncLatentCommandCursor:
+        if (
+            pipeline
+            and '$collStats' in pipeline[0]
+            and not isinstance(self.__collection, RemoteCollection)
+        ):
+            document = coll_stats_stage(
+                self.__collection,
+                pipeline[0]['$collStats'],
+                self.database.client.server_stats,
+            )
+            cursor = process_pipeline(
+                [document],
+                self.__collection.database,
+                pipeline[1:],
+                kwargs.get('session'),
+            )
+        else:
+            cursor = self.__collection.aggregate(pipeline, *args, **kwargs)
+        return AsyncLatentCommandCursor(
+            cursor,
+            self.database.client.cursor_manager,
+            self.__collection.full_name,
+        )
 
     def list_indexes(self, *args, **kwargs) -> AsyncCommandCursor:
         return AsyncCommandCursor(
             MongoMockCommandCursor(
                 list(self.__collection.list_indexes(*args, **kwargs))
-            )
+            ),
+            self.database.client.cursor_manager,
+            self.__collection.full_name,
         )
 
 
 @masquerade_class('motor.motor_asyncio.AsyncIOMotorDatabase')
+@with_op_counters('client', 'name')
 @with_async_methods(
     '__database',
     [
-        'create_collection',
         'dereference',
         'drop_collection',
         'list_collection_names',
         'validate_collection',
     ],
+    counters=('client', 'name'),
 )
+@with_attribute_delegation('__database')
 class AsyncMongoMockDatabase:
     def __init__(
         self,
@@ -304,25 +728,91 @@ class AsyncMongoMockDatabase:
             self.__database.get_collection(*args, **kwargs),
         )
 
+    async def create_collection(
+        self,
+        name: str,
+        *args,
+        capped: bool = False,
+        size: Optional[int] = None,
+        max: Optional[int] = None,
+        **kwargs,
+    ) -> AsyncMongoMockCollection:
+        if isinstance(self.__database, RemoteDatabase):
+            if capped:
+                kwargs.update(capped=capped, size=size, max=max)
+            self.__database.create_collection(name, *args, **kwargs)
+            return self.get_collection(name)
+        if capped:
+            # invalid options must not leave regular collection behind
+            validate_capped_options(size, max)
+        collection = self.__database.create_collection(name, *args, **kwargs)
+        if capped:
+            make_capped(collection, size, max)
+        return self.get_collection(name)
+
     def aggregate(self, *args, **kwargs) -> AsyncLatentCommandCursor:
-        return AsyncLatentCommandCursor(self.__database.aggregate(*args, **kwargs))
+        return AsyncLatentCommandCursor(
+            self.__database.aggregate(*args, **kwargs),
+            self.client.cursor_manager,
+            f'{self.__database.name}.$cmd.aggregate',
+        )
 
     async def command(self, *args, **kwargs) -> Union[DocumentType, BuildInfo]:
+        command = _get_command(args, kwargs)
+        name = next(iter(command)).lower() if command is not None else ''
+        # batches are counted by cursor manager
+        if name != 'getmore' and self.client.server_stats.is_enabled:
+            self.client.server_stats.count('command')
+        if command is not None and not isinstance(self.__database, RemoteDatabase):
+            if name == 'collstats':
+                collection = self.__database.get_collection(
+                    command[next(iter(command))]
+                )
+                return collection_stats(collection, command)
+            if name == 'dbstats':
+                return database_stats(self.__database, command)
+            if name == 'serverstatus':
+                return server_status(
+                    self.client.server_stats,
+                    self.client.cursor_manager,
+                    self.__build_info['version'],
+                )
         try:
             return getattr(self.__database, 'command')(*args, **kwargs)
         except NotImplementedError:
-            if not args:
+            if command is None:
                 raise
-            if isinstance(args[0], str) and args[0].lower() == 'buildinfo':
-                return self.__build_info
-            if (
-                isinstance(args[0], dict)
-                and args[0]
-                and list(args[0])[0].lower() == 'buildinfo'
-            ):
+            if name == 'buildinfo':
                 return self.__build_info
+            if name == 'getmore':
+                return self.__get_more(command)
+            if name == 'killcursors':
+                return self.__kill_cursors(command)
             raise
 
+    def __get_more(self, command: DocumentType) -> DocumentType:
+        cursor_manager = self.client.cursor_manager
+        cursor_id = command['getMore']
+        namespace = cursor_manager.get_namespace(cursor_id)
+        cursor_id, documents = cursor_manager.get_more(
+            cursor_id,
+            command.get('batchSize', 0),
+        )
+        return {
+            'cursor': {'id': cursor_id, 'ns': namespace, 'nextBatch': documents},
+            'ok': 1.0,
+        }
+
+    def __kill_cursors(self, command: DocumentType) -> DocumentType:
+        killed, not_found = self.client.cursor_manager.kill(command['cursors'])
+        return {
+            'cursorsKilled': killed,
+            'cursorsNotFound': not_found,
+            'cursorsAlive': [],
+            'cursorsUnknown': [],
+            'ok': 1.0,
+        }
+
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, AsyncMongoMockDatabase):
             return NotImplemented
@@ -351,6 +841,7 @@ class AsyncMongoMockDatabase:
         'server_info',
     ],
 )
+@with_attribute_delegation('__client')
 class AsyncMongoMockClient:
     def __init__(
         self,
@@ -358,13 +849,38 @@ class AsyncMongoMockClient:
         mock_build_info: Optional[BuildInfo] = None,
         mock_mongo_client: Optional[MongoMockMongoClient] = None,
         mock_io_loop: Optional[AbstractEventLoop] = None,
+        mock_server_address: Optional[str] = None,
+        mock_namespace: Optional[str] = None,
+        mock_shared_databases: Iterable[str] = (),
+        mock_server_stats: bool = False,
         **kwargs,
     ) -> None:
+        if mock_server_address is not None:
+            mock_mongo_client = RemoteMongoClient(  # type: ignore
+                mock_server_address,
+                mock_namespace if mock_namespace is not None else get_namespace(),
+                mock_shared_databases,
+            )
         self.__client = _patch_client_internals(
             mock_mongo_client or MongoMockMongoClient(*args, **kwargs)
         )
         self.__build_info = mock_build_info
         self.__io_loop = mock_io_loop
+        self.__cursor_manager = CursorManager()
+        self.__server_stats = ServerStats(mock_server_stats)
+        self.__ttl_monitor = TTLMonitor(self.__client._store)
+
+    @property
+    def cursor_manager(self) -> CursorManager:
+        return self.__cursor_manager
+
+    @property
+    def server_stats(self) -> ServerStats:
+        return self.__server_stats
+
+    @property
+    def ttl_monitor(self) -> TTLMonitor:
+        return self.__ttl_monitor
 
     def get_io_loop(self) -> AbstractEventLoop:
         return self.__io_loop or asyncio.get_event_loop()
@@ -394,8 +910,20 @@ class AsyncMongoMockClient:
         return hash(self.__client)
 
 
+@masquerade_class('motor.motor_asyncio.AsyncIOMotorGridFSBucket')
+class AsyncMongoMockGridFSBucket(GridFSBucket):
+    """
+    GridFS bucket of AsyncMongoMockDatabase, works without patching "gridfs"
+    (see enabled_gridfs_integration) and streams files chunk by chunk.
+    """
+
+
 @contextmanager
 def enabled_gridfs_integration():
+    # "gridfs" takes a while to import, so it's only imported when needed
+    from mongomock.gridfs import _create_grid_out_cursor
+    from pymongo.database import Database as PyMongoDatabase
+
     Database = (PyMongoDatabase, MongoMockDatabase)
     Collection = (PyMongoDatabase, MongoMockCollection)
 
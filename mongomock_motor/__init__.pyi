@@ -1,5 +1,5 @@
 from contextlib import contextmanager
-from typing import Iterator
+from typing import Any, Iterator, Optional
 
 from motor.motor_asyncio import (
     AsyncIOMotorClient as AsyncMongoMockClient,
@@ -12,10 +12,22 @@ from motor.motor_asyncio import AsyncIOMotorCursor as AsyncCursor
 from motor.motor_asyncio import (
     AsyncIOMotorDatabase as AsyncMongoMockDatabase,
 )
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
 from motor.motor_asyncio import (
     AsyncIOMotorLatentCommandCursor as AsyncLatentCommandCursor,
 )
 
+class AsyncMongoMockGridFSBucket(AsyncIOMotorGridFSBucket):
+    def __init__(
+        self,
+        database: AsyncMongoMockDatabase,
+        bucket_name: str = 'fs',
+        chunk_size_bytes: int = ...,
+        write_concern: Any = None,
+        read_preference: Any = None,
+        mock_spill_threshold: Optional[int] = None,
+    ) -> None: ...
+
 @contextmanager
 def enabled_gridfs_integration() -> Iterator[None]: ...
 
@@ -26,5 +38,6 @@ __all__: list[str] = [
     'AsyncMongoMockClient',
     'AsyncMongoMockCollection',
     'AsyncMongoMockDatabase',
+    'AsyncMongoMockGridFSBucket',
     'enabled_gridfs_integration',
 ]
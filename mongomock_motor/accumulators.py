@@ -0,0 +1,215 @@
+import decimal
+import functools
+import importlib
+import math
+import numbers
+from typing import Any, Callable, Dict, List, Optional
+
+from mongomock.filtering import BsonComparable
+
+from .indexes import _hashable
+
+try:
+    from bson.decimal128 import Decimal128
+except ModuleNotFoundError:
+    Decimal128 = None
+
+# Minimal amount of values for accumulator to be computed with NumPy
+VECTORIZE_THRESHOLD = 4096
+
+_INT64_MAX = 2**63 - 1
+
+Accumulator = Callable[[List[Any]], Any]
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+
+def _numbers(values: List[Any]) -> List[Any]:
+    return [value for value in values if _is_number(value)]
+
+
+def _sum(values: List[Any]) -> Any:
+    to_sum = []
+    for value in values:
+        if _is_number(value):
+            to_sum.append(value)
+        elif Decimal128 is not None and isinstance(value, Decimal128):
+            to_sum.append(value.to_decimal())
+
+    result = sum(to_sum)
+    if Decimal128 is not None and isinstance(result, decimal.Decimal):
+        return Decimal128(result)
+    return result
+
+
+def _avg(values: List[Any]) -> Optional[float]:
+    to_average = _numbers(values)
+    if not to_average:
+        return None
+    return sum(to_average) / float(len(to_average))
+
+
+def _is_nan(value: Any) -> bool:
+    return isinstance(value, float) and math.isnan(value)
+
+
+def _extreme(values: List[Any], is_max: bool) -> Any:
+    candidates = [value for value in values if value is not None]
+    nans = [value for value in candidates if _is_nan(value)]
+    others = [value for value in candidates if not _is_nan(value)]
+    if not others:
+        return nans[0] if nans else None
+
+    result = (max if is_max else min)(others, key=BsonComparable)
+    # NaN is sorted below other numbers, but doesn't compare with anything
+    if nans:
+        is_below_numbers = BsonComparable(result) < BsonComparable(-math.inf)
+        if is_below_numbers == is_max:
+            return nans[0]
+    return result
+
+
+def _min(values: List[Any]) -> Any:
+    return _extreme(values, is_max=False)
+
+
+def _max(values: List[Any]) -> Any:
+    return _extreme(values, is_max=True)
+
+
+def _std_dev(values: List[Any], ddof: int) -> Optional[float]:
+    to_compute = _numbers(values)
+    if len(to_compute) <= ddof:
+        return None
+    mean = sum(to_compute) / len(to_compute)
+    variance = sum((value - mean) ** 2 for value in to_compute)
+    return math.sqrt(variance / (len(to_compute) - ddof))
+
+
+def _add_to_set(values: List[Any]) -> List[Any]:
+    unique = {}
+    for value in values:
+        unique.setdefault(_hashable(value), value)
+    return list(unique.values())
+
+
+def _merge_objects(values: List[Any]) -> Dict[str, Any]:
+    merged = {}
+    for value in values:
+        if isinstance(value, dict):
+            merged.update(value)
+    return merged
+
+
+ACCUMULATORS: Dict[str, Accumulator] = {
+    '$addToSet': _add_to_set,
+    '$avg': _avg,
+    '$first': lambda values: values[0] if values else None,
+    '$last': lambda values: values[-1] if values else None,
+    '$max': _max,
+    '$mergeObjects': _merge_objects,
+    '$min': _min,
+    '$push': list,
+    '$stdDevPop': lambda values: _std_dev(values, 0),
+    '$stdDevSamp': lambda values: _std_dev(values, 1),
+    '$sum': _sum,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _import_numpy() -> Any:
+    # NumPy takes a while to import, so it's only imported when needed
+    try:
+        return importlib.import_module('numpy')
+    except ModuleNotFoundError:
+        return None
+
+
+def _vectorized(operator: str, groups: List[List[Any]]) -> Optional[List[Any]]:
+    """
+    Computes numeric accumulator for all groups at once with NumPy. Returns
+    None when values are not plain numbers, so that generic implementation
+    should be used.
+    """
+
+    numpy = _import_numpy()
+    if numpy is None:
+        return None
+
+    flat = [value for values in groups for value in values]
+    if not flat:
+        return None
+
+    types = {type(value) for value in flat}
+    if types == {int}:
+        if max(abs(value) for value in flat) * len(flat) > _INT64_MAX:
+            return None
+        array = numpy.array(flat, dtype=numpy.int64)
+    elif types == {float}:
+        array = numpy.array(flat, dtype=numpy.float64)
+        # NumPy doesn't sort NaN below other numbers the way server does
+        if operator in ('$min', '$max') and numpy.isnan(array).any():
+            return None
+    else:
+        return None
+
+    counts = numpy.array([len(values) for values in groups])
+    group_ids = numpy.repeat(numpy.arange(len(groups)), counts)
+
+    if operator in ('$sum', '$avg', '$stdDevPop', '$stdDevSamp'):
+        sums = numpy.zeros(len(groups), dtype=array.dtype)
+        numpy.add.at(sums, group_ids, array)
+
+        if operator == '$sum':
+            return [v if n else 0 for n, v in zip(counts, sums.tolist())]
+
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            means = sums / counts
+
+        if operator == '$avg':
+            return [None if not n else v for n, v in zip(counts, means.tolist())]
+
+        ddof = 0 if operator == '$stdDevPop' else 1
+        deviations = array - means[group_ids]
+        squares = numpy.bincount(
+            group_ids, weights=deviations * deviations, minlength=len(groups)
+        )
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            deviation = numpy.sqrt(squares / (counts - ddof))
+        return [None if n <= ddof else v for n, v in zip(counts, deviation.tolist())]
+
+    if operator in ('$min', '$max'):
+        if array.dtype == numpy.int64:
+            limits = numpy.iinfo(numpy.int64)
+            initial = limits.max if operator == '$min' else limits.min
+        else:
+            initial = numpy.inf if operator == '$min' else -numpy.inf
+        result = numpy.full(len(groups), initial, dtype=array.dtype)
+        reducer = numpy.minimum if operator == '$min' else numpy.maximum
+        reducer.at(result, group_ids, array)
+        return [None if not n else v for n, v in zip(counts, result.tolist())]
+
+    return None
+
+
+def accumulate(operator: str, groups: List[List[Any]]) -> List[Any]:
+    """
+    Computes accumulator for values of every group. Numeric accumulators over
+    large amount of values are computed with NumPy when it's installed.
+    """
+
+    if (
+        operator in ('$sum', '$avg', '$min', '$max', '$stdDevPop', '$stdDevSamp')
+        and sum(len(values) for values in groups) >= VECTORIZE_THRESHOLD
+    ):
+        result = _vectorized(operator, groups)
+        if result is not None:
+            return result
+
+    accumulator = ACCUMULATORS[operator]
+    return [accumulator(values) for values in groups]
+
+
+__all__ = ['ACCUMULATORS', 'VECTORIZE_THRESHOLD', 'accumulate']
@@ -0,0 +1,309 @@
+import copy
+from typing import Any, Callable, Dict, List
+
+from mongomock import OperationFailure, helpers
+from mongomock import aggregate as mongomock_aggregate
+from mongomock.command_cursor import CommandCursor
+from mongomock.database import Database
+from mongomock.filtering import BsonComparable, filter_applies
+
+from .accumulators import ACCUMULATORS, accumulate
+from .indexes import Index, _hashable, _match_key, indexed_store
+from .sorting import normalize_sort, top_k
+from .time_limits import check_time_limit, with_time_limit
+from .typing import DocumentType
+
+StageHandler = Callable[[List[Any], Database, Any], List[Any]]
+
+
+def _get_local_value(document: DocumentType, field: str) -> Any:
+    try:
+        return helpers.get_value_by_dot(document, field)
+    except KeyError:
+        return None
+
+
+def _bind_variables(value: Any, variables: Dict[str, Any]) -> Any:
+    """Replaces references to `let` variables with literal values."""
+
+    if isinstance(value, str) and value.startswith('$$'):
+        name, _, path = value[2:].partition('.')
+        if name not in variables:
+            return value
+        bound = variables[name]
+        if path:
+            bound = _get_local_value(bound, path)
+        return {'$literal': bound}
+
+    if isinstance(value, dict):
+        return {k: _bind_variables(v, variables) for k, v in value.items()}
+
+    if isinstance(value, list):
+        return [_bind_variables(v, variables) for v in value]
+
+    return value
+
+
+def _compile_expression(expression: Any) -> Callable[[Any], Any]:
+    if (
+        isinstance(expression, str)
+        and expression.startswith('$')
+        and not expression.startswith('$$')
+    ):
+        path = expression[1:]
+        return lambda doc: helpers.get_value_by_dot(doc, path, can_generate_array=True)
+
+    if not isinstance(expression, (str, dict, list)):
+        return lambda doc: expression
+
+    return lambda doc: mongomock_aggregate._parse_expression(expression, doc)
+
+
+def _validate_lookup_options(options: DocumentType) -> None:
+    required = ['from', 'as']
+    if 'pipeline' not in options or 'localField' in options:
+        required.extend(['localField', 'foreignField'])
+
+    for operator in required:
+        if operator not in options:
+            raise OperationFailure("Must specify '%s' field for a $lookup" % operator)
+        if not isinstance(options[operator], str):
+            raise OperationFailure('Arguments to $lookup must be strings')
+        if operator != 'from' and options[operator].startswith('$'):
+            raise OperationFailure("FieldPath field names may not start with '$'")
+
+    if '.' in options['as']:
+        raise NotImplementedError(
+            "Although '.' is valid in the 'as' parameters for the lookup stage "
+            'of the aggregation pipeline, it is currently not implemented in '
+            'mongomock_motor.'
+        )
+
+
+def _handle_lookup_stage(
+    in_collection: List[Any], database: Database, options: DocumentType
+) -> List[Any]:
+    """
+    Equality lookups are served by declared index over foreign field or by
+    hash table built once per stage, instead of querying foreign collection
+    for every document. Pipeline lookups are cached by values of `let`.
+    """
+
+    _validate_lookup_options(options)
+
+    foreign_collection = database.get_collection(options['from'])
+    store = indexed_store(foreign_collection)
+    local_field = options.get('localField')
+    foreign_field = options.get('foreignField')
+    as_field = options['as']
+    is_tz_aware = foreign_collection.codec_options.tz_aware
+
+    index = None
+    if foreign_field is not None:
+        index = store.get_index([foreign_field]) or Index.build(
+            [foreign_field], store.items()
+        )
+
+    def find_matches(local_value: Any) -> List[Any]:
+        if index is None:
+            return [document for _, document in store.items()]
+
+        if isinstance(local_value, list):
+            query = {foreign_field: {'$in': local_value}}
+            keys = {}
+            for value in local_value:
+                keys.update(index.lookup(value))
+        else:
+            query = {foreign_field: local_value}
+            keys = index.lookup(local_value)
+
+        return [
+            document
+            for document in store.documents_by_keys(keys)
+            if filter_applies(query, document)
+        ]
+
+    pipeline = options.get('pipeline')
+    variables_spec = options.get('let', {})
+    cache: Dict[Any, List[Any]] = {}
+
+    for document in with_time_limit(in_collection):
+        local_value = None
+        if local_field is not None:
+            local_value = _get_local_value(document, local_field)
+
+        variables = {}
+        for name, expression in variables_spec.items():
+            try:
+                variables[name] = mongomock_aggregate._parse_expression(
+                    expression, document, ignore_missing_keys=True
+                )
+            except KeyError:
+                variables[name] = None
+
+        # local values are matched the same way as by filter_applies
+        cache_key = (_match_key(local_value), _hashable(variables))
+        if cache_key in cache:
+            document[as_field] = copy.deepcopy(cache[cache_key])
+        else:
+            matches = [copy.deepcopy(match) for match in find_matches(local_value)]
+            if is_tz_aware:
+                matches = [
+                    helpers.make_datetime_timezone_aware_in_document(match)
+                    for match in matches
+                ]
+            if pipeline is not None:
+                matches = process_pipeline(
+                    matches, database, _bind_variables(pipeline, variables), None
+                )
+            # fresh copies are given to the first document, later ones copy them
+            document[as_field] = cache[cache_key] = list(matches)
+
+    return in_collection
+
+
+def _handle_group_stage(
+    in_collection: List[Any], database: Database, options: DocumentType
+) -> List[Any]:
+    """
+    Builds groups in a single pass over a hash table and computes accumulators
+    for all of the groups at once.
+    """
+
+    if '_id' not in options:
+        raise OperationFailure('a group specification must include an _id')
+
+    accumulators = []
+    for field, value in options.items():
+        if field == '_id':
+            continue
+        if not isinstance(value, dict):
+            raise OperationFailure(
+                "The field '%s' must be an accumulator object" % field
+            )
+        for operator, expression in value.items():
+            if operator not in ACCUMULATORS:
+                return _run_mongomock_stage(
+                    in_collection, database, {'$group': options}
+                )
+            accumulators.append((field, operator, _compile_expression(expression)))
+
+    id_expression = options['_id']
+    groups: Dict[Any, Any] = {}
+
+    for doc in with_time_limit(in_collection):
+        group_id = None
+        if id_expression:
+            try:
+                group_id = mongomock_aggregate._parse_expression(
+                    id_expression, doc, ignore_missing_keys=True
+                )
+            except KeyError:
+                pass
+
+        key = _hashable(group_id)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = (group_id, [[] for _ in accumulators])
+
+        for values, (_, _, getter) in zip(group[1], accumulators):
+            try:
+                values.append(getter(doc))
+            except KeyError:
+                continue
+
+    if not id_expression and not groups:
+        groups[None] = (None, [[] for _ in accumulators])
+
+    # $group does not order its output, but we keep ordering by _id for
+    # consistency with "mongomock".
+    ordered = sorted(groups.values(), key=lambda group: BsonComparable(group[0]))
+
+    results = [{} for _ in ordered]
+    for i, (field, operator, _) in enumerate(accumulators):
+        values = accumulate(operator, [group[1][i] for group in ordered])
+        for result, value in zip(results, values):
+            result[field] = value
+
+    for result, (group_id, _) in zip(results, ordered):
+        result['_id'] = group_id
+
+    return results
+
+
+_PIPELINE_HANDLERS: Dict[str, StageHandler] = {
+    '$group': _handle_group_stage,
+    '$lookup': _handle_lookup_stage,
+}
+
+
+def _run_mongomock_stage(
+    in_collection: List[Any], database: Database, stage: DocumentType
+) -> List[Any]:
+    return list(
+        mongomock_aggregate.process_pipeline(in_collection, database, [stage], None)
+    )
+
+
+def _get_fused_limit(stages: List[Any], start: int) -> Any:
+    """
+    Returns skip, limit and amount of stages if $sort stage is followed by
+    $limit (optionally preceded by $skip), so that they can be fused.
+    """
+
+    skip = 0
+    for i, (operator, options) in enumerate(stages[start : start + 2]):
+        if not isinstance(options, int) or isinstance(options, bool) or options < 0:
+            return None
+        if operator == '$limit' and options > 0:
+            return skip, options, i + 1
+        if operator != '$skip' or i > 0:
+            return None
+        skip = options
+    return None
+
+
+def process_pipeline(
+    collection: List[Any],
+    database: Database,
+    pipeline: List[Any],
+    session: Any,
+) -> CommandCursor:
+    """
+    Runs aggregation pipeline using optimized handlers where they are
+    available and falling back to mongomock for every other stage.
+    """
+
+    if session:
+        raise NotImplementedError('Mongomock does not handle sessions yet')
+
+    stages = [item for stage in pipeline for item in stage.items()]
+
+    i = 0
+    while i < len(stages):
+        operator, options = stages[i]
+        i += 1
+
+        check_time_limit()
+
+        if operator == '$sort':
+            fused = _get_fused_limit(stages, i)
+            sort = normalize_sort(options) if isinstance(options, dict) else None
+            if fused is not None and sort is not None:
+                skip, limit, consumed = fused
+                collection = top_k(with_time_limit(collection), sort, skip + limit)
+                collection = collection[skip:]
+                i += consumed
+                continue
+
+        handler = _PIPELINE_HANDLERS.get(operator)
+        if handler is None:
+            collection = _run_mongomock_stage(collection, database, {operator: options})
+        else:
+            collection = handler(collection, database, options)
+
+    check_time_limit()
+    return CommandCursor(collection)
+
+
+__all__ = ['process_pipeline']
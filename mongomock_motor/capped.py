@@ -0,0 +1,216 @@
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from mongomock import OperationFailure
+from mongomock.collection import Collection
+from mongomock.filtering import filter_applies
+
+from .cursor_manager import _document_size
+from .indexes import IndexedCollectionStore, indexed_store
+from .typing import DocumentType
+
+# Same as default value of "maxAwaitTimeMS" of tailable await cursors
+DEFAULT_MAX_AWAIT_TIME_MS = 1000
+
+
+class CappedCollectionStore(IndexedCollectionStore):
+    """Store of capped collection, oldest documents are evicted on insert."""
+
+    capped_size: int
+    capped_max: Optional[int]
+    _capped_sizes: Dict[Any, int]
+    _capped_bytes: int
+    _evicted_position: int
+    _waiters: List['asyncio.Future[None]']
+
+    def _reset_capped_state(self, size: int, max: Optional[int]) -> None:
+        self.capped_size = size
+        self.capped_max = max
+        self._capped_sizes = {}
+        self._capped_bytes = 0
+        self._evicted_position = -1
+        self._waiters = []
+        for key, document in self._documents.items():
+            self._account(key, document)
+        self._evict()
+
+    def __setitem__(self, key, val):
+        is_new = key not in self._documents
+        super().__setitem__(key, val)
+        self._account(key, val)
+        if is_new:
+            self._evict()
+            self._wake_up()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._capped_bytes -= self._capped_sizes.pop(key, 0)
+
+    def reindex(self, key: Any, document: DocumentType) -> None:
+        super().reindex(key, document)
+        if self._documents.get(key) is document:
+            self._account(key, document)
+
+    def drop(self):
+        # dropped collection is recreated as a regular one
+        super().drop()
+        self.__class__ = IndexedCollectionStore  # type: ignore
+
+    def get_options(self) -> DocumentType:
+        options: Dict[str, Any] = {'capped': True, 'size': self.capped_size}
+        if self.capped_max:
+            options['max'] = self.capped_max
+        return options
+
+    def is_evicted(self, position: int) -> bool:
+        """Tells whether document at position was removed by eviction."""
+        return position <= self._evicted_position
+
+    def get_inserted_after(self, position: int) -> List[Tuple[int, DocumentType]]:
+        """Returns documents inserted after given position, oldest first."""
+
+        documents = []
+        with self._rwlock.reader():
+            for key in reversed(self._documents):
+                key_position = self._positions[key]
+                if key_position <= position:
+                    break
+                documents.append((key_position, self._documents[key]))
+        documents.reverse()
+        return documents
+
+    async def wait_for_insert(self, timeout: float) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _account(self, key: Any, document: DocumentType) -> None:
+        size = _document_size(document)
+        self._capped_bytes += size - self._capped_sizes.get(key, 0)
+        self._capped_sizes[key] = size
+
+    def _evict(self) -> None:
+        while len(self._documents) > 1 and (
+            self._capped_bytes > self.capped_size
+            or (self.capped_max and len(self._documents) > self.capped_max)
+        ):
+            key = next(iter(self._documents))
+            self._evicted_position = self._positions[key]
+            del self[key]
+
+    def _wake_up(self) -> None:
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(_set_result, waiter)
+
+
+def _set_result(waiter: 'asyncio.Future[None]') -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def validate_capped_options(size: Any, max: Any = None) -> None:
+    if not isinstance(size, int) or size <= 0:
+        raise OperationFailure('specify size:<n> when capped is true', 72)
+    if max is not None and not isinstance(max, int):
+        raise OperationFailure("'max' has to be a number", 14)
+
+
+def make_capped(collection: Collection, size: Any, max: Any = None) -> None:
+    validate_capped_options(size, max)
+
+    store = indexed_store(collection)
+    store.__class__ = CappedCollectionStore
+    store._reset_capped_state(size, max)  # type: ignore
+
+
+def get_capped_store(collection: Collection) -> Optional[CappedCollectionStore]:
+    store = collection._store
+    return store if isinstance(store, CappedCollectionStore) else None
+
+
+class TailableCursor:
+    """Cursor of capped collection that returns documents inserted later."""
+
+    def __init__(self, cursor: Any, await_data: bool) -> None:
+        self.alive = True
+        self._cursor = cursor
+        self._await_data = await_data
+        self._position = -1
+        self._buffer: Deque[DocumentType] = deque()
+
+    def _get_store(self) -> CappedCollectionStore:
+        store = get_capped_store(self._cursor.collection)
+        if store is None:
+            self.alive = False
+            raise OperationFailure(
+                'tailable cursor requested on non capped collection', 2
+            )
+        return store
+
+    def _poll(self, store: CappedCollectionStore) -> None:
+        # documents deleted otherwise don't invalidate position of cursor
+        if self._position >= 0 and store.is_evicted(self._position):
+            self.alive = False
+            raise OperationFailure(
+                'CollectionScan died due to position in capped collection '
+                'being deleted',
+                136,
+            )
+
+        collection = self._cursor.collection
+        for position, document in store.get_inserted_after(self._position):
+            self._position = position
+            if filter_applies(self._cursor._spec, document):
+                self._buffer.append(
+                    collection._copy_only_fields(
+                        document, self._cursor._projection, dict
+                    )
+                )
+
+    async def next(self) -> DocumentType:
+        if not self.alive:
+            raise StopAsyncIteration()
+
+        store = self._get_store()
+        if not self._buffer:
+            self._poll(store)
+
+        if not self._buffer and self._await_data:
+            max_await_time_ms = self._cursor._max_await_time_ms
+            if max_await_time_ms is None:
+                max_await_time_ms = DEFAULT_MAX_AWAIT_TIME_MS
+            await store.wait_for_insert(max_await_time_ms / 1000)
+            self._poll(store)
+
+        if not self._buffer:
+            raise StopAsyncIteration()
+
+        return self._buffer.popleft()
+
+    def to_list(self) -> List[DocumentType]:
+        if self.alive:
+            self._poll(self._get_store())
+        documents = list(self._buffer)
+        self._buffer.clear()
+        return documents
+
+    def close(self) -> None:
+        self.alive = False
+        self._buffer.clear()
+
+
+__all__ = [
+    'CappedCollectionStore',
+    'TailableCursor',
+    'get_capped_store',
+    'make_capped',
+    'validate_capped_options',
+]
@@ -0,0 +1,258 @@
+import copy
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from mongomock import helpers
+from mongomock.collection import (
+    _combine_projection_spec,
+    _copy_field,
+    _current_date_updater,
+    _project_by_spec,
+    _set_updater,
+    _unset_updater,
+    _updaters,
+)
+from pymongo.errors import WriteError
+
+from .indexes import _hashable
+
+_CACHE_SIZE = 256
+
+# Operators that "mongomock" applies field by field without looking at
+# other operators of the same update document.
+_FIELD_UPDATERS: Dict[str, Callable] = {
+    **_updaters,
+    '$setOnInsert': _set_updater,
+    '$currentDate': _current_date_updater,
+}
+
+# Operators that are applied by "mongomock" itself, one at a time.
+_OTHER_OPERATORS = {'$rename', '$addToSet', '$pull', '$pullAll', '$push'}
+
+
+class _ShapeCache:
+    """Small LRU cache of compiled specs keyed by their shape."""
+
+    def __init__(self, size: int) -> None:
+        self._size = size
+        self._items: 'OrderedDict[Hashable, Any]' = OrderedDict()
+
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        try:
+            self._items.move_to_end(key)
+            return self._items[key]
+        except KeyError:
+            pass
+
+        value = self._items[key] = factory()
+        if len(self._items) > self._size:
+            self._items.popitem(last=False)
+        return value
+
+
+class Projection(NamedTuple):
+    spec: Optional[Dict[str, Any]]
+    is_include: bool
+    is_flat: bool
+    id_value: Any
+    operators: Dict[str, Any]
+
+    def apply(self, collection: Any, document: Any, container: Any) -> Any:
+        result: Any
+        if self.spec is None:
+            if self.id_value == 1:
+                result = container()
+            else:
+                result = _copy_field(document, container)
+        elif self.is_flat:
+            spec, is_include = self.spec, self.is_include
+            result = container()
+            for key, value in document.items():
+                if (key in spec) is is_include:
+                    result[key] = _copy_field(value, container)
+        else:
+            result = _project_by_spec(document, self.spec, self.is_include, container)
+
+        if self.id_value == 0:
+            result.pop('_id', None)
+        elif '_id' in document:
+            result['_id'] = document['_id']
+
+        if self.operators:
+            collection._apply_projection_operators(self.operators, document, result)
+
+        return result
+
+
+def _compile_projection(collection: Any, fields: Any) -> Projection:
+    if not fields:
+        fields = {'_id': 1}
+    if not isinstance(fields, dict):
+        fields = helpers.fields_list_to_dict(fields)
+
+    fields = dict(fields)
+    id_value = fields.pop('_id', 1)
+    operators = collection._extract_projection_operators(fields)
+
+    if len(set(fields.values())) > 1:
+        raise ValueError('You cannot currently mix including and excluding fields.')
+
+    if not fields:
+        return Projection(None, False, False, id_value, operators)
+
+    spec = _combine_projection_spec(fields)
+    is_include = bool(next(iter(fields.values())))
+    is_flat = '$' not in spec and not any(isinstance(v, dict) for v in spec.values())
+    return Projection(spec, is_include, is_flat, id_value, operators)
+
+
+_projections = _ShapeCache(_CACHE_SIZE)
+
+
+def compile_projection(collection: Any, fields: Any) -> Projection:
+    """
+    Returns projection compiled once for all documents with the same
+    projection shape. Fields passed as list and as dict are different shapes.
+    """
+
+    return _projections.get(
+        _hashable(fields),
+        lambda: _compile_projection(collection, fields),
+    )
+
+
+def _assign(document: Any, field_name: str, value: Any) -> None:
+    # same as "_set_updater" without validation, values are validated once
+    if isinstance(value, (dict, list, tuple)):
+        value = copy.deepcopy(value)
+    if isinstance(document, dict):
+        document[field_name] = value
+    elif isinstance(document, list):
+        field_index = int(field_name)
+        if field_index < 0:
+            raise WriteError('Negative index provided')
+        len_diff = field_index - (len(document) - 1)
+        if len_diff > 0:
+            document += [None] * len_diff
+        document[field_index] = value
+
+
+def _resolve_parent(document: Any, parts: Tuple[str, ...], updater: Callable) -> Any:
+    # same as "_update_document_single_field" with already split path
+    for part in parts:
+        if isinstance(document, list):
+            try:
+                document = document[int(part)]
+                continue
+            except ValueError:
+                pass
+        elif isinstance(document, dict):
+            if updater is _unset_updater and part not in document:
+                return None
+            document = document.setdefault(part, {})
+        else:
+            return None
+    return document
+
+
+class _Mutator(NamedTuple):
+    field: str
+    parents: Tuple[str, ...]
+    name: str
+    updater: Callable
+
+
+# (operator, mutators); mutators are None for operators applied by "mongomock"
+_UpdateShape = List[Tuple[str, Optional[List[_Mutator]]]]
+
+
+def _compile_update_shape(document: Dict[str, Any]) -> _UpdateShape:
+    steps: _UpdateShape = []
+    for operator, fields in document.items():
+        if operator not in _FIELD_UPDATERS:
+            steps.append((operator, None))
+            continue
+
+        updater = _FIELD_UPDATERS[operator]
+        mutators = []
+        for field in fields:
+            *parents, name = field.split('.')
+            mutators.append(_Mutator(field, tuple(parents), name, updater))
+        steps.append((operator, mutators))
+    return steps
+
+
+def _get_update_shape_key(document: Any) -> Optional[Hashable]:
+    if not isinstance(document, dict) or not document:
+        return None
+
+    key = []
+    for operator, fields in document.items():
+        if operator not in _FIELD_UPDATERS and operator not in _OTHER_OPERATORS:
+            return None
+        if not isinstance(fields, dict):
+            return None
+        if operator in _FIELD_UPDATERS and any('$' in field for field in fields):
+            # positional updates depend on matched array elements
+            return None
+        key.append((operator, tuple(fields)))
+    return tuple(key)
+
+
+_updates = _ShapeCache(_CACHE_SIZE)
+
+
+class Update:
+    """Update document with mutators compiled for its shape."""
+
+    def __init__(self, document: Dict[str, Any], shape: _UpdateShape) -> None:
+        self.document = document
+        self.shape = shape
+
+        # values are validated once instead of once per updated document
+        for operator, mutators in shape:
+            if operator == '$set' and mutators:
+                for mutator in mutators:
+                    _set_updater({}, mutator.name, document[operator][mutator.field])
+
+    def apply(
+        self,
+        existing_document: Any,
+        was_insert: bool,
+        fallback: Callable[[Any, Dict[str, Any]], Any],
+    ) -> None:
+        for operator, mutators in self.shape:
+            values = self.document[operator]
+
+            if mutators is None:
+                fallback(existing_document, {operator: values})
+                continue
+
+            if operator == '$setOnInsert' and not was_insert:
+                continue
+
+            for field, parents, name, updater in mutators:
+                parent = _resolve_parent(existing_document, parents, updater)
+                if parent is None:
+                    continue
+                if operator == '$set':
+                    _assign(parent, name, values[field])
+                else:
+                    updater(parent, name, values[field])
+
+
+def compile_update(document: Any) -> Optional[Update]:
+    """
+    Returns update with mutators compiled once for all update documents with
+    the same shape (operators and fields) or None if update can't be compiled
+    (e.g. positional or replacement updates).
+    """
+
+    key = _get_update_shape_key(document)
+    if key is None:
+        return None
+
+    return Update(document, _updates.get(key, lambda: _compile_update_shape(document)))
+
+
+__all__ = ['Projection', 'Update', 'compile_projection', 'compile_update']
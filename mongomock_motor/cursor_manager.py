@@ -0,0 +1,297 @@
+import itertools
+import sys
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import bson
+from pymongo.errors import CursorNotFound, ExecutionTimeout
+
+from .time_limits import TimeLimit
+
+DEFAULT_BATCH_SIZE = 101
+
+# Same as default value of "cursorTimeoutMillis" server parameter
+CURSOR_TIMEOUT = 600.0
+
+# Idle cursors are looked for this many times per timeout
+_SWEEPS_PER_TIMEOUT = 10
+
+
+def _document_size(document: Any) -> int:
+    try:
+        return len(bson.encode(document))
+    except Exception:
+        return sys.getsizeof(document)
+
+
+class _ServerCursor:
+    __slots__ = (
+        'namespace',
+        'source',
+        'batch_size',
+        'no_cursor_timeout',
+        'last_used',
+        'batch',
+        'is_exhausted',
+        'is_fetched',
+        'time_limit',
+    )
+
+    def __init__(
+        self,
+        namespace: str,
+        source: Iterator[Any],
+        batch_size: int,
+        no_cursor_timeout: bool,
+        last_used: float,
+        time_limit: Optional[TimeLimit],
+    ) -> None:
+        self.namespace = namespace
+        self.source = source
+        self.batch_size = batch_size
+        self.no_cursor_timeout = no_cursor_timeout
+        self.last_used = last_used
+        self.batch: Deque[Any] = deque()
+        self.is_exhausted = False
+        self.is_fetched = False
+        self.time_limit = time_limit
+
+
+class CursorManager:
+    """Keeps cursors opened by client, so results are produced in batches."""
+
+    def __init__(
+        self,
+        timeout: float = CURSOR_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.timeout = timeout
+        self.clock = clock
+        self._cursors: Dict[int, _ServerCursor] = {}
+        self._next_sweep: Optional[float] = None
+        self._ids = itertools.count(1)
+        self.get_mores = 0
+
+    @property
+    def open_cursors(self) -> int:
+        self._kill_idle()
+        return len(self._cursors)
+
+    @property
+    def buffered_bytes(self) -> int:
+        self._kill_idle()
+        return sum(
+            _document_size(document)
+            for cursor in self._cursors.values()
+            for document in cursor.batch
+        )
+
+    def open(
+        self,
+        source: Iterator[Any],
+        namespace: str = '',
+        batch_size: int = 0,
+        no_cursor_timeout: bool = False,
+        max_time_ms: Optional[int] = None,
+    ) -> int:
+        self._sweep(self.clock())
+        cursor_id = next(self._ids)
+        self._cursors[cursor_id] = _ServerCursor(
+            namespace,
+            source,
+            batch_size,
+            no_cursor_timeout,
+            self.clock(),
+            TimeLimit(max_time_ms) if max_time_ms else None,
+        )
+        return cursor_id
+
+    def is_alive(self, cursor_id: int) -> bool:
+        try:
+            self._get_cursor(cursor_id)
+        except CursorNotFound:
+            return False
+        return True
+
+    def get_namespace(self, cursor_id: int) -> str:
+        return self._get_cursor(cursor_id).namespace
+
+    def next(self, cursor_id: int) -> Tuple[int, Any]:
+        """Returns id of the cursor (0 once exhausted) and its next document."""
+
+        cursor = self._get_cursor(cursor_id)
+        if not cursor.batch:
+            self._fetch(cursor_id, cursor, cursor.batch_size)
+        if not cursor.batch:
+            self._forget(cursor_id)
+            raise StopIteration
+
+        document = cursor.batch.popleft()
+        if not cursor.batch and cursor.is_exhausted:
+            self._forget(cursor_id)
+            return 0, document
+
+        return cursor_id, document
+
+    def get_more(self, cursor_id: int, batch_size: int = 0) -> Tuple[int, List[Any]]:
+        """
+        Returns id of the cursor (0 when cursor is exhausted) and next batch
+        of documents, same as "getMore" command does.
+        """
+
+        cursor = self._get_cursor(cursor_id)
+        batch_size = batch_size or cursor.batch_size or DEFAULT_BATCH_SIZE
+        if len(cursor.batch) < batch_size:
+            self._fetch(cursor_id, cursor, batch_size - len(cursor.batch))
+
+        documents = []
+        while cursor.batch and len(documents) < batch_size:
+            documents.append(cursor.batch.popleft())
+
+        if not cursor.batch and cursor.is_exhausted:
+            self._forget(cursor_id)
+            return 0, documents
+
+        return cursor_id, documents
+
+    def kill(self, cursor_ids: Iterable[int]) -> Tuple[List[int], List[int]]:
+        """Returns lists of killed and not found cursors ids."""
+
+        self._sweep(self.clock())
+        killed, not_found = [], []
+        for cursor_id in cursor_ids:
+            if cursor_id in self._cursors:
+                self._forget(cursor_id)
+                killed.append(cursor_id)
+            else:
+                not_found.append(cursor_id)
+        return killed, not_found
+
+    def _get_cursor(self, cursor_id: int) -> _ServerCursor:
+        now = self.clock()
+        self._sweep(now)
+
+        cursor = self._cursors.get(cursor_id)
+        if cursor is not None and self._is_idle(cursor, now - self.timeout):
+            self._forget(cursor_id)
+            cursor = None
+        if cursor is None:
+            raise CursorNotFound(f'cursor id {cursor_id} not found', 43)
+        return cursor
+
+    def _fetch(self, cursor_id: int, cursor: _ServerCursor, count: int) -> None:
+        if cursor.is_fetched:
+            self.get_mores += 1
+        cursor.is_fetched = True
+
+        if cursor.time_limit is None:
+            self._fetch_batch(cursor, count)
+            return
+
+        try:
+            with cursor.time_limit.running():
+                self._fetch_batch(cursor, count)
+        except ExecutionTimeout:
+            self._forget(cursor_id)
+            raise
+
+    def _fetch_batch(self, cursor: _ServerCursor, count: int) -> None:
+        count = count or DEFAULT_BATCH_SIZE
+        for document in itertools.islice(cursor.source, count):
+            cursor.batch.append(document)
+            count -= 1
+        cursor.is_exhausted = count > 0
+        cursor.last_used = self.clock()
+
+    def _forget(self, cursor_id: int) -> None:
+        cursor = self._cursors.pop(cursor_id)
+        cursor.batch.clear()
+
+        # let source release results it holds
+        close = getattr(cursor.source, 'close', None)
+        if close is not None:
+            close()
+
+    def _is_idle(self, cursor: _ServerCursor, deadline: float) -> bool:
+        return not cursor.no_cursor_timeout and cursor.last_used < deadline
+
+    def _sweep(self, now: float) -> None:
+        if self._next_sweep is None or now >= self._next_sweep:
+            self._kill_idle(now)
+
+    def _kill_idle(self, now: Optional[float] = None) -> None:
+        if now is None:
+            now = self.clock()
+        self._next_sweep = now + self.timeout / _SWEEPS_PER_TIMEOUT
+
+        deadline = now - self.timeout
+        for cursor_id, cursor in list(self._cursors.items()):
+            if self._is_idle(cursor, deadline):
+                self._forget(cursor_id)
+
+
+class ManagedCursor:
+    """
+    Client side of cursor, which is opened in manager on first fetch and
+    killed when closed.
+    """
+
+    def __init__(
+        self,
+        manager: CursorManager,
+        source: Callable[[], Iterator[Any]],
+        namespace: str = '',
+        no_cursor_timeout: bool = False,
+    ) -> None:
+        self.manager = manager
+        self.batch_size = 0
+        self.max_time_ms: Optional[int] = None
+        self.cursor_id: Optional[int] = None
+        self._source = source
+        self._namespace = namespace
+        self._no_cursor_timeout = no_cursor_timeout
+
+    @property
+    def alive(self) -> bool:
+        if self.cursor_id is None:
+            return True
+        return bool(self.cursor_id) and self.manager.is_alive(self.cursor_id)
+
+    def __iter__(self) -> 'ManagedCursor':
+        return self
+
+    def __next__(self) -> Any:
+        if self.cursor_id is None:
+            self.cursor_id = self.manager.open(
+                self._source(),
+                self._namespace,
+                self.batch_size,
+                self._no_cursor_timeout,
+                self.max_time_ms,
+            )
+
+        if not self.cursor_id:
+            raise StopIteration
+
+        try:
+            self.cursor_id, document = self.manager.next(self.cursor_id)
+        except StopIteration:
+            self.cursor_id = 0
+            raise
+
+        return document
+
+    def close(self) -> None:
+        if self.cursor_id:
+            self.manager.kill([self.cursor_id])
+        self.cursor_id = 0
+
+    def rewind(self) -> None:
+        """Kills the cursor, so it's opened again on the next fetch."""
+
+        self.close()
+        self.cursor_id = None
+
+
+__all__ = ['CursorManager', 'ManagedCursor']
@@ -0,0 +1,166 @@
+import copy
+import itertools
+from typing import Any, Iterator, List, Optional
+
+from mongomock import helpers
+from mongomock.collection import Cursor as MongoMockCursor
+
+from .indexes import _distinct_values, _hashable, indexed_store, iter_sorted
+from .sorting import normalize_sort, top_k
+from .text import uses_text_score
+from .time_limits import time_limit, with_time_limit
+
+
+class Cursor(MongoMockCursor):
+    """
+    Cursor that doesn't compute whole result set when only part of it is
+    requested: sorted results with limit are computed with bounded heap and
+    unsorted ones stop scanning as soon as enough documents were found.
+    Sorted results are taken in order from declared index when possible.
+    """
+
+    _bounded_key: Optional[tuple] = None
+    _bounded_results: List[Any]
+    _max_time_ms: Optional[int] = None
+    _max_await_time_ms: Optional[int] = None
+
+    def clone(self) -> 'Cursor':
+        cursor = super().clone()
+        cursor.__class__ = Cursor
+        cursor._max_time_ms = self._max_time_ms  # type: ignore
+        cursor._max_await_time_ms = self._max_await_time_ms  # type: ignore
+        return cursor  # type: ignore
+
+    def max_time_ms(self, max_time_ms: Optional[int]) -> 'Cursor':
+        super().max_time_ms(max_time_ms)
+        self._max_time_ms = max_time_ms
+        return self
+
+    def max_await_time_ms(self, max_await_time_ms: Optional[int]) -> 'Cursor':
+        if max_await_time_ms is not None and not isinstance(max_await_time_ms, int):
+            raise TypeError('max_await_time_ms must be an integer or None')
+        self._max_await_time_ms = max_await_time_ms
+        return self
+
+    @property
+    def alive(self) -> bool:
+        return self._emitted != len(self._compute_results(with_limit_and_skip=True))
+
+    def _compute_results(self, with_limit_and_skip=False):
+        with time_limit(self._max_time_ms):
+            return self._compute_limited_results(with_limit_and_skip)
+
+    def _compute_limited_results(self, with_limit_and_skip):
+        if (
+            not with_limit_and_skip
+            or not (self._limit or self._sort)
+            or uses_text_score(self._spec, self._sort, self._projection)
+        ):
+            return super()._compute_results(with_limit_and_skip)
+
+        # Full results were already computed, no need in computing them again
+        if self._results and self._factory_last_generated_results == self._factory:
+            return super()._compute_results(with_limit_and_skip)
+
+        sort = None
+        if self._sort:
+            sort = normalize_sort(self._sort)
+            if sort is None:
+                return super()._compute_results(with_limit_and_skip)
+
+        key = (self._factory, self._skip, self._limit)
+        if self._bounded_key != key:
+            needed = self._skip + abs(self._limit) if self._limit else None
+            documents = None
+            if sort:
+                # declared index might provide documents in sort order
+                documents = iter_sorted(
+                    indexed_store(self.collection), self._spec, sort
+                )
+                if documents is not None:
+                    documents = with_time_limit(documents)
+                elif needed is None:
+                    return super()._compute_results(with_limit_and_skip)
+                else:
+                    documents = top_k(
+                        self.collection._iter_documents(self._spec), sort, needed
+                    )
+            if documents is None:
+                documents = self.collection._iter_documents(self._spec)
+            documents = list(itertools.islice(documents, needed))
+            self._bounded_results = self._prepare_results(documents[self._skip :])
+            self._bounded_key = key
+
+        return self._bounded_results
+
+    def iter_results(self) -> Iterator[Any]:
+        """
+        Iterates over results without computing all of them in advance when
+        results don't have to be sorted. Results are released when iteration
+        is finished or interrupted.
+        """
+
+        try:
+            if (
+                self._sort
+                or self._emitted
+                or self._results
+                or uses_text_score(self._spec, self._sort, self._projection)
+            ):
+                yield from self
+                return
+
+            stop = self._skip + abs(self._limit) if self._limit else None
+            documents = self.collection._iter_documents(self._spec)
+            for document in itertools.islice(documents, self._skip, stop):
+                yield self._prepare_results([document])[0]
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self._results = None
+        self._bounded_key = None
+        self._bounded_results = []
+
+    def distinct(self, key, session=None):
+        """
+        Answers from declared index over the key when there is no filter and
+        deduplicates values by hashing them according to BSON rules otherwise.
+        """
+
+        if session or not isinstance(key, str):
+            return super().distinct(key, session)
+
+        values = None
+        if not self._spec:
+            index = indexed_store(self.collection).get_index([key])
+            if index is not None:
+                values = index.distinct()
+
+        if values is None:
+            unique = {}
+            for document in self.collection._iter_documents(self._spec):
+                for value in _distinct_values(document, key):
+                    unique.setdefault(_hashable(value), value)
+            values = unique.values()
+
+        # values are taken from stored documents, so they must not be shared
+        return [
+            copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+            for value in values
+        ]
+
+    def _prepare_results(self, documents: List[Any]) -> List[Any]:
+        results = [
+            self.collection._copy_only_fields(document, self._projection, dict)
+            for document in documents
+        ]
+        if self.collection.codec_options.tz_aware:
+            results = [
+                helpers.make_datetime_timezone_aware_in_document(result)
+                for result in results
+            ]
+        return results
+
+
+__all__ = ['Cursor']
@@ -0,0 +1,733 @@
+import copy
+import heapq
+import itertools
+import math
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from mongomock import OperationFailure
+from mongomock.filtering import filter_applies
+
+from .typing import DocumentType
+
+if TYPE_CHECKING:
+    from .indexes import IndexedCollectionStore
+
+# Same radius of the Earth (in meters) as used by server for GeoJSON queries
+EARTH_RADIUS = 6378100.0
+
+# Maximum amount of points kept in a leaf of the tree before it's split
+NODE_CAPACITY = 32
+
+# Leafs aren't split deeper than that, so equal points don't split forever
+MAX_DEPTH = 24
+
+GEO_INDEX_TYPES = ('2dsphere', '2d')
+GEO_OPERATORS = ('$near', '$nearSphere', '$geoWithin', '$within', '$geoIntersects')
+
+Point = Tuple[float, float]
+Ring = List[Point]
+Bounds = Tuple[float, float, float, float]
+
+
+class Shape(NamedTuple):
+    """Stored geometry: its vertices and polygons (lists of rings)."""
+
+    points: List[Point]
+    polygons: List[List[Ring]]
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def parse_point(value: Any) -> Optional[Point]:
+    """Parses GeoJSON point, legacy coordinate pair or embedded document."""
+
+    if isinstance(value, dict):
+        if 'type' in value:
+            if value['type'] != 'Point':
+                return None
+            value = value.get('coordinates')
+        else:
+            value = list(value.values())
+
+    if (
+        isinstance(value, (list, tuple))
+        and len(value) >= 2
+        and _is_number(value[0])
+        and _is_number(value[1])
+    ):
+        return (float(value[0]), float(value[1]))
+
+    return None
+
+
+def _parse_ring(value: Any) -> Ring:
+    if not isinstance(value, (list, tuple)):
+        raise OperationFailure('invalid geometry: ring must be an array', 2)
+    ring = [parse_point(point) for point in value]
+    if len(ring) < 3 or any(point is None for point in ring):
+        raise OperationFailure('invalid geometry: ring must have 3+ points', 2)
+    return ring  # type: ignore
+
+
+def parse_shape(value: Any) -> Optional[Shape]:
+    point = parse_point(value)
+    if point is not None:
+        return Shape([point], [])
+
+    if not isinstance(value, dict):
+        return None
+
+    kind = value.get('type')
+    coordinates: Any = value.get('coordinates')
+    try:
+        if kind in ('MultiPoint', 'LineString'):
+            return Shape([parse_point(point) for point in coordinates], [])  # type: ignore
+        if kind == 'MultiLineString':
+            points = [parse_point(point) for line in coordinates for point in line]
+            return Shape(points, [])  # type: ignore
+        if kind in ('Polygon', 'MultiPolygon'):
+            polygons = coordinates if kind == 'MultiPolygon' else [coordinates]
+            polygons = [[_parse_ring(ring) for ring in rings] for rings in polygons]
+            points = [point for rings in polygons for point in rings[0]]
+            return Shape(points, polygons)
+        if kind == 'GeometryCollection':
+            shapes = [parse_shape(item) for item in value.get('geometries', [])]
+            return Shape(
+                [point for shape in shapes if shape for point in shape.points],
+                [polygon for shape in shapes if shape for polygon in shape.polygons],
+            )
+    except (OperationFailure, TypeError):
+        return None
+
+    return None
+
+
+def _iter_field_values(value: Any, parts: List[str]) -> Iterator[Any]:
+    if not parts:
+        yield value
+        return
+
+    if isinstance(value, dict):
+        if parts[0] in value:
+            yield from _iter_field_values(value[parts[0]], parts[1:])
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_field_values(item, parts)
+
+
+def get_shapes(document: DocumentType, field: str) -> List[Shape]:
+    """Returns geometries stored in (possibly dotted) field of document."""
+
+    shapes = []
+    for value in _iter_field_values(document, field.split('.')):
+        shape = parse_shape(value)
+        if shape is not None:
+            shapes.append(shape)
+        elif isinstance(value, (list, tuple)):
+            shapes.extend(filter(None, map(parse_shape, value)))
+    return shapes
+
+
+def planar_distance(a: Point, b: Point) -> float:
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def spherical_distance(a: Point, b: Point) -> float:
+    """Returns angle (in radians) between points given as (lng, lat)."""
+
+    lng1, lat1, lng2, lat2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * math.asin(min(1.0, math.sqrt(h)))
+
+
+def _unit_vector(lng: float, lat: float) -> Tuple[float, float, float]:
+    lng, lat = math.radians(lng), math.radians(lat)
+    return (math.cos(lat) * math.cos(lng), math.cos(lat) * math.sin(lng), math.sin(lat))
+
+
+def _spherical_box(bounds: Bounds) -> List[Tuple[float, float]]:
+    """Returns 3D bounding box of the part of unit sphere within bounds."""
+
+    lng1, lat1, lng2, lat2 = bounds
+    lat1, lat2 = max(lat1, -90.0), min(lat2, 90.0)
+    lngs = [lng1, lng2] + [lng for lng in range(-180, 181, 90) if lng1 < lng < lng2]
+    lats = [lat1, lat2] + ([0.0] if lat1 < 0 < lat2 else [])
+    vectors = [_unit_vector(lng, lat) for lng in lngs for lat in lats]
+    return [(min(axis), max(axis)) for axis in zip(*vectors)]
+
+
+def _box_distance(point: Iterable[float], box: Iterable[Tuple[float, float]]) -> float:
+    return math.sqrt(
+        sum(
+            max(low - value, 0.0, value - high) ** 2
+            for value, (low, high) in zip(point, box)
+        )
+    )
+
+
+class _Node:
+    __slots__ = ('bounds', 'entries', 'children', 'count', 'depth', 'box')
+
+    def __init__(self, bounds: Bounds, depth: int) -> None:
+        self.bounds = bounds
+        self.entries: List[Tuple[float, float, Any]] = []
+        self.children: Optional[List['_Node']] = None
+        self.count = 0
+        self.depth = depth
+        self.box: Optional[List[Tuple[float, float]]] = None
+
+    def child_for(self, x: float, y: float) -> '_Node':
+        assert self.children is not None
+        x1, y1, x2, y2 = self.bounds
+        return self.children[(x >= (x1 + x2) / 2) * 2 + (y >= (y1 + y2) / 2)]
+
+    def split(self) -> None:
+        x1, y1, x2, y2 = self.bounds
+        mx, my = (x1 + x2) / 2, (y1 + y2) / 2
+        self.children = [
+            _Node((x1, y1, mx, my), self.depth + 1),
+            _Node((x1, my, mx, y2), self.depth + 1),
+            _Node((mx, y1, x2, my), self.depth + 1),
+            _Node((mx, my, x2, y2), self.depth + 1),
+        ]
+        entries, self.entries = self.entries, []
+        for entry in entries:
+            child = self.child_for(entry[0], entry[1])
+            child.entries.append(entry)
+            child.count += 1
+
+
+class QuadTree:
+    """
+    Bucket point quadtree. Nodes are split into quadrants once they hold
+    more than NODE_CAPACITY points, so dense areas are split deeper.
+    """
+
+    def __init__(self, bounds: Bounds) -> None:
+        self.bounds = bounds
+        self.root = _Node(bounds, 0)
+
+    def contains(self, x: float, y: float) -> bool:
+        x1, y1, x2, y2 = self.bounds
+        return x1 <= x <= x2 and y1 <= y <= y2
+
+    def insert(self, x: float, y: float, key: Any) -> None:
+        node = self.root
+        while True:
+            node.count += 1
+            if node.children is None:
+                break
+            node = node.child_for(x, y)
+
+        node.entries.append((x, y, key))
+        if len(node.entries) > NODE_CAPACITY and node.depth < MAX_DEPTH:
+            node.split()
+
+    def remove(self, x: float, y: float, key: Any) -> None:
+        path = [self.root]
+        while path[-1].children is not None:
+            path.append(path[-1].child_for(x, y))
+
+        entries = path[-1].entries
+        for i, entry in enumerate(entries):
+            if entry[2] == key and entry[0] == x and entry[1] == y:
+                del entries[i]
+                for node in path:
+                    node.count -= 1
+                return
+
+    def search(self, bounds: Bounds) -> Iterator[Tuple[float, float, Any]]:
+        """Yields points within bounds."""
+
+        qx1, qy1, qx2, qy2 = bounds
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            x1, y1, x2, y2 = node.bounds
+            if not node.count or x1 > qx2 or x2 < qx1 or y1 > qy2 or y2 < qy1:
+                continue
+            if node.children is not None:
+                stack.extend(node.children)
+                continue
+            for entry in node.entries:
+                if qx1 <= entry[0] <= qx2 and qy1 <= entry[1] <= qy2:
+                    yield entry
+
+    def nearest(
+        self,
+        distance: Callable[[float, float], float],
+        lower_bound: Callable[[_Node], float],
+        extra: Iterable[Tuple[float, Any]] = (),
+    ) -> Iterator[Tuple[float, Any]]:
+        """Yields (distance, key) pairs in order of increasing distance."""
+
+        sequence = itertools.count()
+        heap: List[Tuple[float, int, bool, Any]] = [
+            (value, next(sequence), False, key) for value, key in extra
+        ]
+        heap.append((0.0, next(sequence), True, self.root))
+        heapq.heapify(heap)
+
+        while heap:
+            value, _, is_node, item = heapq.heappop(heap)
+            if not is_node:
+                yield value, item
+                continue
+            if item.children is not None:
+                for child in item.children:
+                    if child.count:
+                        heapq.heappush(
+                            heap, (lower_bound(child), next(sequence), True, child)
+                        )
+                continue
+            for x, y, key in item.entries:
+                heapq.heappush(heap, (distance(x, y), next(sequence), False, key))
+
+
+def is_geo_index(spec: DocumentType) -> bool:
+    return any(kind in GEO_INDEX_TYPES for _, kind in spec['key'])
+
+
+class GeoIndex:
+    """Spatial index over geometries of a field."""
+
+    def __init__(self, spec: DocumentType):
+        self.spec = spec
+        self.field, kind = next(
+            (field, kind) for field, kind in spec['key'] if kind in GEO_INDEX_TYPES
+        )
+        self.is_spherical = kind == '2dsphere'
+        if self.is_spherical:
+            bounds = (-180.0, -90.0, 180.0, 90.0)
+        else:
+            low, high = float(spec.get('min', -180)), float(spec.get('max', 180))
+            bounds = (low, low, high, high)
+        self._tree = QuadTree(bounds)
+        self._entries: Dict[Any, List[Point]] = {}
+        self._others: Dict[Any, List[Shape]] = {}
+
+    @classmethod
+    def build(
+        cls,
+        items: Iterable[Tuple[Any, DocumentType]],
+        spec: DocumentType,
+    ) -> 'GeoIndex':
+        index = cls(spec)
+        for key, document in items:
+            index.add(key, document)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self._others)
+
+    def add(self, key: Any, document: DocumentType) -> None:
+        self.remove(key)
+
+        shapes = get_shapes(document, self.field)
+        if not shapes:
+            return
+
+        points = [point for shape in shapes for point in shape.points]
+        if any(shape.polygons for shape in shapes) or not all(
+            self._tree.contains(*point) for point in points
+        ):
+            self._others[key] = shapes
+            return
+
+        self._entries[key] = points
+        for x, y in points:
+            self._tree.insert(x, y, key)
+
+    def remove(self, key: Any) -> None:
+        self._others.pop(key, None)
+        for x, y in self._entries.pop(key, ()):
+            self._tree.remove(x, y, key)
+
+    def near(self, center: Point, is_spherical: bool) -> Iterator[Tuple[float, Any]]:
+        """Yields (distance, key) pairs of documents by increasing distance."""
+
+        if is_spherical:
+            vector = _unit_vector(*center)
+
+            def distance(x: float, y: float) -> float:
+                return spherical_distance(center, (x, y))
+
+            def lower_bound(node: _Node) -> float:
+                if node.box is None:
+                    node.box = _spherical_box(node.bounds)
+                chord = _box_distance(vector, node.box)
+                return 2 * math.asin(min(1.0, chord / 2))
+
+        else:
+
+            def distance(x: float, y: float) -> float:
+                return planar_distance(center, (x, y))
+
+            def lower_bound(node: _Node) -> float:
+                x1, y1, x2, y2 = node.bounds
+                return _box_distance(center, [(x1, x2), (y1, y2)])
+
+        extra = []
+        for key, shapes in self._others.items():
+            points = [point for shape in shapes for point in shape.points]
+            if points:
+                extra.append((min(distance(*point) for point in points), key))
+
+        seen = set()
+        for value, key in self._tree.nearest(distance, lower_bound, extra):
+            if key not in seen:
+                seen.add(key)
+                yield value, key
+
+    def candidates(self, bounds: Optional[Bounds]) -> Dict[Any, None]:
+        """Returns keys of documents which might be within bounds."""
+
+        keys: Dict[Any, None] = dict.fromkeys(self._others)
+        if bounds is None:
+            keys.update(dict.fromkeys(self._entries))
+        else:
+            keys.update((key, None) for _, _, key in self._tree.search(bounds))
+        return keys
+
+
+def _in_ring(point: Point, ring: Ring) -> bool:
+    x, y = point
+    inside = False
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+            inside = not inside
+    return inside
+
+
+def _in_polygons(point: Point, polygons: List[List[Ring]]) -> bool:
+    return any(
+        _in_ring(point, rings[0])
+        and not any(_in_ring(point, hole) for hole in rings[1:])
+        for rings in polygons
+    )
+
+
+class Region:
+    """
+    Region of "$geoWithin" or "$geoIntersects" query. Edges of polygons are
+    treated as straight lines in coordinate space.
+    """
+
+    def __init__(
+        self,
+        bounds: Optional[Bounds],
+        contains: Callable[[Point], bool],
+        probes: List[Point],
+    ) -> None:
+        self.bounds = bounds
+        self.contains = contains
+        self.probes = probes
+
+    @classmethod
+    def polygons(cls, polygons: List[List[Ring]]) -> 'Region':
+        points = [point for rings in polygons for point in rings[0]]
+        xs, ys = [x for x, _ in points], [y for _, y in points]
+        return cls(
+            (min(xs), min(ys), max(xs), max(ys)),
+            lambda point: _in_polygons(point, polygons),
+            points,
+        )
+
+    @classmethod
+    def circle(cls, center: Point, radius: float, is_spherical: bool) -> 'Region':
+        if not is_spherical:
+            x, y = center
+            return cls(
+                (x - radius, y - radius, x + radius, y + radius),
+                lambda point: planar_distance(center, point) <= radius,
+                [center],
+            )
+
+        lng, lat = center
+        delta = math.degrees(radius)
+        bounds = None
+        if abs(lat) + delta < 90 and math.sin(radius) < math.cos(math.radians(lat)):
+            delta_lng = math.degrees(
+                math.asin(math.sin(radius) / math.cos(math.radians(lat)))
+            )
+            if -180 <= lng - delta_lng and lng + delta_lng <= 180:
+                bounds = (lng - delta_lng, lat - delta, lng + delta_lng, lat + delta)
+        return cls(
+            bounds,
+            lambda point: spherical_distance(center, point) <= radius,
+            [center],
+        )
+
+    def matches(self, shapes: List[Shape], operator: str) -> bool:
+        if not shapes:
+            return False
+        if operator == '$geoIntersects':
+            return any(
+                any(map(self.contains, shape.points))
+                or any(_in_polygons(probe, shape.polygons) for probe in self.probes)
+                for shape in shapes
+            )
+        return all(all(map(self.contains, shape.points)) for shape in shapes)
+
+
+def _parse_geometry_region(geometry: Any) -> Region:
+    point = parse_point(geometry)
+    if point is not None:
+        return Region(
+            (point[0], point[1], point[0], point[1]),
+            lambda other: other == point,
+            [point],
+        )
+
+    shape = parse_shape(geometry) if isinstance(geometry, dict) else None
+    if shape is None or not shape.polygons:
+        raise OperationFailure('$geometry must be a Point, Polygon or MultiPolygon', 2)
+    return Region.polygons(shape.polygons)
+
+
+def parse_region(operator: str, argument: Any) -> Region:
+    if not isinstance(argument, dict) or len(argument) != 1:
+        raise OperationFailure(f'{operator} must be an object with one shape', 2)
+
+    kind, value = next(iter(argument.items()))
+    if kind == '$geometry':
+        return _parse_geometry_region(value)
+    if operator == '$geoIntersects':
+        raise OperationFailure('$geoIntersects requires $geometry', 2)
+
+    if kind == '$box':
+        corners = [parse_point(corner) for corner in value]
+        if len(corners) != 2 or None in corners:
+            raise OperationFailure('$box requires two points', 2)
+        (x1, y1), (x2, y2) = corners  # type: ignore
+        bounds = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        return Region(
+            bounds,
+            lambda point: (
+                bounds[0] <= point[0] <= bounds[2]
+                and bounds[1] <= point[1] <= bounds[3]
+            ),
+            [corners[0]],  # type: ignore
+        )
+    if kind == '$polygon':
+        return Region.polygons([[_parse_ring(value)]])
+    if kind in ('$center', '$centerSphere'):
+        center = parse_point(value[0]) if isinstance(value, (list, tuple)) else None
+        if center is None or len(value) != 2 or not _is_number(value[1]):
+            raise OperationFailure(f'{kind} requires a point and a radius', 2)
+        return Region.circle(center, float(value[1]), kind == '$centerSphere')
+
+    raise OperationFailure(f'unknown geo specifier: {kind}', 2)
+
+
+class Near(NamedTuple):
+    """Parsed "$near" query."""
+
+    center: Point
+    is_spherical: bool
+    scale: float
+    min_distance: Optional[float]
+    max_distance: Optional[float]
+
+    @classmethod
+    def parse(
+        cls,
+        near: Any,
+        is_spherical: bool,
+        min_distance: Any = None,
+        max_distance: Any = None,
+    ) -> 'Near':
+        scale = 1.0
+        if isinstance(near, dict) and '$geometry' in near:
+            min_distance = near.get('$minDistance', min_distance)
+            max_distance = near.get('$maxDistance', max_distance)
+            near = near['$geometry']
+
+        center = parse_point(near)
+        if center is None:
+            raise OperationFailure('invalid point in geo near query', 2)
+        if isinstance(near, dict) and near.get('type') == 'Point':
+            is_spherical, scale = True, EARTH_RADIUS
+
+        for value in (min_distance, max_distance):
+            if value is not None and (not _is_number(value) or value < 0):
+                raise OperationFailure('distance must be a non-negative number', 2)
+
+        return cls(center, is_spherical, scale, min_distance, max_distance)
+
+    def iter_keys(self, index: GeoIndex) -> Iterator[Tuple[float, Any]]:
+        """Yields (distance, key) pairs within distance limits."""
+
+        for value, key in index.near(self.center, self.is_spherical):
+            value *= self.scale
+            if self.max_distance is not None and value > self.max_distance:
+                return
+            if self.min_distance is None or value >= self.min_distance:
+                yield value, key
+
+
+def has_geo_condition(filter: Any) -> bool:
+    return isinstance(filter, dict) and any(
+        isinstance(condition, dict) and any(op in condition for op in GEO_OPERATORS)
+        for condition in filter.values()
+    )
+
+
+def _split_geo_condition(
+    filter: DocumentType,
+) -> Tuple[str, str, Dict[str, Any], DocumentType]:
+    for field, condition in filter.items():
+        if isinstance(condition, dict):
+            operator = next((op for op in GEO_OPERATORS if op in condition), None)
+            if operator is not None:
+                break
+    else:
+        raise ValueError('filter has no geo condition')
+
+    options = {
+        key: value
+        for key, value in condition.items()
+        if key in ('$maxDistance', '$minDistance') or key == operator
+    }
+    rest = dict(filter)
+    remaining = {key: value for key, value in condition.items() if key not in options}
+    if remaining:
+        rest[field] = remaining
+    else:
+        del rest[field]
+    return field, operator, options, rest
+
+
+def geo_search(
+    store: 'IndexedCollectionStore',
+    filter: DocumentType,
+) -> Iterator[DocumentType]:
+    """Yields documents matching filter with geo condition."""
+
+    field, operator, options, rest = _split_geo_condition(filter)
+    index = store.get_geo_index(field)
+
+    if operator in ('$near', '$nearSphere'):
+        if index is None:
+            raise OperationFailure('unable to find index for $geoNear query', 291)
+        near = Near.parse(
+            options[operator],
+            operator == '$nearSphere' or index.is_spherical,
+            options.get('$minDistance'),
+            options.get('$maxDistance'),
+        )
+        for _, key in near.iter_keys(index):
+            document = store.get_document(key)
+            if document is not None and filter_applies(rest, document):
+                yield document
+        return
+
+    if operator == '$within':
+        operator = '$geoWithin'
+    region = parse_region(operator, options[operator])
+    if index is None:
+        documents = [document for _, document in store.items()]
+    else:
+        documents = store.documents_by_keys(index.candidates(region.bounds))
+
+    for document in documents:
+        if region.matches(get_shapes(document, field), operator) and filter_applies(
+            rest, document
+        ):
+            yield document
+
+
+def _set_by_dot(document: Dict[str, Any], path: str, value: Any) -> None:
+    *parents, name = path.split('.')
+    for parent in parents:
+        document = document.setdefault(parent, {})
+    document[name] = value
+
+
+def geo_near(
+    store: 'IndexedCollectionStore',
+    options: Any,
+    copy_document: Callable[[DocumentType], Any] = copy.deepcopy,
+) -> List[Any]:
+    """Runs "$geoNear" aggregation stage, returns documents with distances."""
+
+    if not isinstance(options, dict) or 'near' not in options:
+        raise OperationFailure("$geoNear requires a 'near' option", 2)
+    if not isinstance(options.get('distanceField'), str):
+        raise OperationFailure("$geoNear requires a 'distanceField' option", 2)
+
+    if 'key' in options:
+        index = store.get_geo_index(options['key'])
+    else:
+        indexes = store.get_geo_indexes()
+        if len(indexes) > 1:
+            raise OperationFailure(
+                "more than one geo index found, specify 'key' option", 2
+            )
+        index = indexes[0] if indexes else None
+    if index is None:
+        raise OperationFailure(
+            '$geoNear requires a 2d or 2dsphere index, but none were found', 27
+        )
+
+    near = Near.parse(
+        options['near'],
+        bool(options.get('spherical')) or index.is_spherical,
+        options.get('minDistance'),
+        options.get('maxDistance'),
+    )
+    query = options.get('query') or {}
+    multiplier = options.get('distanceMultiplier', 1)
+
+    results = []
+    for distance, key in near.iter_keys(index):
+        document = store.get_document(key)
+        if document is None or not filter_applies(query, document):
+            continue
+        result = copy_document(document)
+        _set_by_dot(result, options['distanceField'], distance * multiplier)
+        if options.get('includeLocs'):
+            shapes = get_shapes(document, index.field)
+            _set_by_dot(result, options['includeLocs'], _closest_location(shapes, near))
+        results.append(result)
+    return results
+
+
+def _closest_location(shapes: List[Shape], near: Near) -> List[float]:
+    distance = spherical_distance if near.is_spherical else planar_distance
+    point = min(
+        (point for shape in shapes for point in shape.points),
+        key=lambda point: distance(near.center, point),
+    )
+    return list(point)
+
+
+__all__ = [
+    'EARTH_RADIUS',
+    'GeoIndex',
+    'Near',
+    'QuadTree',
+    'Region',
+    'geo_near',
+    'geo_search',
+    'get_shapes',
+    'has_geo_condition',
+    'is_geo_index',
+    'parse_region',
+]
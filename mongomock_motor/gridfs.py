@@ -0,0 +1,573 @@
+import importlib
+import io
+import mmap
+import tempfile
+import weakref
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+)
+
+import mongomock
+from bson import ObjectId
+
+from .typing import DocumentType
+
+if TYPE_CHECKING:
+    from . import AsyncCursor, AsyncMongoMockCollection, AsyncMongoMockDatabase
+
+# Same as default chunk size of "gridfs"
+DEFAULT_CHUNK_SIZE = 255 * 1024
+
+
+def _errors() -> Any:
+    # "gridfs" takes a while to import and is only needed for its errors
+    return importlib.import_module('gridfs.errors')
+
+
+class SpillFile:
+    """
+    Temporary file holding chunks of a GridFS file spilled to disk. The file
+    is memory mapped on read, so chunks are served as views over the mapping
+    and are never loaded in memory. File is removed once none of its chunks
+    (or views over them) are referenced.
+    """
+
+    def __init__(self) -> None:
+        self._file = tempfile.TemporaryFile()
+        self._size = 0
+        self._mmap: Optional[mmap.mmap] = None
+
+    def append(self, data: Any) -> 'SpilledChunk':
+        offset = self._size
+        self._file.write(data)
+        self._size += len(data)
+        return SpilledChunk(self, offset, len(data))
+
+    def view(self, offset: int, length: int) -> memoryview:
+        if self._mmap is None or len(self._mmap) < offset + length:
+            self._file.flush()
+            # views over the previous mapping keep it alive
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._mmap)[offset : offset + length]
+
+
+class SpilledChunk:
+    """Payload of GridFS chunk kept in SpillFile."""
+
+    __slots__ = ('spill_file', 'offset', 'length')
+
+    def __init__(self, spill_file: SpillFile, offset: int, length: int) -> None:
+        self.spill_file = spill_file
+        self.offset = offset
+        self.length = length
+
+    def view(self) -> memoryview:
+        return self.spill_file.view(self.offset, self.length)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __bytes__(self) -> bytes:
+        return bytes(self.view())
+
+    def __repr__(self) -> str:
+        return f'SpilledChunk(offset={self.offset}, length={self.length})'
+
+
+# Payloads of spilled chunks by "_id" of chunk documents (which hold empty
+# "data"), per store of chunks collection
+_spilled_chunks: 'weakref.WeakKeyDictionary[Any, Dict[Any, SpilledChunk]]' = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_spilled_chunks(chunks: 'AsyncMongoMockCollection') -> Dict[Any, SpilledChunk]:
+    store: Any = chunks._store
+    spilled = _spilled_chunks.get(store)
+    if spilled is None:
+        spilled = _spilled_chunks[store] = {}
+    return spilled
+
+
+def _chunk_view(chunks: 'AsyncMongoMockCollection', chunk: DocumentType) -> memoryview:
+    spilled = _get_spilled_chunks(chunks).get(chunk['_id'])
+    if spilled is not None and not chunk['data']:
+        return spilled.view()
+    return memoryview(chunk['data'])
+
+
+class GridIn:
+    """
+    File being uploaded to GridFS bucket. Written data is split into chunks
+    by slicing memoryviews over it, only the tail of the data that doesn't
+    fill a whole chunk is buffered until the next write. Once file outgrows
+    spill threshold of the bucket, its chunks are written to SpillFile.
+    """
+
+    def __init__(
+        self,
+        bucket: 'GridFSBucket',
+        file_id: Any,
+        filename: str,
+        chunk_size: int,
+        metadata: Optional[DocumentType] = None,
+    ) -> None:
+        self._id = file_id
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.metadata = metadata
+        self.length = 0
+        self.upload_date = None
+        self.closed = False
+        self._bucket = bucket
+        self._buffer = bytearray()
+        self._chunks_count = 0
+        self._spill_file: Optional[SpillFile] = None
+
+    @property
+    def name(self) -> str:
+        return self.filename
+
+    def get_io_loop(self):
+        return self._bucket.get_io_loop()
+
+    async def write(self, data: Any) -> None:
+        if self.closed:
+            raise ValueError('cannot write to a closed file')
+
+        if hasattr(data, 'read'):
+            while True:
+                piece = data.read(self.chunk_size)
+                if not piece:
+                    break
+                await self._write_view(memoryview(piece))
+            return
+
+        if isinstance(data, str):
+            raise TypeError('can only write bytes-like or file-like objects')
+
+        await self._write_view(memoryview(data))
+
+    async def writelines(self, sequence: Iterable[Any]) -> None:
+        for data in sequence:
+            await self.write(data)
+
+    async def _write_view(self, view: memoryview) -> None:
+        view = view.cast('B')
+        self.length += len(view)
+
+        if self._buffer:
+            size = min(len(view), self.chunk_size - len(self._buffer))
+            self._buffer += view[:size]
+            view = view[size:]
+            if len(self._buffer) == self.chunk_size:
+                await self._write_chunk(self._buffer)
+                self._buffer = bytearray()
+
+        while len(view) >= self.chunk_size:
+            await self._write_chunk(view[: self.chunk_size])
+            view = view[self.chunk_size :]
+
+        if view:
+            self._buffer += view
+
+    async def _write_chunk(self, data: Any) -> None:
+        await self._bucket._ensure_indexes()
+
+        threshold = self._bucket._spill_threshold
+        is_spilled = threshold is not None and self.length > threshold
+        chunk = {
+            '_id': ObjectId(),
+            'files_id': self._id,
+            'n': self._chunks_count,
+            'data': b'' if is_spilled else bytes(data),
+        }
+        await self._bucket._chunks.insert_one(chunk)
+        self._chunks_count += 1
+
+        if is_spilled:
+            if self._spill_file is None:
+                self._spill_file = SpillFile()
+            spilled = _get_spilled_chunks(self._bucket._chunks)
+            spilled[chunk['_id']] = self._spill_file.append(data)
+
+    async def close(self) -> None:
+        if self.closed:
+            return
+
+        if self._buffer:
+            await self._write_chunk(self._buffer)
+            self._buffer = bytearray()
+
+        await self._bucket._ensure_indexes()
+        # mongomock.utcnow is the documented way to mock current time
+        self.upload_date = mongomock.utcnow()  # pyright: ignore[reportAttributeAccessIssue]
+        document = {
+            '_id': self._id,
+            'filename': self.filename,
+            'length': self.length,
+            'chunkSize': self.chunk_size,
+            'uploadDate': self.upload_date,
+        }
+        if self.metadata is not None:
+            document['metadata'] = self.metadata
+        await self._bucket._files.insert_one(document)
+        self.closed = True
+
+    async def abort(self) -> None:
+        await self._bucket._delete_chunks(self._id)
+        self._buffer = bytearray()
+        self.closed = True
+
+    async def __aenter__(self) -> 'GridIn':
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            await self.close()
+        else:
+            await self.abort()
+
+
+class GridOut:
+    """
+    File being downloaded from GridFS bucket. Chunks are fetched one at a
+    time by their number, so the file is never loaded in memory as a whole.
+    """
+
+    def __init__(self, bucket: 'GridFSBucket', document: DocumentType) -> None:
+        self._id = document['_id']
+        self.filename = document.get('filename')
+        self.length = document['length']
+        self.chunk_size = document['chunkSize']
+        self.upload_date = document.get('uploadDate')
+        self.metadata = document.get('metadata')
+        self.content_type = document.get('contentType')
+        self.aliases = document.get('aliases')
+        self._bucket = bucket
+        self._position = 0
+        self._chunk_number = -1
+        self._chunk = memoryview(b'')
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.filename
+
+    def get_io_loop(self):
+        return self._bucket.get_io_loop()
+
+    async def open(self) -> 'GridOut':
+        return self
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            pos += self._position
+        elif whence == io.SEEK_END:
+            pos += self.length
+        elif whence != io.SEEK_SET:
+            raise OSError(22, 'Invalid value for `whence`')
+        if pos < 0:
+            raise OSError(22, 'Invalid value for `pos` - must be positive')
+        self._position = pos
+        return pos
+
+    def _expected_chunk_size(self, n: int) -> int:
+        return min(self.chunk_size, self.length - n * self.chunk_size)
+
+    async def _get_chunk(self, n: int) -> memoryview:
+        if n != self._chunk_number:
+            chunk = await self._bucket._chunks.find_one({'files_id': self._id, 'n': n})
+            if chunk is None:
+                raise _errors().CorruptGridFile(f'no chunk #{n}')
+            data = _chunk_view(self._bucket._chunks, chunk)
+            if len(data) != self._expected_chunk_size(n):
+                raise _errors().CorruptGridFile(
+                    f'truncated chunk #{n}: expected chunk length to be '
+                    f'{self._expected_chunk_size(n)}, but chunk has length {len(data)}'
+                )
+            self._chunk_number, self._chunk = n, data
+        return self._chunk
+
+    async def _read_view(self, size: int) -> memoryview:
+        """Returns view over up to size bytes of the current chunk."""
+
+        if self._position >= self.length:
+            return memoryview(b'')
+        n, offset = divmod(self._position, self.chunk_size)
+        chunk = await self._get_chunk(n)
+        view = chunk[offset : offset + size] if size >= 0 else chunk[offset:]
+        self._position += len(view)
+        return view
+
+    async def readchunk(self) -> bytes:
+        return bytes(await self._read_view(-1))
+
+    async def read(self, size: int = -1) -> bytes:
+        remainder = max(self.length - self._position, 0)
+        if size < 0 or size > remainder:
+            size = remainder
+
+        views: List[memoryview] = []
+        while size > 0:
+            view = await self._read_view(size)
+            views.append(view)
+            size -= len(view)
+        return b''.join(views)
+
+    async def readline(self, size: int = -1) -> bytes:
+        remainder = max(self.length - self._position, 0)
+        if size < 0 or size > remainder:
+            size = remainder
+
+        views: List[memoryview] = []
+        while size > 0:
+            view = await self._read_view(size)
+            end = bytes(view).find(b'\n')
+            if end >= 0:
+                self._position -= len(view) - end - 1
+                views.append(view[: end + 1])
+                break
+            views.append(view)
+            size -= len(view)
+        return b''.join(views)
+
+    async def iter_views(self) -> AsyncIterator[memoryview]:
+        """Yields views over the rest of the file chunk by chunk."""
+
+        while True:
+            view = await self._read_view(-1)
+            if not view:
+                break
+            yield view
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._iter_chunks()
+
+    async def _iter_chunks(self) -> AsyncIterator[bytes]:
+        async for view in self.iter_views():
+            yield bytes(view)
+
+    async def close(self) -> None:
+        self._chunk_number, self._chunk = -1, memoryview(b'')
+
+    async def __aenter__(self) -> 'GridOut':
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+
+class GridOutCursor:
+    """Cursor over files of GridFS bucket yielding GridOut objects."""
+
+    def __init__(self, bucket: 'GridFSBucket', cursor: 'AsyncCursor') -> None:
+        self.__bucket = bucket
+        self.__cursor = cursor
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.__cursor, name)
+        if not callable(attribute):
+            return attribute
+
+        def wrapper(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            return self if result is self.__cursor else result
+
+        return wrapper
+
+    def __aiter__(self) -> 'GridOutCursor':
+        return self
+
+    async def next(self) -> GridOut:
+        return GridOut(self.__bucket, await self.__cursor.next())
+
+    __anext__ = next
+
+    async def to_list(self, *args, **kwargs) -> List[GridOut]:
+        documents = await self.__cursor.to_list(*args, **kwargs)
+        return [GridOut(self.__bucket, document) for document in documents]
+
+
+class GridFSBucket:
+    """
+    GridFS bucket over "<bucket_name>.files" and "<bucket_name>.chunks"
+    collections of the database, same as the one of "gridfs". Chunks are
+    looked up by unique index over "files_id" and "n". With spill threshold
+    set, chunks of files larger than that many bytes are kept in memory
+    mapped temporary files instead of chunk documents.
+    """
+
+    def __init__(
+        self,
+        database: 'AsyncMongoMockDatabase',
+        bucket_name: str = 'fs',
+        chunk_size_bytes: int = DEFAULT_CHUNK_SIZE,
+        write_concern: Any = None,
+        read_preference: Any = None,
+        mock_spill_threshold: Optional[int] = None,
+    ) -> None:
+        self._database = database
+        self._bucket_name = bucket_name
+        self._chunk_size_bytes = chunk_size_bytes
+        self._spill_threshold = mock_spill_threshold
+        self._files: 'AsyncMongoMockCollection' = database[f'{self._bucket_name}.files']
+        self._chunks: 'AsyncMongoMockCollection' = database[
+            f'{self._bucket_name}.chunks'
+        ]
+        self._has_indexes = False
+
+    def get_io_loop(self):
+        return self._database.get_io_loop()
+
+    async def _ensure_indexes(self) -> None:
+        if self._has_indexes:
+            return
+        await self._files.create_index([('filename', 1), ('uploadDate', 1)])
+        await self._chunks.create_index([('files_id', 1), ('n', 1)], unique=True)
+        self._has_indexes = True
+
+    async def _delete_chunks(self, file_id: Any) -> None:
+        spilled = _get_spilled_chunks(self._chunks)
+        if spilled:
+            async for chunk in self._chunks.find({'files_id': file_id}, {'_id': 1}):
+                spilled.pop(chunk['_id'], None)
+        await self._chunks.delete_many({'files_id': file_id})
+
+    async def _get_file(self, file_id: Any) -> DocumentType:
+        document = await self._files.find_one({'_id': file_id})
+        if document is None:
+            raise _errors().NoFile(
+                f'no file in gridfs collection {self._files!r} with _id {file_id!r}'
+            )
+        return document
+
+    def open_upload_stream(
+        self,
+        filename: str,
+        chunk_size_bytes: Optional[int] = None,
+        metadata: Optional[DocumentType] = None,
+        session: Any = None,
+    ) -> GridIn:
+        return self.open_upload_stream_with_id(
+            ObjectId(), filename, chunk_size_bytes, metadata, session
+        )
+
+    def open_upload_stream_with_id(
+        self,
+        file_id: Any,
+        filename: str,
+        chunk_size_bytes: Optional[int] = None,
+        metadata: Optional[DocumentType] = None,
+        session: Any = None,
+    ) -> GridIn:
+        return GridIn(
+            self,
+            file_id,
+            filename,
+            chunk_size_bytes or self._chunk_size_bytes,
+            metadata,
+        )
+
+    async def upload_from_stream(
+        self,
+        filename: str,
+        source: Any,
+        chunk_size_bytes: Optional[int] = None,
+        metadata: Optional[DocumentType] = None,
+        session: Any = None,
+    ) -> Any:
+        file_id = ObjectId()
+        await self.upload_from_stream_with_id(
+            file_id, filename, source, chunk_size_bytes, metadata, session
+        )
+        return file_id
+
+    async def upload_from_stream_with_id(
+        self,
+        file_id: Any,
+        filename: str,
+        source: Any,
+        chunk_size_bytes: Optional[int] = None,
+        metadata: Optional[DocumentType] = None,
+        session: Any = None,
+    ) -> None:
+        grid_in = self.open_upload_stream_with_id(
+            file_id, filename, chunk_size_bytes, metadata, session
+        )
+        async with grid_in:
+            await grid_in.write(source)
+
+    async def open_download_stream(self, file_id: Any, session: Any = None) -> GridOut:
+        return GridOut(self, await self._get_file(file_id))
+
+    async def download_to_stream(
+        self, file_id: Any, destination: Any, session: Any = None
+    ) -> None:
+        grid_out = await self.open_download_stream(file_id)
+        async for view in grid_out.iter_views():
+            destination.write(view)
+
+    async def open_download_stream_by_name(
+        self, filename: str, revision: int = -1, session: Any = None
+    ) -> GridOut:
+        if revision >= 0:
+            skip, direction = revision, 1
+        else:
+            skip, direction = -revision - 1, -1
+        # uploads made within the same millisecond are ordered by ids
+        sort = [('uploadDate', direction), ('_id', direction)]
+        cursor = self._files.find({'filename': filename})
+        cursor = cursor.sort(sort).skip(skip).limit(1)
+        documents = await cursor.to_list(None)
+        if not documents:
+            raise _errors().NoFile(f'no version {revision} for filename {filename!r}')
+        return GridOut(self, documents[0])
+
+    async def download_to_stream_by_name(
+        self,
+        filename: str,
+        destination: Any,
+        revision: int = -1,
+        session: Any = None,
+    ) -> None:
+        grid_out = await self.open_download_stream_by_name(filename, revision)
+        async for view in grid_out.iter_views():
+            destination.write(view)
+
+    async def delete(self, file_id: Any, session: Any = None) -> None:
+        result = await self._files.delete_one({'_id': file_id})
+        await self._delete_chunks(file_id)
+        if not result.deleted_count:
+            raise _errors().NoFile(
+                f'File id {file_id!r} not found in gridfs collection {self._files!r}'
+            )
+
+    async def rename(
+        self, file_id: Any, new_filename: str, session: Any = None
+    ) -> None:
+        result = await self._files.update_one(
+            {'_id': file_id}, {'$set': {'filename': new_filename}}
+        )
+        if not result.matched_count:
+            raise _errors().NoFile(
+                f'no files could be renamed {new_filename!r} because none matched '
+                f'file_id {file_id!r}'
+            )
+
+    def find(self, *args, **kwargs) -> GridOutCursor:
+        return GridOutCursor(self, self._files.find(*args, **kwargs))
@@ -0,0 +1,1081 @@
+import bisect
+import datetime
+import heapq
+import itertools
+import operator
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import mongomock
+from bson import ObjectId
+from mongomock import helpers
+from mongomock.collection import Collection
+from mongomock.filtering import filter_applies, iter_key_candidates
+from mongomock.store import CollectionStore
+from sentinels import NOTHING
+
+from .geo import GeoIndex, has_geo_condition, is_geo_index
+from .sorting import SortSpec, make_sort_key
+from .text import TextIndex, has_text, is_text_index
+from .ttl import get_expire_at
+from .typing import DocumentType
+
+_MISSING = object()
+_MISSING_KEY = ('$missing',)
+
+# Maximum amount of keys to look up in index for a single query
+_MAX_LOOKUPS = 1024
+
+_PLAIN_SCALARS = (str, int, float, datetime.datetime, ObjectId)
+
+
+def _hashable(value: Any, is_loose: bool = False) -> Any:
+    """Converts value into hashable key that follows BSON equality rules."""
+
+    if isinstance(value, bool) and not is_loose:
+        return ('$bool', value)
+
+    if isinstance(value, dict):
+        items = value.items()
+        if is_loose:
+            # filter_applies compares documents with "==", ignoring key order
+            items = sorted(items, key=operator.itemgetter(0))
+        return ('$doc', tuple((k, _hashable(v, is_loose)) for k, v in items))
+
+    if isinstance(value, (list, tuple)):
+        return ('$arr', tuple(_hashable(v, is_loose) for v in value))
+
+    if value is _MISSING:
+        return _MISSING_KEY
+
+    try:
+        hash(value)
+    except TypeError:
+        return ('$repr', repr(value))
+
+    return value
+
+
+def _match_key(value: Any) -> Any:
+    """Converts value into hashable key equal for values equal in filters."""
+    # filter_applies compares values with "==", so booleans equal numbers and
+    # documents with the same fields in different order are equal
+    return _hashable(value, is_loose=True)
+
+
+def _iter_path_values(value: Any, parts: List[str]) -> Iterator[Any]:
+    if not parts:
+        yield value
+        if isinstance(value, (list, tuple)):
+            yield from value
+        return
+
+    head, rest = parts[0], parts[1:]
+
+    if isinstance(value, dict):
+        if head in value:
+            yield from _iter_path_values(value[head], rest)
+        else:
+            yield _MISSING
+    elif isinstance(value, (list, tuple)):
+        if head.isdigit() and int(head) < len(value):
+            yield from _iter_path_values(value[int(head)], rest)
+        for item in value:
+            if isinstance(item, dict):
+                yield from _iter_path_values(item, parts)
+            else:
+                yield _MISSING
+    else:
+        yield _MISSING
+
+
+def _distinct_values(document: DocumentType, field: str) -> Iterator[Any]:
+    for values in iter_key_candidates(field, document):
+        if values is NOTHING:
+            continue
+        if isinstance(values, (list, tuple)):
+            yield from values
+        else:
+            yield values
+
+
+def _document_keys(
+    document: DocumentType, fields: List[str]
+) -> Tuple[List[Tuple[Any, ...]], bool, bool, bool]:
+    """Returns index keys of the document along with flags describing values."""
+
+    is_multikey = False
+    is_missing = True
+    has_bools = False
+    per_field = []
+
+    for field in fields:
+        values = {}
+        for value in _iter_path_values(document, field.split('.')):
+            if value is not _MISSING:
+                is_missing = False
+            if isinstance(value, (list, tuple)):
+                is_multikey = True
+            elif isinstance(value, bool):
+                has_bools = True
+            values[_match_key(value)] = None
+        per_field.append(values)
+
+    return list(itertools.product(*per_field)), is_multikey, is_missing, has_bools
+
+
+# Bounds of range over ordered values: (low, is_low_inclusive, high, is_high_inclusive)
+Bounds = Tuple[Tuple[Any, ...], bool, Tuple[Any, ...], bool]
+
+_RANGE_OPERATORS = {'$gt': (True, False), '$gte': (True, True)}
+_RANGE_OPERATORS.update({'$lt': (False, False), '$lte': (False, True)})
+
+_COMPARISONS = {'$gt': operator.gt, '$gte': operator.ge}
+_COMPARISONS.update({'$lt': operator.lt, '$lte': operator.le})
+
+
+def _order_key(value_key: Any) -> Optional[Tuple[Any, ...]]:
+    """Returns key ordering hashed values as sorting does, or None."""
+
+    if value_key is None or value_key == _MISSING_KEY:
+        return (5,)
+    if isinstance(value_key, tuple):
+        return None
+    if isinstance(value_key, (int, float)):
+        # NaN isn't equal to itself and can't be ordered
+        return (10, value_key) if value_key == value_key else None
+    if isinstance(value_key, str):
+        return (15, value_key)
+    if isinstance(value_key, ObjectId):
+        return (35, value_key)
+    if isinstance(value_key, datetime.datetime):
+        return (45, value_key)
+    return None
+
+
+class _Level:
+    """
+    Level of index trie over values of one of the fields. Values are put in
+    order on the first ordered access and are kept in order afterwards.
+    """
+
+    __slots__ = ('children', 'order_keys', 'order_values', 'unordered')
+
+    def __init__(self) -> None:
+        self.children: Dict[Any, Any] = {}
+        self.order_keys: Optional[List[Tuple[Any, ...]]] = None
+        self.order_values: List[Any] = []
+        self.unordered = 0
+
+    def get_or_create(self, value_key: Any, factory: Callable[[], Any]) -> Any:
+        child = self.children.get(value_key)
+        if child is None:
+            child = self.children[value_key] = factory()
+            if self.order_keys is not None:
+                self._insert_order(value_key)
+        return child
+
+    def discard(self, value_key: Any) -> None:
+        del self.children[value_key]
+        if self.order_keys is not None:
+            self._remove_order(value_key)
+
+    def _insert_order(self, value_key: Any) -> None:
+        assert self.order_keys is not None
+        order_key = _order_key(value_key)
+        try:
+            if order_key is None:
+                raise TypeError()
+            i = bisect.bisect_right(self.order_keys, order_key)
+        except TypeError:
+            self.unordered += 1
+            return
+        self.order_keys.insert(i, order_key)
+        self.order_values.insert(i, value_key)
+
+    def _remove_order(self, value_key: Any) -> None:
+        assert self.order_keys is not None
+        order_key = _order_key(value_key)
+        try:
+            if order_key is None:
+                raise TypeError()
+            i = bisect.bisect_left(self.order_keys, order_key)
+        except TypeError:
+            self.unordered -= 1
+            return
+        while i < len(self.order_keys) and self.order_keys[i] == order_key:
+            if self.order_values[i] == value_key:
+                del self.order_keys[i]
+                del self.order_values[i]
+                return
+            i += 1
+        self.unordered -= 1
+
+    def ensure_ordered(self) -> bool:
+        """Puts values in order, returns False if some of them can't be."""
+
+        if self.order_keys is None:
+            ordered = []
+            self.unordered = 0
+            for value_key in self.children:
+                order_key = _order_key(value_key)
+                if order_key is None:
+                    self.unordered += 1
+                else:
+                    ordered.append((order_key, value_key))
+            try:
+                ordered.sort(key=operator.itemgetter(0))
+            except TypeError:
+                return False
+            self.order_keys = [order_key for order_key, _ in ordered]
+            self.order_values = [value_key for _, value_key in ordered]
+        return not self.unordered
+
+    def iter_ordered(
+        self, bounds: Optional[Bounds] = None
+    ) -> Optional[List[Tuple[Tuple[Any, ...], Any]]]:
+        """
+        Returns (order key, value) pairs of ordered values within bounds.
+        Values that can't be ordered are left out.
+        """
+
+        self.ensure_ordered()
+        if self.order_keys is None:
+            return None
+
+        start, stop = 0, len(self.order_keys)
+        if bounds is not None:
+            low, is_low_inclusive, high, is_high_inclusive = bounds
+            try:
+                if is_low_inclusive:
+                    start = bisect.bisect_left(self.order_keys, low)
+                else:
+                    start = bisect.bisect_right(self.order_keys, low)
+                if is_high_inclusive:
+                    stop = bisect.bisect_right(self.order_keys, high)
+                else:
+                    stop = bisect.bisect_left(self.order_keys, high)
+            except TypeError:
+                return None
+
+        return list(zip(self.order_keys[start:stop], self.order_values[start:stop]))
+
+
+class Index:
+    """Index over one or more fields, kept as a trie of hash maps."""
+
+    def __init__(self, fields: List[str], spec: Optional[DocumentType] = None):
+        self.fields = fields
+        self.spec = spec or {}
+        self.is_sparse = bool(self.spec.get('sparse'))
+        self.partial_filter = self.spec.get('partialFilterExpression')
+        self.is_multikey = False
+        self.has_bools = False
+        self._root = _Level()
+        self._entries: Dict[Any, List[Tuple[Any, ...]]] = {}
+        # documents holding every distinct value, by their keys
+        self._distinct: Optional[Dict[Any, Dict[Any, Any]]] = None
+        self._distinct_entries: Dict[Any, List[Any]] = {}
+        if len(fields) == 1:
+            self._distinct = {}
+
+    @classmethod
+    def build(
+        cls,
+        fields: List[str],
+        items: Iterable[Tuple[Any, DocumentType]],
+        spec: Optional[DocumentType] = None,
+    ) -> 'Index':
+        index = cls(fields, spec)
+        for key, document in items:
+            index.add(key, document)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: Any, document: DocumentType) -> None:
+        self.remove(key)
+
+        if self.partial_filter is not None and not filter_applies(
+            self.partial_filter, document
+        ):
+            return
+
+        index_keys, is_multikey, is_missing, has_bools = _document_keys(
+            document, self.fields
+        )
+        if self.is_sparse and is_missing:
+            return
+
+        self.is_multikey = self.is_multikey or is_multikey or len(index_keys) > 1
+        self.has_bools = self.has_bools or has_bools
+        self._entries[key] = index_keys
+        for index_key in index_keys:
+            level = self._root
+            for value_key in index_key[:-1]:
+                level = level.get_or_create(value_key, _Level)
+            level.get_or_create(index_key[-1], dict)[key] = None
+
+        if self._distinct is not None:
+            values = {}
+            for value in _distinct_values(document, self.fields[0]):
+                values.setdefault(_hashable(value), value)
+            self._distinct_entries[key] = list(values)
+            for value_key, value in values.items():
+                self._distinct.setdefault(value_key, {})[key] = value
+
+    def remove(self, key: Any) -> None:
+        for index_key in self._entries.pop(key, ()):
+            path = []
+            node: Any = self._root
+            for value_key in index_key:
+                path.append((node, value_key))
+                node = node.children[value_key]
+            del node[key]
+
+            # prune levels left empty
+            for level, value_key in reversed(path):
+                child = level.children[value_key]
+                if child if isinstance(child, dict) else child.children:
+                    break
+                level.discard(value_key)
+
+        if self._distinct is not None:
+            for value_key in self._distinct_entries.pop(key, ()):
+                holders = self._distinct[value_key]
+                del holders[key]
+                if not holders:
+                    del self._distinct[value_key]
+
+    def _walk(self, value_keys: Iterable[Any]) -> Any:
+        node: Any = self._root
+        for value_key in value_keys:
+            node = node.children.get(value_key)
+            if node is None:
+                return None
+        return node
+
+    def _collect(self, node: Any, depth: int, keys: Dict[Any, None]) -> None:
+        if depth == len(self.fields):
+            keys.update(node)
+            return
+        for child in node.children.values():
+            self._collect(child, depth + 1, keys)
+
+    def find(
+        self, values: List[Any], bounds: Optional[Bounds] = None
+    ) -> Optional[Dict[Any, None]]:
+        """Returns keys of documents matching values of leading fields and bounds."""
+
+        # null matches both null and missing values
+        alternatives = [
+            [None, _MISSING_KEY] if key is None else [key]
+            for key in (_match_key(value) for value in values)
+        ]
+
+        depth = len(values)
+        if depth == len(self.fields) and all(len(keys) == 1 for keys in alternatives):
+            return self._walk(keys[0] for keys in alternatives) or {}
+
+        found: Dict[Any, None] = {}
+        for value_keys in itertools.product(*alternatives):
+            node = self._walk(value_keys)
+            if node is None:
+                continue
+            if bounds is None:
+                self._collect(node, depth, found)
+                continue
+            ordered = node.iter_ordered(bounds)
+            if ordered is None:
+                return None
+            for _, value_key in ordered:
+                self._collect(node.children[value_key], depth + 1, found)
+        return found
+
+    def lookup(self, *values: Any) -> Dict[Any, None]:
+        """Returns keys of documents that might be equal to provided values."""
+        return self.find(list(values)) or {}
+
+    def iter_ordered(
+        self,
+        values: List[Any],
+        direction: int,
+        bounds: Optional[Bounds] = None,
+    ) -> Optional[Iterator[Dict[Any, None]]]:
+        """Yields groups of keys of documents in order of the next field."""
+
+        # booleans share keys with numbers, but are sorted after them
+        if self.is_multikey or self.has_bools:
+            return None
+        if any(value is None for value in values):
+            return None
+
+        node = self._walk(_match_key(value) for value in values)
+        if node is None:
+            return iter(())
+        if not node.ensure_ordered():
+            return None
+
+        ordered = node.iter_ordered(bounds)
+        if ordered is None:
+            return None
+        if direction < 0:
+            ordered.reverse()
+
+        depth = len(values) + 1
+
+        def iterate() -> Iterator[Dict[Any, None]]:
+            for _, group in itertools.groupby(ordered, key=operator.itemgetter(0)):
+                keys: Dict[Any, None] = {}
+                for _, value_key in group:
+                    child = node.children.get(value_key)
+                    if child is not None:
+                        self._collect(child, depth, keys)
+                if keys:
+                    yield keys
+
+        return iterate()
+
+    def distinct(self) -> Optional[List[Any]]:
+        """Returns distinct values of the field for single field indexes."""
+        if self._distinct is None:
+            return None
+        # value is taken from a document still holding it (e.g. 2 and 2.0)
+        return [next(iter(holders.values())) for holders in self._distinct.values()]
+
+
+class IndexedCollectionStore(CollectionStore):
+    """Collection store that keeps declared indexes up to date on every write."""
+
+    _indexes: Dict[str, Union[Index, TextIndex, GeoIndex]]
+    _index_specs: Dict[str, DocumentType]
+    _positions: Dict[Any, int]
+    _next_position: int
+    _ttl_specs: Optional[List[DocumentType]]
+    _ttl_heap: List[Tuple[datetime.datetime, int, Any]]
+    _ttl_expire_at: Dict[Any, datetime.datetime]
+    _ttl_sequence: Iterator[int]
+
+    def _reset_indexed_state(self) -> None:
+        self._indexes = {}
+        self._index_specs = {}
+        self._positions = {key: i for i, key in enumerate(self._documents)}
+        self._next_position = len(self._positions)
+        self._ttl_specs = None
+        self._ttl_heap = []
+        self._ttl_expire_at = {}
+        self._ttl_sequence = itertools.count()
+
+    def __setitem__(self, key, val):
+        is_new = key not in self._documents
+        super().__setitem__(key, val)
+        if is_new:
+            self._positions[key] = self._next_position
+            self._next_position += 1
+        for index in self._indexes.values():
+            index.add(key, val)
+        self._schedule_expiry(key, val)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._positions.pop(key, None)
+        self._ttl_expire_at.pop(key, None)
+        for index in self._indexes.values():
+            index.remove(key)
+
+    def drop(self):
+        super().drop()
+        self._reset_indexed_state()
+
+    def reindex(self, key: Any, document: DocumentType) -> None:
+        """Updates indexes after document was modified in place."""
+        if self._documents.get(key) is not document:
+            return
+        for index in self._indexes.values():
+            index.add(key, document)
+        self._schedule_expiry(key, document)
+
+    def _schedule_expiry(self, key: Any, document: DocumentType) -> None:
+        if not self._ttl_indexes or self._ttl_specs is None:
+            return
+
+        expire_at = get_expire_at(document, self._ttl_specs)
+        if expire_at is None:
+            self._ttl_expire_at.pop(key, None)
+        elif self._ttl_expire_at.get(key) != expire_at:
+            self._ttl_expire_at[key] = expire_at
+            heapq.heappush(self._ttl_heap, (expire_at, next(self._ttl_sequence), key))
+
+    def _sync_ttl_indexes(self) -> None:
+        specs = list(self._ttl_indexes.values())
+        if self._ttl_specs is not None and all(
+            a is b for a, b in itertools.zip_longest(specs, self._ttl_specs)
+        ):
+            return
+
+        self._ttl_specs = specs
+        self._ttl_expire_at = {}
+        for key, document in self._documents.items():
+            expire_at = get_expire_at(document, specs)
+            if expire_at is not None:
+                self._ttl_expire_at[key] = expire_at
+        self._ttl_heap = [
+            (expire_at, next(self._ttl_sequence), key)
+            for key, expire_at in self._ttl_expire_at.items()
+        ]
+        heapq.heapify(self._ttl_heap)
+
+    def _remove_expired_documents(self):
+        if not self._ttl_indexes and not self._ttl_heap:
+            return
+
+        self._sync_ttl_indexes()
+
+        # mongomock.utcnow is the documented way to mock current time
+        now = mongomock.utcnow()  # pyright: ignore[reportAttributeAccessIssue]
+        expired = []
+        while self._ttl_heap and self._ttl_heap[0][0] <= now:
+            expire_at, _, key = heapq.heappop(self._ttl_heap)
+            # heap might contain outdated entries of updated documents
+            if self._ttl_expire_at.get(key) == expire_at:
+                expired.append(key)
+
+        for key in expired:
+            del self[key]
+
+    def _sync_indexes(self) -> None:
+        self._remove_expired_documents()
+
+        for name in list(self._indexes):
+            if self.indexes.get(name) is not self._index_specs[name]:
+                del self._indexes[name]
+                del self._index_specs[name]
+
+        for name, spec in self.indexes.items():
+            if name in self._indexes:
+                continue
+            with self._rwlock.reader():
+                items = list(self._documents.items())
+            if is_text_index(spec):
+                self._indexes[name] = TextIndex.build(items, spec)
+            elif is_geo_index(spec):
+                self._indexes[name] = GeoIndex.build(items, spec)
+            else:
+                fields = [field for field, _ in spec['key']]
+                self._indexes[name] = Index.build(fields, items, spec)
+            self._index_specs[name] = spec
+
+    def get_indexes(self) -> List[Index]:
+        """Returns up to date declared indexes (except text and geo ones)."""
+        self._sync_indexes()
+        return [index for index in self._indexes.values() if isinstance(index, Index)]
+
+    def get_text_index(self) -> Optional[TextIndex]:
+        """Returns up to date text index of the collection."""
+        self._sync_indexes()
+        for index in self._indexes.values():
+            if isinstance(index, TextIndex):
+                return index
+        return None
+
+    def get_geo_indexes(self) -> List[GeoIndex]:
+        """Returns up to date geo indexes of the collection."""
+        self._sync_indexes()
+        return [
+            index for index in self._indexes.values() if isinstance(index, GeoIndex)
+        ]
+
+    def get_geo_index(self, field: str) -> Optional[GeoIndex]:
+        for index in self.get_geo_indexes():
+            if index.field == field:
+                return index
+        return None
+
+    def get_index(self, fields: List[str]) -> Optional[Index]:
+        """
+        Returns up to date declared index over exactly these fields which
+        contains every document of the collection (so not a partial one).
+        """
+        for index in self.get_indexes():
+            if index.fields == fields and index.partial_filter is None:
+                return index
+        return None
+
+    def items(self) -> List[Tuple[Any, DocumentType]]:
+        self._remove_expired_documents()
+        with self._rwlock.reader():
+            return list(self._documents.items())
+
+    def get_document(self, key: Any) -> Optional[DocumentType]:
+        with self._rwlock.reader():
+            return self._documents.get(key)
+
+    def items_by_keys(self, keys: Iterable[Any]) -> List[Tuple[Any, DocumentType]]:
+        """Returns documents with provided keys along with keys in natural order."""
+        with self._rwlock.reader():
+            present = [key for key in keys if key in self._documents]
+            present.sort(key=self._positions.__getitem__)
+            return [(key, self._documents[key]) for key in present]
+
+    def documents_by_keys(self, keys: Iterable[Any]) -> List[DocumentType]:
+        """Returns documents with provided keys in natural order."""
+        return [document for _, document in self.items_by_keys(keys)]
+
+
+class Plan(NamedTuple):
+    """
+    Candidate documents for the query. Plan is exact when every candidate is
+    known to match the query, so it can be counted without verification.
+    """
+
+    postings: List[Dict[Any, None]]
+    is_exact: bool
+
+
+def _equality_values(condition: Any) -> Optional[List[Any]]:
+    """Returns values that field has to be equal to (one of) to match."""
+
+    if isinstance(condition, dict):
+        if not condition or not all(key.startswith('$') for key in condition):
+            return [condition]
+        if len(condition) != 1:
+            return None
+        operator, argument = next(iter(condition.items()))
+        if operator == '$eq':
+            return _equality_values(argument)
+        if operator == '$in' and isinstance(argument, (list, tuple)):
+            if any(isinstance(value, (dict, helpers.RE_TYPE)) for value in argument):
+                return None
+            return list(argument)
+        return None
+
+    if isinstance(condition, helpers.RE_TYPE):
+        return None
+
+    return [condition]
+
+
+def _is_plain_scalar(value: Any) -> bool:
+    return isinstance(value, _PLAIN_SCALARS) and not isinstance(value, bool)
+
+
+def _range_bounds(condition: Any, is_multikey: bool) -> Optional[Bounds]:
+    """
+    Returns bounds of values matching range operators of the condition.
+    Ranges only match values of the same type, same as in "mongomock".
+    """
+
+    if not isinstance(condition, dict):
+        return None
+
+    operators = [
+        (name, value)
+        for name, value in condition.items()
+        if name in _RANGE_OPERATORS and _is_plain_scalar(value)
+    ]
+    if not operators:
+        return None
+
+    # every operator might be matched by different element of an array
+    if is_multikey:
+        operators = operators[:1]
+
+    rank = _order_key(operators[0][1])[0]  # type: ignore
+    bounds = [(rank - 0.5,), True, (rank + 0.5,), True]
+    for name, value in operators:
+        is_low, is_inclusive = _RANGE_OPERATORS[name]
+        position = 0 if is_low else 2
+        bounds[position] = _order_key(value)  # type: ignore
+        bounds[position + 1] = is_inclusive
+    return tuple(bounds)  # type: ignore
+
+
+def _get_conditions(filter: DocumentType) -> Dict[str, List[Any]]:
+    """Returns conditions of the filter by field, with "$and" flattened."""
+
+    conditions: Dict[str, List[Any]] = {}
+    for field, condition in filter.items():
+        if (
+            field == '$and'
+            and isinstance(condition, list)
+            and condition
+            and all(isinstance(clause, dict) for clause in condition)
+        ):
+            for clause in condition:
+                for name, values in _get_conditions(clause).items():
+                    conditions.setdefault(name, []).extend(values)
+        else:
+            conditions.setdefault(field, []).append(condition)
+    return conditions
+
+
+def _get_equalities(conditions: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+    equalities = {}
+    for field, field_conditions in conditions.items():
+        if field.startswith('$'):
+            continue
+        for condition in field_conditions:
+            values = _equality_values(condition)
+            if values is not None:
+                equalities[field] = values
+                break
+    return equalities
+
+
+def _get_bounds(
+    conditions: Dict[str, List[Any]], field: str, is_multikey: bool
+) -> Optional[Bounds]:
+    for condition in conditions.get(field, ()):
+        bounds = _range_bounds(condition, is_multikey)
+        if bounds is not None:
+            return bounds
+    return None
+
+
+def _compare(order_key: Any, operator_name: str, bound: Any) -> bool:
+    """Tells whether value with order key satisfies range operator."""
+
+    bound_key = _order_key(_hashable(bound))
+    if order_key is None or bound_key is None or order_key[0] != bound_key[0]:
+        return False
+    try:
+        return _COMPARISONS[operator_name](order_key, bound_key)
+    except TypeError:
+        return False
+
+
+def _implies_operator(condition: Any, operator_name: str, argument: Any) -> bool:
+    """Tells whether condition implies single operator of filter expression."""
+
+    is_range = operator_name in _RANGE_OPERATORS and _is_plain_scalar(argument)
+
+    values = _equality_values(condition)
+    if values is not None:
+        if operator_name == '$eq':
+            return all(_match_key(value) == _match_key(argument) for value in values)
+        if operator_name == '$in' and isinstance(argument, (list, tuple)):
+            allowed = {_match_key(value) for value in argument}
+            return all(_match_key(value) in allowed for value in values)
+        if operator_name == '$exists' and argument:
+            return all(value is not None for value in values)
+        if is_range:
+            return all(
+                _is_plain_scalar(value)
+                and _compare(_order_key(value), operator_name, argument)
+                for value in values
+            )
+
+    if not isinstance(condition, dict):
+        return False
+    if condition.get(operator_name) == argument:
+        return True
+
+    if operator_name == '$exists' and argument:
+        return condition.get('$exists') is True or any(
+            name in _RANGE_OPERATORS and _is_plain_scalar(value)
+            for name, value in condition.items()
+        )
+
+    if is_range:
+        # a tighter range in the same direction
+        is_low, is_inclusive = _RANGE_OPERATORS[operator_name]
+        for name, value in condition.items():
+            if name not in _RANGE_OPERATORS or not _is_plain_scalar(value):
+                continue
+            if _RANGE_OPERATORS[name][0] != is_low:
+                continue
+            comparison = operator_name
+            if not is_inclusive and not _RANGE_OPERATORS[name][1]:
+                # e.g. "$gt: 5" implies "$gt: 5"
+                comparison += 'e'
+            if _compare(_order_key(value), comparison, argument):
+                return True
+
+    return False
+
+
+def _implies(conditions: Dict[str, List[Any]], expression: DocumentType) -> bool:
+    """Tells whether conditions of the query imply partial filter expression."""
+
+    for field, expected in _get_conditions(expression).items():
+        for condition in expected:
+            if any(
+                candidate == condition or _implies_condition(candidate, condition)
+                for candidate in conditions.get(field, ())
+            ):
+                continue
+            return False
+    return True
+
+
+def _implies_condition(condition: Any, expected: Any) -> bool:
+    if (
+        isinstance(expected, dict)
+        and expected
+        and all(key.startswith('$') for key in expected)
+    ):
+        return all(
+            _implies_operator(condition, name, argument)
+            for name, argument in expected.items()
+        )
+    return _implies_operator(condition, '$eq', expected)
+
+
+def _equality_prefix(index: Index, equalities: Dict[str, List[Any]]) -> int:
+    """Returns number of leading fields of index covered by equalities."""
+
+    prefix = 0
+    for field in index.fields:
+        if field not in equalities:
+            break
+        prefix += 1
+
+    # sparse indexes don't contain documents missing all of the fields
+    if index.is_sparse and any(
+        value is None for field in index.fields[:prefix] for value in equalities[field]
+    ):
+        return 0
+
+    return prefix
+
+
+def _is_plannable(filter: Any) -> bool:
+    # "$text" and geo conditions can't be verified by filter_applies
+    return (
+        isinstance(filter, dict)
+        and bool(filter)
+        and not has_text(filter)
+        and not has_geo_condition(filter)
+    )
+
+
+def plan_query(store: IndexedCollectionStore, filter: Any) -> Optional[Plan]:
+    """Finds candidate documents for the query using _id or declared indexes."""
+
+    if not _is_plannable(filter):
+        return None
+
+    conditions = _get_conditions(filter)
+    conditions_count = sum(len(values) for values in conditions.values())
+    equalities = _get_equalities(conditions)
+
+    if '_id' in equalities:
+        keys = {}
+        for value in equalities['_id']:
+            key = helpers.hashdict(value) if isinstance(value, dict) else value
+            try:
+                if key in store._documents:
+                    keys[key] = None
+            except TypeError:
+                return None
+        is_exact = conditions_count == 1 and all(
+            _is_plain_scalar(value) for value in equalities['_id']
+        )
+        return Plan([keys], is_exact)
+
+    best = None
+    best_score = None
+    for index in store.get_indexes():
+        if index.partial_filter is not None and not _implies(
+            conditions, index.partial_filter
+        ):
+            continue
+        prefix = _equality_prefix(index, equalities)
+        bounds = None
+        if prefix < len(index.fields):
+            bounds = _get_bounds(conditions, index.fields[prefix], index.is_multikey)
+        if not prefix and bounds is None:
+            continue
+
+        score = (prefix, bounds is not None, prefix == len(index.fields))
+        if best_score is None or score > best_score:
+            best, best_score = (index, prefix, bounds), score
+
+    if best is None:
+        return None
+
+    index, prefix, bounds = best
+    fields = index.fields[:prefix]
+
+    combinations = 1
+    for field in fields:
+        combinations *= len(equalities[field])
+    if combinations > _MAX_LOOKUPS:
+        return None
+
+    lookups = {}
+    for values in itertools.product(*(equalities[field] for field in fields)):
+        lookups.setdefault(_match_key(list(values)), list(values))
+
+    postings = []
+    for values in lookups.values():
+        keys = index.find(values, bounds)
+        if keys is None:
+            return None
+        postings.append(keys)
+
+    is_exact = (
+        not index.is_multikey
+        and bounds is None
+        and prefix == conditions_count
+        and all(
+            _is_plain_scalar(value) for field in fields for value in equalities[field]
+        )
+    )
+
+    return Plan(postings, is_exact)
+
+
+def find_documents(
+    store: IndexedCollectionStore, filter: Any
+) -> Optional[List[DocumentType]]:
+    """
+    Returns documents matching the filter in natural order using declared
+    indexes. Returns None if documents have to be found by scanning.
+    """
+
+    plan = plan_query(store, filter)
+    if plan is None:
+        return None
+
+    keys = {}
+    for postings in plan.postings:
+        keys.update(postings)
+
+    documents = store.documents_by_keys(keys)
+    if plan.is_exact:
+        return documents
+    return [document for document in documents if filter_applies(filter, document)]
+
+
+def iter_sorted(
+    store: IndexedCollectionStore,
+    filter: Any,
+    sort: SortSpec,
+) -> Optional[Iterator[DocumentType]]:
+    """Yields documents matching the filter in sort order using declared index."""
+
+    if filter and not _is_plannable(filter):
+        return None
+
+    conditions = _get_conditions(filter or {})
+    equalities = _get_equalities(conditions)
+    fixed = {
+        field: values[0]
+        for field, values in equalities.items()
+        if len(values) == 1 and values[0] is not None
+    }
+
+    # fields fixed by equalities don't change the order
+    sort = list(sort)
+    while sort and sort[0][0] in fixed:
+        sort.pop(0)
+    if not sort:
+        return None
+
+    best = None
+    for index in store.get_indexes():
+        prefix = 0
+        while prefix < len(index.fields) and index.fields[prefix] in fixed:
+            prefix += 1
+        if prefix == len(index.fields) or index.fields[prefix] != sort[0][0]:
+            continue
+        if index.is_multikey or (index.is_sparse and not prefix):
+            continue
+        if index.partial_filter is not None and not _implies(
+            conditions, index.partial_filter
+        ):
+            continue
+        if best is None or prefix > best[1]:
+            best = (index, prefix)
+
+    if best is None:
+        return None
+
+    index, prefix = best
+    bounds = _get_bounds(conditions, sort[0][0], False)
+    values = [fixed[field] for field in index.fields[:prefix]]
+    groups = index.iter_ordered(values, sort[0][1], bounds)
+    if groups is None:
+        return None
+
+    return _iter_groups(store, filter, sort[1:], groups)
+
+
+def _iter_groups(
+    store: IndexedCollectionStore,
+    filter: Any,
+    sort: SortSpec,
+    groups: Iterator[Dict[Any, None]],
+) -> Iterator[DocumentType]:
+    sort_key = make_sort_key(sort) if sort else None
+    for keys in groups:
+        documents = store.documents_by_keys(keys)
+        if filter:
+            documents = [doc for doc in documents if filter_applies(filter, doc)]
+        if sort_key is not None and len(documents) > 1:
+            documents.sort(key=sort_key)
+        yield from documents
+
+
+def count_documents(store: IndexedCollectionStore, filter: Any) -> Optional[int]:
+    """Counts matching documents with help of declared indexes, if possible."""
+
+    if not filter:
+        return len(store)
+
+    plan = plan_query(store, filter)
+    if plan is None:
+        return None
+
+    if plan.is_exact:
+        return sum(len(keys) for keys in plan.postings)
+
+    keys = {}
+    for postings in plan.postings:
+        keys.update(postings)
+
+    return sum(
+        1
+        for document in store.documents_by_keys(keys)
+        if filter_applies(filter, document)
+    )
+
+
+def document_key(document: DocumentType) -> Any:
+    object_id = document.get('_id')
+    if isinstance(object_id, dict):
+        return helpers.hashdict(object_id)
+    return object_id
+
+
+def indexed_store(collection: Collection) -> IndexedCollectionStore:
+    store = collection._store
+    if not isinstance(store, IndexedCollectionStore):
+        store.__class__ = IndexedCollectionStore
+        store._reset_indexed_state()  # type: ignore
+    return store  # type: ignore
+
+
+__all__ = [
+    'Index',
+    'IndexedCollectionStore',
+    'Plan',
+    'count_documents',
+    'document_key',
+    'find_documents',
+    'indexed_store',
+    'iter_sorted',
+    'plan_query',
+]
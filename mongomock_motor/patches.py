@@ -1,20 +1,30 @@
+import sys
 from functools import wraps
-from typing import Union
+from typing import Any, List, Mapping, Union
 from unittest.mock import Mock
 
-from mongomock import DuplicateKeyError, helpers
+from mongomock import DuplicateKeyError, OperationFailure, helpers
 from mongomock.collection import Collection
+from mongomock.filtering import filter_applies
 from mongomock.mongo_client import MongoClient
-
+from pymongo.operations import IndexModel
+
+from .aggregation import process_pipeline
+from .compiled import compile_projection, compile_update
+from .cursors import Cursor
+from .geo import geo_near, geo_search, has_geo_condition
+from .indexes import count_documents, document_key, find_documents, indexed_store
+from .text import (
+    TEXT_INDEX_OPTIONS,
+    has_text,
+    is_text_index,
+    project_text_scores,
+    text_search,
+    uses_text_score,
+)
+from .time_limits import get_max_time_ms, time_limit, with_time_limit
 from .typing import DocumentType
 
-try:
-    from beanie.odm.fields import ExpressionField as _ExpressionField
-except ModuleNotFoundError:
-    ExpressionField = None
-else:
-    ExpressionField = _ExpressionField
-
 
 def _provide_error_details(
     collection: Collection,
@@ -29,6 +39,12 @@ def _provide_error_details(
             continue
 
         is_sparse = index.get('sparse')
+        partial_filter_expression = index.get('partialFilterExpression')
+
+        if partial_filter_expression is not None and not filter_applies(
+            partial_filter_expression, data
+        ):
+            continue
 
         find_kwargs = {}
         for key, _ in index.get('key'):
@@ -40,7 +56,11 @@ def _provide_error_details(
         if is_sparse and set(find_kwargs.values()) == {None}:
             continue
 
-        found_documents = list(collection._iter_documents(find_kwargs))
+        query = find_kwargs
+        if partial_filter_expression is not None:
+            query = {'$and': [partial_filter_expression, find_kwargs]}
+
+        found_documents = list(collection._iter_documents(query))
         if len(found_documents) > 0:
             return DuplicateKeyError(
                 'E11000 Duplicate Key Error',
@@ -82,6 +102,71 @@ def _patch_insert_and_ensure_uniques(collection: Collection) -> Collection:
     return collection
 
 
+def _patch_partial_indexes(collection: Collection) -> Collection:
+    """
+    Checks uniqueness of partial unique indexes only among documents matching
+    their filter expression ("mongomock" checks every document on creation)
+    and keeps all options of index models passed to create_indexes.
+    """
+
+    def with_partial_uniqueness(fn):
+        @wraps(fn)
+        def wrapper(key_or_list, *args, **kwargs):
+            expression = kwargs.get('partialFilterExpression')
+            if expression is None or not kwargs.get('unique'):
+                return fn(key_or_list, *args, **kwargs)
+
+            index_list = helpers.create_index_list(key_or_list)
+            name = kwargs.get('name') or helpers.gen_index_name(index_list)
+            existing = collection._store.indexes.get(name)
+            if existing is not None:
+                expected = {'key': index_list, 'unique': True}
+                if kwargs.get('sparse'):
+                    expected['sparse'] = True
+                expected['partialFilterExpression'] = expression
+                if existing != expected:
+                    raise OperationFailure(
+                        f'Index with name: {name} already exists with different options'
+                    )
+                return name
+
+            name = fn(key_or_list, *args, **{**kwargs, 'unique': False, 'name': name})
+            spec = collection._store.indexes[name]
+            collection._store.indexes[name] = {**spec, 'unique': True}
+
+            # lookups of matching documents are answered by the new index
+            try:
+                for document in list(collection._iter_documents(expression)):
+                    collection._ensure_uniques(document)
+            except DuplicateKeyError:
+                collection._store.drop_index(name)
+                raise
+
+            return name
+
+        return wrapper
+
+    collection.create_index = with_partial_uniqueness(collection.create_index)
+
+    def create_indexes(indexes, session=None):
+        for index in indexes:
+            if not isinstance(index, IndexModel):
+                raise TypeError(f'{index} is not an instance of IndexModel')
+
+        names = []
+        for index in indexes:
+            options = dict(index.document)
+            key = options.pop('key')
+            names.append(
+                collection.create_index(list(key.items()), session=session, **options)
+            )
+        return names
+
+    collection.create_indexes = create_indexes
+
+    return collection
+
+
 def _normalize_strings(obj):
     if isinstance(obj, list):
         return [_normalize_strings(v) for v in obj]
@@ -93,8 +178,11 @@ def _normalize_strings(obj):
         return {_normalize_strings(k): _normalize_strings(v) for k, v in obj.items()}
 
     # make sure we won't fail while working with beanie
-    if ExpressionField and isinstance(obj, ExpressionField):
-        return str(obj)
+    if isinstance(obj, str) and type(obj) is not str:
+        # there can't be instances of it unless beanie was imported
+        fields = sys.modules.get('beanie.odm.fields')
+        if fields is not None and isinstance(obj, fields.ExpressionField):
+            return str(obj)
 
     return obj
 
@@ -133,11 +221,367 @@ def _patch_iter_documents_and_get_dataset(collection: Collection) -> Collection:
     return collection
 
 
+def _patch_index_scan(collection: Collection) -> Collection:
+    """
+    Finds documents matching filters covered by declared indexes (or by
+    "_id") without scanning the whole collection.
+    """
+
+    def with_index_scan(fn):
+        @wraps(fn)
+        def wrapper(filter) -> Any:
+            documents = find_documents(indexed_store(collection), filter)
+            return fn(filter) if documents is None else iter(documents)
+
+        return wrapper
+
+    collection._iter_documents = with_index_scan(collection._iter_documents)
+
+    return collection
+
+
+def _patch_text_search(collection: Collection) -> Collection:
+    """
+    Answers "$text" queries from inverted text index of the collection and
+    allows to project and sort by {'$meta': 'textScore'}. Options of text
+    indexes ("weights", "default_language", "language_override") are kept
+    in index specs, since "mongomock" drops them.
+    """
+
+    def with_text_index_options(fn):
+        @wraps(fn)
+        def wrapper(key_or_list, *args, **kwargs):
+            options = {
+                name: kwargs.pop(name)
+                for name in TEXT_INDEX_OPTIONS
+                if kwargs.get(name) is not None
+            }
+
+            index_list = helpers.create_index_list(key_or_list)
+            if is_text_index({'key': index_list}):
+                name = kwargs.get('name', helpers.gen_index_name(index_list))
+                for other_name, spec in collection._store.indexes.items():
+                    if other_name != name and is_text_index(spec):
+                        raise OperationFailure(
+                            'only one text index per collection allowed', 85
+                        )
+
+            name = fn(key_or_list, *args, **kwargs)
+            if options:
+                spec = collection._store.indexes[name]
+                collection._store.indexes[name] = {**spec, **options}
+            return name
+
+        return wrapper
+
+    collection.create_index = with_text_index_options(collection.create_index)
+
+    def with_text_search(fn):
+        @wraps(fn)
+        def wrapper(filter):
+            if not has_text(filter):
+                return fn(filter)
+            store = indexed_store(collection)
+            return (document for document, _ in text_search(store, filter))
+
+        return wrapper
+
+    collection._iter_documents = with_text_search(collection._iter_documents)
+
+    def with_text_scores(fn):
+        @wraps(fn)
+        def wrapper(spec, sort, fields, as_class) -> Any:
+            if not uses_text_score(spec, sort, fields):
+                return fn(spec, sort, fields, as_class)
+            return project_text_scores(
+                text_search(indexed_store(collection), spec),
+                sort,
+                fields,
+                lambda doc, fields: collection._copy_only_fields(doc, fields, as_class),
+            )
+
+        return wrapper
+
+    collection._get_dataset = with_text_scores(collection._get_dataset)
+
+    return collection
+
+
+def _patch_geo_search(collection: Collection) -> Collection:
+    """
+    Answers geo queries ("$near", "$nearSphere", "$geoWithin" and
+    "$geoIntersects") using geo indexes of the collection, so that nearest
+    documents are found without computing distance to every document.
+    """
+
+    def with_geo_search(fn):
+        @wraps(fn)
+        def wrapper(filter) -> Any:
+            if not has_geo_condition(filter):
+                return fn(filter)
+            return geo_search(indexed_store(collection), filter)
+
+        return wrapper
+
+    collection._iter_documents = with_geo_search(collection._iter_documents)
+
+    return collection
+
+
+def _patch_compiled_specs(collection: Collection) -> Collection:
+    """
+    Compiles projections and update documents once per call instead of
+    interpreting them again for every document. Compiled specs are cached by
+    their shape, so repeated calls with different values reuse them too.
+    """
+
+    def with_compiled_projection(fn):
+        @wraps(fn)
+        def wrapper(doc, fields, container):
+            if not fields:
+                return fn(doc, fields, container)
+            projection = compile_projection(collection, fields)
+            return projection.apply(collection, doc, container)
+
+        return wrapper
+
+    collection._copy_only_fields = with_compiled_projection(
+        collection._copy_only_fields,
+    )
+
+    def with_compiled_update(fn):
+        @wraps(fn)
+        def wrapper(existing_document, spec, document, was_insert):
+            # mutators are compiled once per shape of update document
+            update = compile_update(document)
+            if update is None:
+                return fn(existing_document, spec, document, was_insert)
+
+            update.apply(
+                existing_document,
+                was_insert,
+                lambda doc, partial: fn(doc, spec, partial, was_insert),
+            )
+
+        return wrapper
+
+    collection._apply_update_document = with_compiled_update(
+        collection._apply_update_document,
+    )
+
+    return collection
+
+
+def _patch_update_reindexing(collection: Collection) -> Collection:
+    """
+    Updates are applied by "mongomock" to stored documents in place, so we
+    need to refresh indexes of the document after every applied update.
+    """
+
+    def with_reindexing(fn):
+        @wraps(fn)
+        def wrapper(existing_document, *args, **kwargs):
+            key = document_key(existing_document)
+            result = fn(existing_document, *args, **kwargs)
+            indexed_store(collection).reindex(key, existing_document)
+            return result
+
+        return wrapper
+
+    collection._apply_update_document = with_reindexing(
+        collection._apply_update_document,
+    )
+    collection._apply_update_pipeline = with_reindexing(
+        collection._apply_update_pipeline,
+    )
+
+    return collection
+
+
+def _stored_documents(collection: Collection) -> List[DocumentType]:
+    # same as documents of "find()", without going through cursor
+    documents = [
+        collection._copy_only_fields(document, None, dict)
+        for _, document in with_time_limit(indexed_store(collection).items())
+    ]
+    if collection.codec_options.tz_aware:
+        documents = [
+            helpers.make_datetime_timezone_aware_in_document(document)
+            for document in documents
+        ]
+    return documents
+
+
+def _patch_aggregate(collection: Collection) -> Collection:
+    """
+    Runs aggregation pipelines through our own pipeline processor, that
+    provides optimized implementations for some of the stages.
+    """
+
+    @wraps(collection.aggregate)
+    def aggregate(pipeline, session=None, **unused_kwargs):
+        # "$geoNear" and "$text" are only allowed in the first stage
+        first = pipeline[0] if pipeline else {}
+        match = first.get('$match')
+        if '$geoNear' in first:
+            in_collection = geo_near(
+                indexed_store(collection),
+                first['$geoNear'],
+                lambda doc: collection._copy_only_fields(doc, None, dict),
+            )
+            pipeline = pipeline[1:]
+        elif has_text(match):
+            in_collection = [doc for doc in collection.find(match)]
+            pipeline = pipeline[1:]
+        else:
+            in_collection = _stored_documents(collection)
+        return process_pipeline(in_collection, collection.database, pipeline, session)
+
+    collection.aggregate = aggregate
+
+    return collection
+
+
+def _patch_find(collection: Collection) -> Collection:
+    """
+    Replaces cursors returned by "find" with our own cursors, that don't
+    compute whole result set when only part of it is requested. Also makes
+    "find_one" stop scanning on the first matched document.
+    """
+
+    def with_bounded_cursor(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            cursor = fn(*args, **kwargs)
+            cursor.__class__ = Cursor
+            if kwargs.get('max_time_ms') is not None:
+                cursor.max_time_ms(kwargs['max_time_ms'])
+            return cursor
+
+        return wrapper
+
+    collection.find = with_bounded_cursor(collection.find)
+
+    def find_one(filter=None, *args, **kwargs):
+        if filter is None:
+            filter = {}
+        if not isinstance(filter, Mapping):
+            filter = {'_id': filter}
+
+        for document in collection.find(filter, *args, **kwargs).limit(-1):
+            return document
+
+        return None
+
+    collection.find_one = wraps(collection.find_one)(find_one)
+
+    return collection
+
+
+def _patch_count_documents(collection: Collection) -> Collection:
+    """
+    Counts documents without scanning the collection when it's possible:
+    empty filter is answered from the size of the collection and filters
+    covered by declared indexes are answered from the index.
+    """
+
+    def with_index_counting(fn):
+        @wraps(fn)
+        def wrapper(filter, **kwargs):
+            skip = kwargs.get('skip', 0)
+            limit = kwargs.get('limit')
+
+            if (
+                set(kwargs) - {'skip', 'limit', 'maxTimeMS', 'hint'}
+                or not isinstance(skip, int)
+                or (limit is not None and (not isinstance(limit, int) or limit <= 0))
+            ):
+                return fn(filter, **kwargs)
+
+            count = count_documents(
+                indexed_store(collection),
+                helpers.patch_datetime_awareness_in_document(filter),
+            )
+            if count is None:
+                return fn(filter, **kwargs)
+
+            count = max(count - skip, 0)
+            return count if limit is None else min(count, limit)
+
+        return wrapper
+
+    collection.count_documents = with_index_counting(
+        collection.count_documents,
+    )
+
+    return collection
+
+
+_TIME_LIMITED_METHODS = [
+    'aggregate',
+    'bulk_write',
+    'count_documents',
+    'delete_many',
+    'delete_one',
+    'distinct',
+    'find_one_and_delete',
+    'find_one_and_replace',
+    'find_one_and_update',
+    'insert_many',
+    'replace_one',
+    'update_many',
+    'update_one',
+]
+
+
+def _patch_time_limits(collection: Collection) -> Collection:
+    """
+    Enforces "max_time_ms" (or "maxTimeMS") passed to operations, checking
+    deadline while documents of collection are scanned. Cursors enforce
+    their own limits (see "Cursor.max_time_ms").
+    """
+
+    def with_time_limit_checks(fn):
+        @wraps(fn)
+        def wrapper(filter) -> Any:
+            return with_time_limit(fn(filter))
+
+        return wrapper
+
+    collection._iter_documents = with_time_limit_checks(
+        collection._iter_documents,
+    )
+
+    def with_time_limit_enforced(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with time_limit(get_max_time_ms(kwargs)):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    for name in _TIME_LIMITED_METHODS:
+        setattr(collection, name, with_time_limit_enforced(getattr(collection, name)))
+
+    return collection
+
+
 def _patch_collection_internals(collection: Collection) -> Collection:
     if getattr(collection, '_patched_by_mongomock_motor', False):
         return collection
+    indexed_store(collection)
     collection = _patch_insert_and_ensure_uniques(collection)
+    collection = _patch_partial_indexes(collection)
+    collection = _patch_index_scan(collection)
+    collection = _patch_text_search(collection)
+    collection = _patch_geo_search(collection)
     collection = _patch_iter_documents_and_get_dataset(collection)
+    collection = _patch_compiled_specs(collection)
+    collection = _patch_update_reindexing(collection)
+    collection = _patch_aggregate(collection)
+    collection = _patch_find(collection)
+    collection = _patch_count_documents(collection)
+    collection = _patch_time_limits(collection)
     collection._patched_by_mongomock_motor = True  # type: ignore
     return collection
 
@@ -0,0 +1,111 @@
+import asyncio
+import itertools
+import weakref
+from collections import deque
+from typing import Any, Deque, List, Optional
+
+from .cursor_manager import DEFAULT_BATCH_SIZE, ManagedCursor
+
+# Number of batches produced ahead of consumer by default
+DEFAULT_MAX_BATCHES = 2
+
+_EXHAUSTED: List[Any] = []
+
+
+async def _produce(
+    managed: ManagedCursor,
+    queue: 'asyncio.Queue[Any]',
+    slots: asyncio.Semaphore,
+) -> None:
+    # doesn't refer to prefetcher, so abandoned prefetcher can be collected
+    batch_size = managed.batch_size or DEFAULT_BATCH_SIZE
+    try:
+        while True:
+            await slots.acquire()
+            try:
+                batch = list(itertools.islice(managed, batch_size))
+            except Exception as error:
+                queue.put_nowait(error)
+                return
+            queue.put_nowait(batch or _EXHAUSTED)
+            if not batch:
+                return
+            # let consumer run before the next batch is produced
+            await asyncio.sleep(0)
+    except asyncio.CancelledError:
+        managed.close()
+        raise
+
+
+def _cancel(loop: asyncio.AbstractEventLoop, task: 'asyncio.Task[None]') -> None:
+    if not loop.is_closed():
+        loop.call_soon_threadsafe(task.cancel)
+
+
+class Prefetcher:
+    """Produces batches of cursor in background task, ahead of consumer."""
+
+    def __init__(
+        self, managed: ManagedCursor, max_batches: int = DEFAULT_MAX_BATCHES
+    ) -> None:
+        self._managed = managed
+        self.max_batches = max(1, max_batches)
+        self._queue: Optional['asyncio.Queue[Any]'] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._batch: Deque[Any] = deque()
+        self._task: Optional['asyncio.Task[None]'] = None
+        self._is_exhausted = False
+
+    @property
+    def alive(self) -> bool:
+        return bool(self._batch) or not self._is_exhausted
+
+    def _start(self) -> 'asyncio.Task[None]':
+        # created here to be bound to the loop running the task
+        self._queue = asyncio.Queue()
+        # batch is only produced when there's room for it
+        self._slots = asyncio.Semaphore(self.max_batches)
+        loop = asyncio.get_running_loop()
+        task = loop.create_task(_produce(self._managed, self._queue, self._slots))
+        # producer of abandoned cursor would otherwise wait for room forever
+        weakref.finalize(self, _cancel, loop, task)
+        return task
+
+    async def _next_batch(self) -> bool:
+        if self._is_exhausted:
+            return False
+        if self._task is None:
+            self._task = self._start()
+        assert self._queue is not None and self._slots is not None
+        item = await self._queue.get()
+        self._slots.release()
+        if isinstance(item, Exception):
+            self._is_exhausted = True
+            raise item
+        if item is _EXHAUSTED:
+            self._is_exhausted = True
+            return False
+        self._batch.extend(item)
+        return True
+
+    async def next(self) -> Any:
+        if not self._batch and not await self._next_batch():
+            raise StopAsyncIteration()
+        return self._batch.popleft()
+
+    async def to_list(self) -> List[Any]:
+        documents = list(self._batch)
+        self._batch.clear()
+        while await self._next_batch():
+            documents.extend(self._batch)
+            self._batch.clear()
+        return documents
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        self._batch.clear()
+        self._is_exhausted = True
+
+
+__all__ = ['DEFAULT_MAX_BATCHES', 'Prefetcher']
@@ -0,0 +1,401 @@
+import asyncio
+import functools
+import inspect
+import itertools
+import statistics
+import time
+import warnings
+import weakref
+from collections import defaultdict
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import bson
+from bson import json_util
+from bson.errors import InvalidDocument
+from pymongo import IndexModel
+
+from . import (
+    AsyncCommandCursor,
+    AsyncCursor,
+    AsyncLatentCommandCursor,
+    AsyncMongoMockClient,
+    AsyncMongoMockCollection,
+    AsyncMongoMockDatabase,
+)
+
+# Methods of clients, databases and collections returning cursors
+CURSOR_METHODS = ('aggregate', 'find', 'list_indexes')
+
+# Methods of cursors returning cursors themselves
+CHAINING_METHODS = (
+    'add_option',
+    'allow_disk_use',
+    'batch_size',
+    'collation',
+    'comment',
+    'hint',
+    'limit',
+    'max_await_time_ms',
+    'max_scan',
+    'max_time_ms',
+    'max',
+    'min',
+    'prefetch',
+    'remove_option',
+    'skip',
+    'sort',
+    'where',
+)
+
+PERCENTILES = (50, 90, 99)
+
+_TARGETS = {
+    AsyncMongoMockClient: 'client',
+    AsyncMongoMockDatabase: 'database',
+    AsyncMongoMockCollection: 'collection',
+}
+
+_CURSORS = (AsyncCursor, AsyncCommandCursor, AsyncLatentCommandCursor)
+
+_JSON_OPTIONS = json_util.CANONICAL_JSON_OPTIONS
+
+_ENCODING_ERRORS = (InvalidDocument, OverflowError, TypeError, ValueError)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, IndexModel):
+        return {'$indexModel': value.document}
+    if isinstance(value, (list, tuple)):
+        return [_encode_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _encode_value(item) for key, item in value.items()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_decode_value(item) for item in value]
+    if isinstance(value, dict):
+        if list(value) == ['$indexModel']:
+            document = dict(value['$indexModel'])
+            return IndexModel(list(document.pop('key').items()), **document)
+        return {key: _decode_value(item) for key, item in value.items()}
+    return value
+
+
+def _get_namespace(target: Any) -> str:
+    if isinstance(target, AsyncMongoMockCollection):
+        return target.full_name  # type: ignore
+    if isinstance(target, AsyncMongoMockDatabase):
+        return target.name
+    return ''
+
+
+def _iter_methods(cls: type) -> Iterator[Tuple[str, Callable]]:
+    seen = set()
+    for klass in cls.__mro__[:-1]:
+        for name, value in vars(klass).items():
+            if name in seen or not inspect.isfunction(value):
+                continue
+            seen.add(name)
+            if name.startswith('_') and name != '__anext__':
+                continue
+            yield name, value
+
+
+class Recorder:
+    """
+    Records every call of async methods of clients, databases, collections
+    and cursors (and calls creating and chaining cursors) with arguments,
+    namespace, task and timing to a stream of Extended JSON lines or BSON
+    documents, which can be replayed with Replayer. Methods are patched
+    only while recording, so there's no overhead otherwise.
+    """
+
+    def __init__(self, file: IO, format: str = 'json') -> None:
+        if format not in ('json', 'bson'):
+            raise ValueError(f'unknown format: {format!r}')
+        self.file = file
+        self.format = format
+        self._started = 0.0
+        self._patches: List[Tuple[type, str, Optional[Callable]]] = []
+        self._cursor_ids: 'weakref.WeakKeyDictionary[Any, int]' = (
+            weakref.WeakKeyDictionary()
+        )
+        self._task_ids: 'weakref.WeakKeyDictionary[asyncio.Task, int]' = (
+            weakref.WeakKeyDictionary()
+        )
+        self._ids = itertools.count(1)
+        self._task_counter = itertools.count(1)
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        for cls in (*_TARGETS, *_CURSORS):
+            for name, method in list(_iter_methods(cls)):
+                wrapper = self._make_wrapper(cls, name, method)
+                if wrapper is not None:
+                    self._patches.append((cls, name, vars(cls).get(name)))
+                    setattr(cls, name, wrapper)
+
+    def stop(self) -> None:
+        for cls, name, original in reversed(self._patches):
+            if original is None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, original)
+        self._patches = []
+
+    def __enter__(self) -> 'Recorder':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _make_wrapper(self, cls: type, name: str, method: Callable) -> Any:
+        is_cursor = issubclass(cls, _CURSORS)
+        if inspect.iscoroutinefunction(method):
+            operation = 'next' if name == '__anext__' else name
+
+            @functools.wraps(method)
+            async def async_wrapper(instance, *args, **kwargs):
+                started = time.perf_counter()
+                error = None
+                try:
+                    return await method(instance, *args, **kwargs)
+                except Exception as exception:
+                    error = type(exception).__name__
+                    raise
+                finally:
+                    self._record(
+                        instance, is_cursor, operation, args, kwargs, started, error
+                    )
+
+            return async_wrapper
+
+        if (is_cursor and name in CHAINING_METHODS) or (
+            not is_cursor and name in CURSOR_METHODS
+        ):
+
+            @functools.wraps(method)
+            def wrapper(instance, *args, **kwargs):
+                started = time.perf_counter()
+                result = method(instance, *args, **kwargs)
+                if not is_cursor:
+                    self._cursor_ids[result] = next(self._ids)
+                self._record(
+                    instance, is_cursor, name, args, kwargs, started, None, result
+                )
+                return result
+
+            return wrapper
+
+        return None
+
+    def _record(
+        self,
+        instance: Any,
+        is_cursor: bool,
+        operation: str,
+        args: tuple,
+        kwargs: dict,
+        started: float,
+        error: Optional[str],
+        cursor: Any = None,
+    ) -> None:
+        duration = time.perf_counter() - started
+        task = asyncio.current_task()
+        task_id = 0
+        if task is not None:
+            task_id = self._task_ids.get(task) or self._task_ids.setdefault(
+                task, next(self._task_counter)
+            )
+        record: Dict[str, Any] = {
+            'task': task_id,
+            'start': started - self._started,
+            'duration': duration,
+            'op': operation,
+            'args': _encode_value(args),
+            'kwargs': _encode_value(kwargs),
+        }
+        if is_cursor:
+            cursor_id = self._cursor_ids.get(instance)
+            if cursor_id is None:
+                # cursor was created before recording started
+                return
+            record['cursor'] = cursor_id
+        else:
+            record['target'] = _TARGETS.get(_get_target_class(instance), 'client')
+            record['ns'] = _get_namespace(instance)
+            if cursor is not None:
+                record['cursor'] = self._cursor_ids[cursor]
+        if error is not None:
+            record['error'] = error
+        self._write(record)
+
+    def _encode(self, record: Dict[str, Any]) -> Any:
+        if self.format == 'bson':
+            return bson.encode(record)
+        return json_util.dumps(record, json_options=_JSON_OPTIONS) + '\n'
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        try:
+            data = self._encode(record)
+        except _ENCODING_ERRORS as error:
+            warnings.warn(
+                f'arguments of {record["op"]!r} can not be recorded: {error}',
+                RuntimeWarning,
+                stacklevel=2,
+            )
+            # placeholder keeps later operations of created cursor replayable
+            data = self._encode({**record, 'args': [], 'kwargs': {}, 'skipped': True})
+        self.file.write(data)
+
+
+def _get_target_class(instance: Any) -> Optional[type]:
+    for cls in _TARGETS:
+        if isinstance(instance, cls):
+            return cls
+    return None
+
+
+def read_records(file: IO, format: str = 'json') -> Iterator[Dict[str, Any]]:
+    """Reads records written by Recorder."""
+
+    if format == 'bson':
+        yield from bson.decode_file_iter(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json_util.loads(line, json_options=_JSON_OPTIONS)
+
+
+class ReplayReport:
+    """Latencies (in seconds) and errors of replayed operations."""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.elapsed = 0.0
+
+    def percentiles(self, operation: str) -> Dict[int, float]:
+        latencies = self.latencies[operation]
+        if len(latencies) < 2:
+            return {percentile: latencies[0] for percentile in PERCENTILES}
+        quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+        return {percentile: quantiles[percentile - 1] for percentile in PERCENTILES}
+
+    def format(self) -> str:
+        lines = [
+            f'{"operation":<24}{"count":>8}{"errors":>8}'
+            + ''.join(f'{f"p{percentile}":>12}' for percentile in PERCENTILES)
+        ]
+        for operation in sorted(self.latencies):
+            percentiles = self.percentiles(operation)
+            lines.append(
+                f'{operation:<24}{len(self.latencies[operation]):>8}'
+                f'{self.errors.get(operation, 0):>8}'
+                + ''.join(
+                    f'{percentiles[percentile] * 1e6:>9.1f} us'
+                    for percentile in PERCENTILES
+                )
+            )
+        lines.append(f'elapsed: {self.elapsed:.3f} s')
+        return '\n'.join(lines)
+
+
+class Replayer:
+    """
+    Replays records of Recorder against client, operations of every
+    recorded task are replayed by a task of its own, so concurrency is the
+    same as original, and operations start in original order. With "speed"
+    they start at original moments (scaled by "speed"), without it they're
+    replayed as fast as possible. Operations which failed originally are
+    expected to fail again, so only unexpected outcomes are counted as
+    errors.
+    """
+
+    def __init__(
+        self,
+        records: Iterable[Dict[str, Any]],
+        client: Optional[AsyncMongoMockClient] = None,
+        speed: Optional[float] = 1.0,
+    ) -> None:
+        self.records = list(records)
+        self.client = client or AsyncMongoMockClient()
+        self.speed = speed
+        self._cursors: Dict[int, Any] = {}
+        self._started_count = 0
+
+    async def run(self) -> ReplayReport:
+        report = ReplayReport()
+        tasks: Dict[int, List[Tuple[int, Dict[str, Any]]]] = defaultdict(list)
+        records = sorted(self.records, key=lambda record: record['start'])
+        for index, record in enumerate(records):
+            tasks[record['task']].append((index, record))
+
+        self._started_count = 0
+        condition = asyncio.Condition()
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                self._replay(records, started, condition, report)
+                for records in tasks.values()
+            )
+        )
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    async def _replay(
+        self,
+        records: List[Tuple[int, Dict[str, Any]]],
+        started: float,
+        condition: asyncio.Condition,
+        report: ReplayReport,
+    ) -> None:
+        for index, record in records:
+            if self.speed:
+                delay = record['start'] / self.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            async with condition:
+                await condition.wait_for(lambda: self._started_count == index)
+                self._started_count += 1
+                condition.notify_all()
+
+            operation = record['op']
+            error = None
+            operation_started = time.perf_counter()
+            try:
+                await self._apply(record)
+            except Exception as exception:
+                error = type(exception).__name__
+            report.latencies[operation].append(time.perf_counter() - operation_started)
+            if error != record.get('error'):
+                report.errors[operation] += 1
+
+    async def _apply(self, record: Dict[str, Any]) -> None:
+        args = _decode_value(record['args'])
+        kwargs = _decode_value(record['kwargs'])
+        # operation without recorded arguments is only replayed to create cursor
+        if record.get('skipped') and not ('target' in record and 'cursor' in record):
+            return
+        if 'target' in record:
+            target: Any = self.client
+            if record['target'] == 'database':
+                target = self.client[record['ns']]
+            elif record['target'] == 'collection':
+                database, collection = record['ns'].split('.', 1)
+                target = self.client[database][collection]
+            result = getattr(target, record['op'])(*args, **kwargs)
+            if 'cursor' in record:
+                self._cursors[record['cursor']] = result
+                return
+        else:
+            cursor = self._cursors[record['cursor']]
+            result = getattr(cursor, record['op'])(*args, **kwargs)
+        if inspect.isawaitable(result):
+            await result
+
+
+__all__ = ['ReplayReport', 'Recorder', 'Replayer', 'read_records']
@@ -0,0 +1,445 @@
+import os
+import pickle
+import socket
+import struct
+import threading
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from mongomock.store import ServerStore
+
+# Number of documents server sends per frame when client iterates cursor
+BATCH_SIZE = 1000
+
+# Commands answered by client itself, see AsyncMongoMockDatabase.command
+_LOCAL_COMMANDS = ('buildinfo', 'getmore', 'killcursors')
+
+_HEADER = struct.Struct('!I')
+
+Path = Tuple[str, ...]
+Call = Tuple[str, tuple, dict]
+
+
+def get_socket_address(address: str) -> Tuple[int, Any]:
+    """
+    Returns socket family and address for address of mock server, which is
+    either "host:port" (TCP) or path of Unix socket.
+    """
+
+    host, separator, port = address.rpartition(':')
+    if separator and host and port.isdigit() and not any(c in host for c in '/\\'):
+        return socket.AF_INET, (host, int(port))
+
+    # there are no Unix sockets on Windows
+    family = getattr(socket, 'AF_UNIX', None)
+    if family is None:
+        raise ValueError(f'Unix sockets are not supported, use "host:port": {address}')
+    return family, address
+
+
+def connect(address: str) -> socket.socket:
+    family, socket_address = get_socket_address(address)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        if family == socket.AF_INET:
+            # requests are small and wait for reply
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.connect(socket_address)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+def send_frame(sock: socket.socket, payload: Any) -> None:
+    data = pickle.dumps(payload, pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _receive_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    while view:
+        received = sock.recv_into(view)
+        if not received:
+            raise ConnectionError('mock server closed connection')
+        view = view[received:]
+    return bytes(buffer)
+
+
+def receive_frame(sock: socket.socket) -> Any:
+    (size,) = _HEADER.unpack(_receive_exactly(sock, _HEADER.size))
+    return pickle.loads(_receive_exactly(sock, size))
+
+
+class Connection:
+    """
+    Connection to mock server (see mongomock_motor.server). Every frame is
+    a batch of requests, and requests which don't need a reply (like killing
+    cursors) are deferred until the next frame instead of costing a round
+    trip of their own.
+    """
+
+    def __init__(self, address: str) -> None:
+        self.address = address
+        self._socket: Optional[socket.socket] = None
+        self._deferred: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def request(self, request: tuple) -> Any:
+        with self._lock:
+            if self._socket is None:
+                self._socket = connect(self.address)
+            requests, self._deferred = [*self._deferred, request], []
+            send_frame(self._socket, requests)
+            is_ok, result = receive_frame(self._socket)[-1]
+        if not is_ok:
+            raise result
+        return result
+
+    def defer(self, request: tuple) -> None:
+        with self._lock:
+            self._deferred.append(request)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._socket is not None:
+                self._socket.close()
+                self._socket = None
+            self._deferred = []
+
+
+def _without_session(kwargs: dict) -> dict:
+    kwargs.pop('session', None)
+    return kwargs
+
+
+def with_remote_methods(remote_methods: List[str]):
+    def decorator(cls):
+        for method_name in remote_methods:
+
+            def make_method(method_name: str):
+                def method(self, *args, **kwargs):
+                    return self._call([(method_name, args, _without_session(kwargs))])
+
+                return method
+
+            setattr(cls, method_name, make_method(method_name))
+
+        return cls
+
+    return decorator
+
+
+def with_recorded_chaining_methods(chaining_methods: List[str]):
+    def decorator(cls):
+        for method_name in chaining_methods:
+
+            def make_method(method_name: str):
+                def method(self, *args, **kwargs):
+                    self._calls.append((method_name, args, kwargs))
+                    return self
+
+                return method
+
+            setattr(cls, method_name, make_method(method_name))
+
+        return cls
+
+    return decorator
+
+
+@with_recorded_chaining_methods(
+    [
+        'add_option',
+        'allow_disk_use',
+        'collation',
+        'comment',
+        'hint',
+        'limit',
+        'max_await_time_ms',
+        'max_scan',
+        'max_time_ms',
+        'max',
+        'min',
+        'remove_option',
+        'skip',
+        'sort',
+        'where',
+    ]
+)
+class RemoteCursor:
+    """
+    Cursor of mock server. Calls are recorded and sent along with request
+    opening server side cursor, documents are received in batches.
+    """
+
+    _max_time_ms = None
+
+    def __init__(
+        self,
+        connection: Connection,
+        collection: Optional['RemoteCollection'],
+        path: Path,
+        calls: List[Call],
+    ) -> None:
+        self.connection = connection
+        self.collection = collection
+        self._path = path
+        self._calls = calls
+
+    def __iter__(self) -> Iterator[Any]:
+        connection = self.connection
+        cursor_id, documents = connection.request(
+            ('open', self._path, self._calls, BATCH_SIZE)
+        )
+        try:
+            while True:
+                yield from documents
+                if not cursor_id:
+                    return
+                cursor_id, documents = connection.request(
+                    ('get_more', cursor_id, BATCH_SIZE)
+                )
+        finally:
+            if cursor_id:
+                connection.defer(('kill', [cursor_id]))
+
+    def distinct(self, *args, **kwargs) -> Any:
+        return self.connection.request(
+            ('call', self._path, [*self._calls, ('distinct', args, kwargs)])
+        )
+
+    def clone(self) -> 'RemoteCursor':
+        return RemoteCursor(
+            self.connection, self.collection, self._path, list(self._calls)
+        )
+
+    def close(self) -> None:
+        pass
+
+
+@with_remote_methods(
+    [
+        'bulk_write',
+        'count_documents',
+        'create_index',
+        'create_indexes',
+        'delete_many',
+        'delete_one',
+        'distinct',
+        'drop_index',
+        'drop_indexes',
+        'drop',
+        'estimated_document_count',
+        'find_one_and_delete',
+        'find_one_and_replace',
+        'find_one_and_update',
+        'find_one',
+        'index_information',
+        'list_indexes',
+        'options',
+        'rename',
+        'replace_one',
+        'update_many',
+        'update_one',
+    ]
+)
+class RemoteCollection:
+    """Collection of mock server, mirrors API of mongomock's Collection."""
+
+    # there's nothing to patch, collection lives in the server process
+    _patched_by_mongomock_motor = True
+
+    def __init__(self, database: 'RemoteDatabase', name: str) -> None:
+        self.database = database
+        self.name = name
+        self.connection = database.connection
+        self._path = (database.server_name, name)
+
+    @property
+    def full_name(self) -> str:
+        return f'{self.database.name}.{self.name}'
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RemoteCollection):
+            return NotImplemented
+        return self._path == other._path and self.connection is other.connection
+
+    def __hash__(self) -> int:
+        return hash(self._path)
+
+    def __getitem__(self, name: str) -> 'RemoteCollection':
+        return RemoteCollection(self.database, f'{self.name}.{name}')
+
+    def __getattr__(self, name: str) -> 'RemoteCollection':
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def _call(self, calls: List[Call]) -> Any:
+        return self.connection.request(('call', self._path, calls))
+
+    def insert_one(self, document: Any, *args, **kwargs) -> Any:
+        # same as drivers do, "_id" is generated by client
+        if '_id' not in document:
+            document['_id'] = ObjectId()
+        return self._call([('insert_one', (document, *args), _without_session(kwargs))])
+
+    def insert_many(self, documents: Iterable[Any], *args, **kwargs) -> Any:
+        documents = list(documents)
+        for document in documents:
+            if '_id' not in document:
+                document['_id'] = ObjectId()
+        return self._call(
+            [('insert_many', (documents, *args), _without_session(kwargs))]
+        )
+
+    def find(self, *args, **kwargs) -> RemoteCursor:
+        if kwargs.get('cursor_type'):
+            raise NotImplementedError('tailable cursors of mock server')
+        return RemoteCursor(self.connection, self, self._path, [('find', args, kwargs)])
+
+    def aggregate(self, *args, **kwargs) -> RemoteCursor:
+        return RemoteCursor(
+            self.connection,
+            None,
+            self._path,
+            [('aggregate', args, _without_session(kwargs))],
+        )
+
+
+@with_remote_methods(
+    [
+        'dereference',
+        'drop_collection',
+        'list_collection_names',
+        'validate_collection',
+    ]
+)
+class RemoteDatabase:
+    """Database of mock server, mirrors API of mongomock's Database."""
+
+    def __init__(self, client: 'RemoteMongoClient', name: str) -> None:
+        self.client = client
+        self.name = name
+        self.connection = client.connection
+        self.server_name = client.get_server_name(name)
+        self._path = (self.server_name,)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RemoteDatabase):
+            return NotImplemented
+        return self._path == other._path and self.connection is other.connection
+
+    def __hash__(self) -> int:
+        return hash(self._path)
+
+    def _call(self, calls: List[Call]) -> Any:
+        return self.connection.request(('call', self._path, calls))
+
+    def get_collection(self, name: str, *args, **kwargs) -> RemoteCollection:
+        return RemoteCollection(self, name)
+
+    def create_collection(self, name: str, *args, **kwargs) -> RemoteCollection:
+        self._call([('create_collection', (name, *args), _without_session(kwargs))])
+        return self.get_collection(name)
+
+    def aggregate(self, *args, **kwargs) -> RemoteCursor:
+        return RemoteCursor(
+            self.connection,
+            None,
+            self._path,
+            [('aggregate', args, _without_session(kwargs))],
+        )
+
+    def command(self, command: Any, *args, **kwargs) -> Any:
+        name = command if isinstance(command, str) else next(iter(command), '')
+        if name.lower() in _LOCAL_COMMANDS:
+            raise NotImplementedError(name)
+        return self._call([('command', (command, *args), _without_session(kwargs))])
+
+
+class RemoteMongoClient:
+    """
+    Client of mock server, mirrors API of mongomock's MongoClient. Names of
+    databases are prefixed with "namespace" on server, unless database is
+    one of "shared_databases", so that workers don't see data of each other
+    but can share fixtures seeded once.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        namespace: Optional[str] = None,
+        shared_databases: Iterable[str] = (),
+    ) -> None:
+        self.address = address
+        self.namespace = namespace
+        self.shared_databases = frozenset(shared_databases)
+        self.connection = Connection(address)
+        # nothing is stored locally, there's just nothing for TTL monitor
+        self._store = ServerStore()
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RemoteMongoClient):
+            return NotImplemented
+        return (self.address, self.namespace) == (other.address, other.namespace)
+
+    def __hash__(self) -> int:
+        return hash((self.address, self.namespace))
+
+    def get_server_name(self, name: str) -> str:
+        if self.namespace is None or name in self.shared_databases:
+            return name
+        return f'{self.namespace}_{name}'
+
+    def get_database(self, name: str, *args, **kwargs) -> RemoteDatabase:
+        return RemoteDatabase(self, name)
+
+    def list_database_names(self, *args, **kwargs) -> List[str]:
+        names = self.connection.request(('call', (), [('list_database_names', (), {})]))
+        if self.namespace is None:
+            return names
+        prefix = f'{self.namespace}_'
+        return [
+            name[len(prefix) :] if name.startswith(prefix) else name
+            for name in names
+            if name.startswith(prefix) or name in self.shared_databases
+        ]
+
+    def drop_database(self, name_or_database: Any, *args, **kwargs) -> None:
+        if not isinstance(name_or_database, str):
+            name_or_database = name_or_database.name
+        self.connection.request(
+            (
+                'call',
+                (),
+                [('drop_database', (self.get_server_name(name_or_database),), {})],
+            )
+        )
+
+    def server_info(self, *args, **kwargs) -> Any:
+        return self.connection.request(('call', (), [('server_info', (), {})]))
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def get_namespace() -> Optional[str]:
+    """Returns name of pytest-xdist worker, so that workers are isolated."""
+
+    return os.environ.get('PYTEST_XDIST_WORKER')
+
+
+__all__ = [
+    'BATCH_SIZE',
+    'Connection',
+    'RemoteCollection',
+    'RemoteCursor',
+    'RemoteDatabase',
+    'RemoteMongoClient',
+    'get_namespace',
+    'receive_frame',
+    'send_frame',
+]
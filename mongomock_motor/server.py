@@ -0,0 +1,216 @@
+import asyncio
+import ipaddress
+import itertools
+import multiprocessing
+import os
+import pickle
+import socket
+import sys
+import time
+from multiprocessing.process import BaseProcess
+from typing import Any, Dict, List, Optional
+
+from pymongo.errors import OperationFailure
+
+from . import (
+    AsyncCommandCursor,
+    AsyncCursor,
+    AsyncLatentCommandCursor,
+    AsyncMongoMockClient,
+    AsyncMongoMockCollection,
+    AsyncMongoMockDatabase,
+)
+from .remote import _HEADER, Path, connect, get_socket_address
+
+_CURSORS = (AsyncCursor, AsyncCommandCursor, AsyncLatentCommandCursor)
+
+
+def _is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _encode_error(error: Exception) -> Exception:
+    try:
+        pickle.dumps(error)
+    except Exception:
+        return OperationFailure(f'{type(error).__name__}: {error}')
+    return error
+
+
+async def _read_batch(cursor: Any, size: int) -> List[Any]:
+    documents = []
+    async for document in cursor:
+        documents.append(document)
+        if len(documents) >= size:
+            break
+    return documents
+
+
+class MockServer:
+    """
+    Serves store of AsyncMongoMockClient to other processes over Unix socket
+    or TCP ("host:port" address), see RemoteMongoClient. Requests of one
+    connection are handled in order, every request is handled by "client"
+    as is.
+    """
+
+    def __init__(
+        self, address: str, client: Optional[AsyncMongoMockClient] = None
+    ) -> None:
+        self.address = address
+        self.client = client or AsyncMongoMockClient()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._cursors: Dict[int, Any] = {}
+        self._ids = itertools.count(1)
+
+    @property
+    def open_cursors(self) -> int:
+        return len(self._cursors)
+
+    async def start(self) -> None:
+        family, address = get_socket_address(self.address)
+        if family == socket.AF_INET:
+            host, port = address
+            # requests are unpickled, so whoever can connect can run code
+            if not _is_loopback(host):
+                raise ValueError(f'mock server only listens on loopback: {host}')
+            self._server = await asyncio.start_server(self._serve, host, port)
+        else:
+            self._server = await asyncio.start_unix_server(self._serve, address)
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()  # type: ignore
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        family, _ = get_socket_address(self.address)
+        if family != socket.AF_INET and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    async def __aenter__(self) -> 'MockServer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        cursor_ids = set()
+        self.client.server_stats.connection_opened()
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                (size,) = _HEADER.unpack(header)
+                requests = pickle.loads(await reader.readexactly(size))
+                replies = []
+                for request in requests:
+                    try:
+                        replies.append((True, await self._handle(request, cursor_ids)))
+                    except Exception as error:
+                        replies.append((False, _encode_error(error)))
+                data = pickle.dumps(replies, pickle.HIGHEST_PROTOCOL)
+                writer.write(_HEADER.pack(len(data)) + data)
+                await writer.drain()
+        finally:
+            # cursors of disconnected client are killed
+            for cursor_id in cursor_ids:
+                self._cursors.pop(cursor_id, None)
+            self.client.server_stats.connection_closed()
+            writer.close()
+
+    async def _handle(self, request: tuple, cursor_ids: set) -> Any:
+        kind, *arguments = request
+        if kind == 'call':
+            path, calls = arguments
+            result = await self._call(path, calls)
+            if isinstance(result, _CURSORS):
+                return await result.to_list(None)
+            if isinstance(result, (AsyncMongoMockCollection, AsyncMongoMockDatabase)):
+                return None
+            return result
+        if kind == 'open':
+            path, calls, batch_size = arguments
+            cursor_id = next(self._ids)
+            self._cursors[cursor_id] = await self._call(path, calls)
+            cursor_ids.add(cursor_id)
+            return await self._get_more(cursor_id, batch_size, cursor_ids)
+        if kind == 'get_more':
+            cursor_id, batch_size = arguments
+            return await self._get_more(cursor_id, batch_size, cursor_ids)
+        if kind == 'kill':
+            for cursor_id in arguments[0]:
+                self._cursors.pop(cursor_id, None)
+                cursor_ids.discard(cursor_id)
+            return None
+        raise OperationFailure(f'unknown request: {kind!r}')
+
+    async def _call(self, path: Path, calls: List[Any]) -> Any:
+        target: Any = self.client
+        for name in path:
+            target = target[name]
+        for name, args, kwargs in calls:
+            target = getattr(target, name)(*args, **kwargs)
+            if asyncio.iscoroutine(target):
+                target = await target
+        return target
+
+    async def _get_more(self, cursor_id: int, batch_size: int, cursor_ids: set) -> Any:
+        cursor = self._cursors.get(cursor_id)
+        if cursor is None:
+            raise OperationFailure(f'cursor id {cursor_id} not found', 43)
+        documents = await _read_batch(cursor, batch_size)
+        if len(documents) < batch_size:
+            del self._cursors[cursor_id]
+            cursor_ids.discard(cursor_id)
+            cursor_id = 0
+        return cursor_id, documents
+
+
+def run_server(address: str) -> None:
+    """Runs mock server until process is terminated."""
+
+    asyncio.run(MockServer(address).serve_forever())
+
+
+def start_server_process(address: str, timeout: float = 10.0) -> BaseProcess:
+    """
+    Starts mock server in a separate process and waits for it to accept
+    connections, process should be terminated by the caller.
+    """
+
+    process = multiprocessing.get_context('spawn').Process(
+        target=run_server, args=(address,), daemon=True
+    )
+    process.start()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            connect(address).close()
+            return process
+        except OSError:
+            if not process.is_alive() or time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError(f'mock server at {address} has not started')
+            time.sleep(0.01)
+
+
+__all__ = ['MockServer', 'run_server', 'start_server_process']
+
+
+if __name__ == '__main__':
+    run_server(sys.argv[1])
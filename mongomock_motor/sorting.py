@@ -0,0 +1,77 @@
+import heapq
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+from mongomock import filtering
+
+SortSpec = Sequence[Tuple[str, int]]
+
+
+class _SortKey:
+    """Composite sort key that respects direction of every sorted field."""
+
+    __slots__ = ('values', 'directions')
+
+    def __init__(self, values: List[Any], directions: List[int]) -> None:
+        self.values = values
+        self.directions = directions
+
+    def __lt__(self, other: '_SortKey') -> bool:
+        for a, b, direction in zip(self.values, other.values, self.directions):
+            if a < b:
+                return direction > 0
+            if b < a:
+                return direction < 0
+        return False
+
+    def __eq__(self, other: object) -> bool:
+        # heapq compares keys for equality to fall back to insertion order
+        if not isinstance(other, _SortKey):
+            return NotImplemented
+        return not (self < other or other < self)
+
+    __hash__ = None  # type: ignore
+
+
+def normalize_sort(sort: Any) -> Optional[SortSpec]:
+    """
+    Returns list of (key, direction) pairs or None if sort can't be handled
+    without "mongomock" (e.g. sorting by "$natural" or by meta fields).
+    """
+
+    if isinstance(sort, dict):
+        sort = list(sort.items())
+
+    # keys might be str-like objects (e.g. beanie's ExpressionField)
+    sort = [(str(key), direction) for key, direction in sort or []]
+    if not sort or any(
+        key.startswith('$') or isinstance(direction, dict) for key, direction in sort
+    ):
+        return None
+
+    return sort
+
+
+def make_sort_key(sort: SortSpec) -> Callable[[Any], _SortKey]:
+    keys = [key for key, _ in sort]
+    directions = [direction for _, direction in sort]
+
+    def sort_key(document: Any) -> _SortKey:
+        return _SortKey(
+            [filtering.resolve_sort_key(key, document) for key in keys],
+            directions,
+        )
+
+    return sort_key
+
+
+def top_k(documents: Iterable[Any], sort: SortSpec, k: int) -> List[Any]:
+    """
+    Returns first k documents in sorted order, keeping bounded heap of k
+    documents instead of sorting all of them. Same as stable sort followed
+    by slicing.
+    """
+
+    return heapq.nsmallest(k, documents, key=make_sort_key(sort))
+
+
+__all__ = ['make_sort_key', 'normalize_sort', 'top_k']
@@ -0,0 +1,351 @@
+import itertools
+import os
+import socket
+import struct
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sized, Tuple
+
+import mongomock
+from mongomock import OperationFailure
+from mongomock.collection import Collection
+from mongomock.database import Database
+from mongomock.filtering import filter_applies
+
+from .capped import get_capped_store
+from .cursor_manager import CursorManager, _document_size
+from .indexes import _MISSING, _iter_path_values
+from .typing import DocumentType
+
+OPCOUNTERS = ('insert', 'query', 'update', 'delete', 'getmore', 'command')
+
+# Counters incremented by methods of collections and databases
+OPERATIONS = {
+    'aggregate': 'command',
+    'bulk_write': 'command',
+    'count_documents': 'command',
+    'count': 'command',
+    'create_collection': 'command',
+    'create_index': 'command',
+    'create_indexes': 'command',
+    'delete_many': 'delete',
+    'delete_one': 'delete',
+    'distinct': 'command',
+    'drop_collection': 'command',
+    'drop_index': 'command',
+    'drop_indexes': 'command',
+    'drop': 'command',
+    'estimated_document_count': 'command',
+    'find_and_modify': 'command',
+    'find_one_and_delete': 'command',
+    'find_one_and_replace': 'command',
+    'find_one_and_update': 'command',
+    'find_one': 'query',
+    'find': 'query',
+    'index_information': 'command',
+    'insert_many': 'insert',
+    'insert_one': 'insert',
+    'list_collection_names': 'command',
+    'list_indexes': 'command',
+    'rename': 'command',
+    'replace_one': 'update',
+    'update_many': 'update',
+    'update_one': 'update',
+}
+
+# Same as "available" connections of mongod with default limits
+AVAILABLE_CONNECTIONS = 838860
+
+_LATENCY_KINDS = {
+    'insert': 'writes',
+    'update': 'writes',
+    'delete': 'writes',
+    'query': 'reads',
+    'getmore': 'reads',
+    'command': 'commands',
+}
+
+_BULK_WRITE_COUNTERS = {
+    'InsertOne': 'insert',
+    'UpdateOne': 'update',
+    'UpdateMany': 'update',
+    'ReplaceOne': 'update',
+    'DeleteOne': 'delete',
+    'DeleteMany': 'delete',
+}
+
+# Every key of index is stored along with id of the record
+_RECORD_ID_SIZE = 8
+
+# Length and terminator of BSON document
+_EMPTY_DOCUMENT_SIZE = 5
+
+
+class ServerStats:
+    """Operation counters, latencies and connections of mock server."""
+
+    def __init__(self, is_enabled: bool = False) -> None:
+        self.is_enabled = is_enabled
+        self.started = time.monotonic()
+        self.opcounters: Dict[str, int] = dict.fromkeys(OPCOUNTERS, 0)
+        self.latencies: Dict[str, Dict[str, List[int]]] = defaultdict(
+            lambda: {kind: [0, 0] for kind in ('reads', 'writes', 'commands')}
+        )
+        self.current_connections = 1
+        self.total_connections = 1
+
+    def record(
+        self,
+        namespace: str,
+        operation: str,
+        args: tuple,
+        kwargs: dict,
+        latency: float,
+    ) -> None:
+        """Counts call of collection or database method taking "latency" seconds."""
+
+        counter = OPERATIONS[operation]
+        if operation == 'insert_many':
+            documents = args[0] if args else kwargs.get('documents')
+            self.count('insert', len(documents) if isinstance(documents, Sized) else 1)
+        elif operation == 'bulk_write':
+            requests = args[0] if args else kwargs.get('requests', ())
+            for request in requests if isinstance(requests, (list, tuple)) else ():
+                self.count(_BULK_WRITE_COUNTERS.get(type(request).__name__, counter))
+        else:
+            self.count(counter)
+        kind = 'writes' if operation == 'bulk_write' else _LATENCY_KINDS[counter]
+        entry = self.latencies[namespace][kind]
+        entry[0] += int(latency * 1e6)
+        entry[1] += 1
+
+    def count(self, counter: str, number: int = 1) -> None:
+        self.opcounters[counter] += number
+
+    def connection_opened(self) -> None:
+        self.current_connections += 1
+        self.total_connections += 1
+
+    def connection_closed(self) -> None:
+        self.current_connections -= 1
+
+
+def _get_scale(command: DocumentType) -> int:
+    scale = command.get('scale', 1)
+    if isinstance(scale, bool) or not isinstance(scale, (int, float)) or scale < 1:
+        raise OperationFailure('scale has to be a number >= 1', 2)
+    return int(scale)
+
+
+def _key_values(document: DocumentType, field: str) -> List[Any]:
+    values = [
+        None if value is _MISSING else value
+        for value in _iter_path_values(document, field.split('.'))
+        if not isinstance(value, (list, tuple))
+    ]
+    # empty arrays are indexed as a single key
+    return values or [None]
+
+
+def _key_size(value: Any) -> int:
+    return _document_size({'': value}) - _EMPTY_DOCUMENT_SIZE
+
+
+def _index_size(documents: Iterable[DocumentType], spec: DocumentType) -> int:
+    """
+    Returns size of keys of the index (in bytes), every key taking as much
+    as its values encoded to BSON and id of record.
+    """
+
+    fields = [field for field, _ in spec['key']]
+    partial = spec.get('partialFilterExpression')
+    size = 0
+    for document in documents:
+        if partial is not None and not filter_applies(partial, document):
+            continue
+        per_field = [_key_values(document, field) for field in fields]
+        if spec.get('sparse') and all(values == [None] for values in per_field):
+            continue
+        for key in itertools.product(*per_field):
+            size += sum(_key_size(value) for value in key) + _RECORD_ID_SIZE
+    return size
+
+
+def _collection_sizes(
+    collection: Collection,
+) -> Tuple[int, int, Dict[str, int]]:
+    """Returns count of documents, their size and sizes of indexes."""
+
+    store = collection._store
+    if not store.is_created:
+        return 0, 0, {}
+    documents = list(store.documents)
+    index_sizes = {'_id_': _index_size(documents, {'key': [('_id', 1)]})}
+    for name, spec in store.indexes.items():
+        index_sizes[name] = _index_size(documents, spec)
+    return len(documents), sum(map(_document_size, documents)), index_sizes
+
+
+def collection_stats(collection: Collection, command: DocumentType) -> DocumentType:
+    """Returns result of "collStats" command, sizes are divided by "scale"."""
+
+    scale = _get_scale(command)
+    count, size, index_sizes = _collection_sizes(collection)
+    index_size = sum(index_sizes.values())
+    stats: Dict[str, Any] = {
+        'ns': collection.full_name,
+        'size': size // scale,
+        'count': count,
+        'avgObjSize': size // count if count else 0,
+        'storageSize': size // scale,
+        'freeStorageSize': 0,
+        'capped': False,
+        'nindexes': len(index_sizes),
+        'indexBuilds': [],
+        'totalIndexSize': index_size // scale,
+        'totalSize': (size + index_size) // scale,
+        'indexSizes': {name: value // scale for name, value in index_sizes.items()},
+        'scaleFactor': scale,
+        'ok': 1.0,
+    }
+    capped = get_capped_store(collection)
+    if capped is not None:
+        stats['capped'] = True
+        stats['max'] = capped.capped_max or 0
+        stats['maxSize'] = capped.capped_size // scale
+    return stats
+
+
+def database_stats(database: Database, command: DocumentType) -> DocumentType:
+    """Returns result of "dbStats" command, sizes are divided by "scale"."""
+
+    scale = _get_scale(command)
+    names = database.list_collection_names()
+    objects = data_size = index_size = indexes = 0
+    for name in names:
+        count, size, index_sizes = _collection_sizes(database.get_collection(name))
+        objects += count
+        data_size += size
+        index_size += sum(index_sizes.values())
+        indexes += len(index_sizes)
+    return {
+        'db': database.name,
+        'collections': len(names),
+        'views': 0,
+        'objects': objects,
+        'avgObjSize': data_size / objects if objects else 0,
+        'dataSize': data_size / scale,
+        'storageSize': data_size / scale,
+        'indexes': indexes,
+        'indexSize': index_size / scale,
+        'totalSize': (data_size + index_size) / scale,
+        'scaleFactor': scale,
+        'ok': 1.0,
+    }
+
+
+def _memory_usage() -> Optional[Tuple[int, int]]:
+    """Returns resident and virtual memory of the process in megabytes."""
+
+    try:
+        with open('/proc/self/statm') as file:
+            virtual, resident = (int(pages) for pages in file.read().split()[:2])
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        return resident * page_size >> 20, virtual * page_size >> 20
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import psutil  # pyright: ignore[reportMissingModuleSource]
+    except ImportError:
+        pass
+    else:
+        memory = psutil.Process().memory_info()
+        return memory.rss >> 20, memory.vms >> 20
+
+    # there is no "resource" module on Windows
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # peak usage is the best we can get, it's in bytes on macOS and in
+    # kilobytes elsewhere
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    resident = usage >> 20 if sys.platform == 'darwin' else usage >> 10
+    return resident, resident
+
+
+def server_status(
+    stats: ServerStats, cursor_manager: CursorManager, version: str
+) -> DocumentType:
+    """Returns result of "serverStatus" command."""
+
+    uptime = time.monotonic() - stats.started
+    memory = _memory_usage()
+    return {
+        'host': socket.gethostname(),
+        'version': version,
+        'process': 'mongod',
+        'pid': os.getpid(),
+        'uptime': float(int(uptime)),
+        'uptimeMillis': int(uptime * 1000),
+        'uptimeEstimate': int(uptime),
+        'localTime': mongomock.utcnow(),  # pyright: ignore[reportAttributeAccessIssue]
+        'connections': {
+            'current': stats.current_connections,
+            'available': AVAILABLE_CONNECTIONS - stats.current_connections,
+            'totalCreated': stats.total_connections,
+        },
+        'mem': {
+            'bits': struct.calcsize('P') * 8,
+            'resident': memory[0] if memory else 0,
+            'virtual': memory[1] if memory else 0,
+            'supported': memory is not None,
+        },
+        'opcounters': {
+            **stats.opcounters,
+            'getmore': cursor_manager.get_mores if stats.is_enabled else 0,
+        },
+        'metrics': {'cursor': {'open': {'total': cursor_manager.open_cursors}}},
+        'ok': 1.0,
+    }
+
+
+def coll_stats_stage(
+    collection: Collection, options: DocumentType, stats: ServerStats
+) -> DocumentType:
+    """Returns the only document produced by "$collStats" stage."""
+
+    document: Dict[str, Any] = {
+        'ns': collection.full_name,
+        'host': socket.gethostname(),
+        'localTime': mongomock.utcnow(),  # pyright: ignore[reportAttributeAccessIssue]
+    }
+    if 'latencyStats' in options:
+        latencies = stats.latencies.get(collection.full_name) or {}
+        document['latencyStats'] = {
+            kind: {'latency': latency, 'ops': ops}
+            for kind, (latency, ops) in latencies.items()
+        }
+        for kind in ('reads', 'writes', 'commands', 'transactions'):
+            document['latencyStats'].setdefault(kind, {'latency': 0, 'ops': 0})
+    if 'storageStats' in options:
+        storage = dict(collection_stats(collection, options['storageStats'] or {}))
+        del storage['ok']
+        document['storageStats'] = storage
+    if 'count' in options:
+        document['count'] = len(collection._store)
+    return document
+
+
+__all__ = [
+    'OPCOUNTERS',
+    'OPERATIONS',
+    'ServerStats',
+    'coll_stats_stage',
+    'collection_stats',
+    'database_stats',
+    'server_status',
+]
@@ -0,0 +1,630 @@
+import re
+import unicodedata
+from collections import Counter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from mongomock import OperationFailure
+from mongomock.filtering import filter_applies, resolve_sort_key
+
+from .sorting import _SortKey
+from .typing import DocumentType
+
+if TYPE_CHECKING:
+    from .indexes import IndexedCollectionStore
+
+# Options of text indexes that "mongomock" doesn't keep in index spec
+TEXT_INDEX_OPTIONS = ('default_language', 'language_override', 'weights')
+
+_TOKEN_RE = re.compile(r'[^\W_]+')
+_QUERY_RE = re.compile(r'(-?)"([^"]*)"?|(-?)([^\s"]+)')
+
+_VOWELS = frozenset('aeiou')
+
+_ENGLISH_STOP_WORDS = frozenset(
+    """
+    a about above after again against all am an and any are as at be because
+    been before being below between both but by can could did do does doing
+    down during each few for from further had has have having he her here hers
+    herself him himself his how i if in into is it its itself just me more most
+    my myself no nor not now of off on once only or other our ours ourselves
+    out over own same she should so some such than that the their theirs them
+    themselves then there these they this those through to too under until up
+    very was we were what when where which while who whom why will with would
+    you your yours yourself yourselves
+    """.split()
+)
+
+_STEP_2_SUFFIXES = [
+    ('ational', 'ate'),
+    ('tional', 'tion'),
+    ('enci', 'ence'),
+    ('anci', 'ance'),
+    ('izer', 'ize'),
+    ('abli', 'able'),
+    ('alli', 'al'),
+    ('entli', 'ent'),
+    ('eli', 'e'),
+    ('ousli', 'ous'),
+    ('ization', 'ize'),
+    ('ation', 'ate'),
+    ('ator', 'ate'),
+    ('alism', 'al'),
+    ('iveness', 'ive'),
+    ('fulness', 'ful'),
+    ('ousness', 'ous'),
+    ('aliti', 'al'),
+    ('iviti', 'ive'),
+    ('biliti', 'ble'),
+]
+
+_STEP_3_SUFFIXES = [
+    ('icate', 'ic'),
+    ('ative', ''),
+    ('alize', 'al'),
+    ('iciti', 'ic'),
+    ('ical', 'ic'),
+    ('ful', ''),
+    ('ness', ''),
+]
+
+
+def _is_consonant(word: str, i: int) -> bool:
+    if word[i] in _VOWELS:
+        return False
+    if word[i] == 'y':
+        return i == 0 or not _is_consonant(word, i - 1)
+    return True
+
+
+def _measure(stem: str) -> int:
+    """Number of vowel-consonant sequences in the stem (Porter's "m")."""
+    forms = ''.join('c' if _is_consonant(stem, i) else 'v' for i in range(len(stem)))
+    return forms.count('vc')
+
+
+def _has_vowel(stem: str) -> bool:
+    return any(not _is_consonant(stem, i) for i in range(len(stem)))
+
+
+def _ends_with_cvc(stem: str) -> bool:
+    return (
+        len(stem) >= 3
+        and _is_consonant(stem, len(stem) - 3)
+        and not _is_consonant(stem, len(stem) - 2)
+        and _is_consonant(stem, len(stem) - 1)
+        and stem[-1] not in 'wxy'
+    )
+
+
+def _replace_suffix(
+    word: str, suffixes: List[Tuple[str, str]], min_measure: int
+) -> str:
+    for suffix, replacement in suffixes:
+        if word.endswith(suffix):
+            stem = word[: -len(suffix)]
+            if _measure(stem) >= min_measure:
+                return stem + replacement
+            return word
+    return word
+
+
+def english_stem(word: str) -> str:
+    """
+    Reduces english word to its stem with the first steps of Porter stemmer,
+    so different forms of the same word ("run", "runs", "running") match.
+    """
+
+    if len(word) <= 2:
+        return word
+
+    if word.endswith('sses') or word.endswith('ies'):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith('ss') and not word.endswith('us'):
+        word = word[:-1]
+
+    if word.endswith('eed'):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    else:
+        for suffix in ('ed', 'ing'):
+            stem = word[: -len(suffix)]
+            if word.endswith(suffix) and _has_vowel(stem):
+                word = stem
+                if word.endswith(('at', 'bl', 'iz')):
+                    word += 'e'
+                elif (
+                    len(word) >= 2
+                    and word[-1] == word[-2]
+                    and _is_consonant(word, len(word) - 1)
+                    and word[-1] not in 'lsz'
+                ):
+                    word = word[:-1]
+                elif _measure(word) == 1 and _ends_with_cvc(word):
+                    word += 'e'
+                break
+
+    if word.endswith('y') and _has_vowel(word[:-1]):
+        word = word[:-1] + 'i'
+
+    word = _replace_suffix(word, _STEP_2_SUFFIXES, 1)
+    word = _replace_suffix(word, _STEP_3_SUFFIXES, 1)
+
+    if word.endswith('e'):
+        stem = word[:-1]
+        if _measure(stem) > 1 or (_measure(stem) == 1 and not _ends_with_cvc(stem)):
+            word = stem
+
+    return word
+
+
+class Language(NamedTuple):
+    stem: Callable[[str], str]
+    stop_words: FrozenSet[str]
+
+
+_ENGLISH = Language(english_stem, _ENGLISH_STOP_WORDS)
+_NONE = Language(lambda word: word, frozenset())
+
+LANGUAGES: Dict[str, Language] = {
+    'english': _ENGLISH,
+    'en': _ENGLISH,
+    'none': _NONE,
+}
+
+
+def get_language(name: Any) -> Optional[Language]:
+    if not isinstance(name, str):
+        return None
+    return LANGUAGES.get(name.lower())
+
+
+def _fold(text: str, case_sensitive: bool, diacritic_sensitive: bool) -> str:
+    if not diacritic_sensitive:
+        text = ''.join(
+            char
+            for char in unicodedata.normalize('NFKD', text)
+            if not unicodedata.combining(char)
+        )
+    return text if case_sensitive else text.lower()
+
+
+def get_terms(
+    text: str,
+    language: Language,
+    case_sensitive: bool = False,
+    diacritic_sensitive: bool = False,
+) -> List[str]:
+    """Splits text into stemmed terms, leaving out stop words."""
+
+    terms = []
+    for token in _TOKEN_RE.findall(_fold(text, case_sensitive, diacritic_sensitive)):
+        if token.lower() not in language.stop_words:
+            terms.append(language.stem(token))
+    return terms
+
+
+def _iter_strings(value: Any, path: str) -> Iterator[Tuple[str, str]]:
+    if isinstance(value, str):
+        yield path, value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from _iter_strings(item, f'{path}.{key}' if path else key)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_strings(item, path)
+
+
+def _iter_field_strings(value: Any, parts: List[str]) -> Iterator[str]:
+    if not parts:
+        if isinstance(value, str):
+            yield value
+        elif isinstance(value, (list, tuple)):
+            yield from (item for item in value if isinstance(item, str))
+        return
+
+    if isinstance(value, dict):
+        if parts[0] in value:
+            yield from _iter_field_strings(value[parts[0]], parts[1:])
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_field_strings(item, parts)
+
+
+def is_text_index(spec: DocumentType) -> bool:
+    return any(kind == 'text' for _, kind in spec['key'])
+
+
+class TextQuery(NamedTuple):
+    """Parsed "$text" query operator."""
+
+    terms: List[str]
+    negated_terms: List[str]
+    phrases: List[str]
+    negated_phrases: List[str]
+    language: Optional[Language]
+    case_sensitive: bool
+    diacritic_sensitive: bool
+
+    @classmethod
+    def parse(cls, text: Any) -> 'TextQuery':
+        if not isinstance(text, dict):
+            raise OperationFailure('$text expects an object', 2)
+
+        unknown = set(text) - {
+            '$search',
+            '$language',
+            '$caseSensitive',
+            '$diacriticSensitive',
+        }
+        if unknown:
+            raise OperationFailure(
+                f'Unexpected field in $text: {sorted(unknown)[0]}', 2
+            )
+
+        search = text.get('$search')
+        if not isinstance(search, str):
+            raise OperationFailure('$search needs a String', 14)
+
+        language = None
+        if '$language' in text:
+            language = get_language(text['$language'])
+            if language is None:
+                raise OperationFailure(
+                    f'language override unsupported: {text["$language"]}', 17262
+                )
+
+        terms: List[str] = []
+        negated_terms: List[str] = []
+        phrases: List[str] = []
+        negated_phrases: List[str] = []
+        for match in _QUERY_RE.finditer(search):
+            phrase_negation, phrase, word_negation, word = match.groups()
+            if phrase is not None:
+                if phrase_negation:
+                    negated_phrases.append(phrase)
+                else:
+                    phrases.append(phrase)
+                    terms.append(phrase)
+            elif word_negation:
+                negated_terms.append(word)
+            else:
+                terms.append(word)
+
+        return cls(
+            terms,
+            negated_terms,
+            phrases,
+            negated_phrases,
+            language,
+            bool(text.get('$caseSensitive', False)),
+            bool(text.get('$diacriticSensitive', False)),
+        )
+
+
+class TextIndex:
+    """Inverted index of terms of text index."""
+
+    def __init__(self, spec: DocumentType):
+        self.spec = spec
+        self.fields = [field for field, kind in spec['key'] if kind == 'text']
+        self.weights: Dict[str, Any] = spec.get('weights') or {}
+        self.default_language = (
+            get_language(spec.get('default_language', 'english')) or _NONE
+        )
+        self.language_override = spec.get('language_override', 'language')
+        self._postings: Dict[str, Dict[Any, float]] = {}
+        self._entries: Dict[Any, List[str]] = {}
+
+    @classmethod
+    def build(
+        cls,
+        items: Iterable[Tuple[Any, DocumentType]],
+        spec: DocumentType,
+    ) -> 'TextIndex':
+        index = cls(spec)
+        for key, document in items:
+            index.add(key, document)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: Any, document: DocumentType) -> None:
+        self.remove(key)
+
+        scores = self._score_terms(document)
+        if not scores:
+            return
+
+        self._entries[key] = list(scores)
+        for term, score in scores.items():
+            self._postings.setdefault(term, {})[key] = score
+
+    def remove(self, key: Any) -> None:
+        for term in self._entries.pop(key, ()):
+            keys = self._postings[term]
+            del keys[key]
+            if not keys:
+                del self._postings[term]
+
+    def get_language(self, document: DocumentType) -> Language:
+        override = document.get(self.language_override)
+        if override is None:
+            return self.default_language
+        return get_language(override) or _NONE
+
+    def iter_texts(self, document: DocumentType) -> Iterator[Tuple[str, str]]:
+        """Yields (field, text) pairs of every indexed string of document."""
+
+        for field in self.fields:
+            if field == '$**':
+                yield from _iter_strings(document, '')
+            else:
+                for text in _iter_field_strings(document, field.split('.')):
+                    yield field, text
+
+    def _score_terms(self, document: DocumentType) -> Dict[str, float]:
+        """Scores terms of the document the same way as server does."""
+
+        language = self.get_language(document)
+        scores: Dict[str, float] = {}
+        for field, text in self.iter_texts(document):
+            terms = get_terms(text, language)
+            weight = self.weights.get(field, 1)
+            for term, count in Counter(terms).items():
+                frequency = 2 - 0.5 ** (count - 1)
+                coefficient = 0.5 * count / len(terms) + 0.5
+                scores[term] = scores.get(term, 0) + weight * frequency * coefficient
+        return scores
+
+    def search(self, query: TextQuery) -> Dict[Any, float]:
+        """Returns scores of documents containing any of searched terms."""
+
+        language = query.language or self.default_language
+        terms = {term for text in query.terms for term in get_terms(text, language)}
+
+        scores: Dict[Any, float] = {}
+        for term in terms:
+            for key, score in self._postings.get(term, {}).items():
+                scores[key] = scores.get(key, 0) + score
+
+        negated = {
+            term for text in query.negated_terms for term in get_terms(text, language)
+        }
+        for term in negated:
+            for key in self._postings.get(term, ()):
+                scores.pop(key, None)
+
+        return scores
+
+    def matches(self, query: TextQuery, document: DocumentType) -> bool:
+        """
+        Verifies parts of the query that can't be answered from the index:
+        phrases and case or diacritic sensitive matching.
+        """
+
+        if not (
+            query.phrases
+            or query.negated_phrases
+            or query.case_sensitive
+            or query.diacritic_sensitive
+        ):
+            return True
+
+        sensitivity = (query.case_sensitive, query.diacritic_sensitive)
+        texts = [_fold(text, *sensitivity) for _, text in self.iter_texts(document)]
+
+        for phrase in query.phrases:
+            if not any(_fold(phrase, *sensitivity) in text for text in texts):
+                return False
+        for phrase in query.negated_phrases:
+            if any(_fold(phrase, *sensitivity) in text for text in texts):
+                return False
+
+        if query.case_sensitive or query.diacritic_sensitive:
+            language = query.language or self.get_language(document)
+            present = {
+                term
+                for text in texts
+                for term in get_terms(text, language, *sensitivity)
+            }
+            wanted = {
+                term
+                for text in query.terms
+                for term in get_terms(text, language, *sensitivity)
+            }
+            if not present & wanted:
+                return False
+
+        return True
+
+
+def _is_text_score(value: Any) -> bool:
+    return isinstance(value, dict) and value.get('$meta') == 'textScore'
+
+
+def lift_text(filter: Any) -> Any:
+    """Moves "$text" out of top level "$and" of filter, as server does."""
+
+    if not isinstance(filter, dict) or not isinstance(filter.get('$and'), list):
+        return filter
+
+    texts = [
+        clause['$text']
+        for clause in filter['$and']
+        if isinstance(clause, dict) and '$text' in clause
+    ]
+    if not texts:
+        return filter
+    if len(texts) > 1 or '$text' in filter:
+        raise OperationFailure('Too many text expressions', 2)
+
+    clauses = []
+    for clause in filter['$and']:
+        if isinstance(clause, dict) and '$text' in clause:
+            clause = {key: value for key, value in clause.items() if key != '$text'}
+            if not clause:
+                continue
+        clauses.append(clause)
+
+    lifted = {key: value for key, value in filter.items() if key != '$and'}
+    lifted['$text'] = texts[0]
+    if clauses:
+        lifted['$and'] = clauses
+    return lifted
+
+
+def uses_text_score(spec: Any, sort: Any, fields: Any) -> bool:
+    """Tells whether query needs scores of "$text" search."""
+
+    if not has_text(spec):
+        return False
+    if isinstance(sort, dict):
+        sort = sort.items()
+    return any(_is_text_score(direction) for _, direction in sort or ()) or (
+        isinstance(fields, dict) and any(map(_is_text_score, fields.values()))
+    )
+
+
+def _text_clause(clauses: Any) -> Optional[int]:
+    """Returns position of "$or" clause with "$text" operator, if any."""
+
+    if not isinstance(clauses, list):
+        return None
+    positions = [
+        i
+        for i, clause in enumerate(clauses)
+        if isinstance(clause, dict) and '$text' in lift_text(clause)
+    ]
+    if len(positions) > 1:
+        raise OperationFailure('Too many text expressions', 2)
+    return positions[0] if positions else None
+
+
+def has_text(filter: Any) -> bool:
+    """Tells whether filter has "$text" operator, on its own or in "$or"."""
+
+    filter = lift_text(filter)
+    if not isinstance(filter, dict):
+        return False
+    position = _text_clause(filter.get('$or'))
+    if '$text' in filter and position is not None:
+        raise OperationFailure('Too many text expressions', 2)
+    return '$text' in filter or position is not None
+
+
+def text_search(
+    store: 'IndexedCollectionStore',
+    filter: DocumentType,
+) -> List[Tuple[DocumentType, float]]:
+    """
+    Returns documents matching filter with "$text" operator along with
+    their scores, in natural order.
+    """
+
+    filter = lift_text(filter)
+    index = store.get_text_index()
+    if index is None:
+        raise OperationFailure('text index required for $text query', 27)
+
+    if '$text' in filter:
+        query = TextQuery.parse(filter['$text'])
+        rest = {key: value for key, value in filter.items() if key != '$text'}
+        scores = index.search(query)
+        return [
+            (document, scores[key])
+            for key, document in store.items_by_keys(scores)
+            if index.matches(query, document) and filter_applies(rest, document)
+        ]
+
+    # other clauses of "$or" can only be answered by scanning
+    clauses = [lift_text(clause) for clause in filter['$or']]
+    text_clause = clauses.pop(_text_clause(clauses))  # type: ignore
+    query = TextQuery.parse(text_clause['$text'])
+    text_rest = {key: value for key, value in text_clause.items() if key != '$text'}
+    rest = {key: value for key, value in filter.items() if key != '$or'}
+    scores = index.search(query)
+
+    matches = []
+    for key, document in store.items():
+        if not filter_applies(rest, document):
+            continue
+        if (
+            key in scores
+            and index.matches(query, document)
+            and filter_applies(text_rest, document)
+        ):
+            matches.append((document, scores[key]))
+        elif any(filter_applies(clause, document) for clause in clauses):
+            matches.append((document, 0.0))
+    return matches
+
+
+def project_text_scores(
+    matches: Iterable[Tuple[DocumentType, float]],
+    sort: Any,
+    fields: Any,
+    copy_only_fields: Callable[[DocumentType, Any], Any],
+) -> Iterator[Any]:
+    """
+    Sorts matched documents and projects them, allowing both sort and
+    projection to refer to scores with {'$meta': 'textScore'}.
+    """
+
+    if sort:
+        if isinstance(sort, dict):
+            sort = list(sort.items())
+        directions = [-1 if _is_text_score(d) else d for _, d in sort]
+
+        def sort_key(match: Tuple[DocumentType, float]) -> _SortKey:
+            document, score = match
+            return _SortKey(
+                [
+                    score if _is_text_score(d) else resolve_sort_key(key, document)
+                    for key, d in sort
+                ],
+                directions,
+            )
+
+        matches = sorted(matches, key=sort_key)
+
+    score_fields = []
+    if isinstance(fields, dict):
+        score_fields = [name for name, value in fields.items() if _is_text_score(value)]
+        fields = {
+            name: value for name, value in fields.items() if name not in score_fields
+        } or None
+
+    for document, score in matches:
+        result = copy_only_fields(document, fields)
+        for name in score_fields:
+            result[name] = score
+        yield result
+
+
+__all__ = [
+    'LANGUAGES',
+    'TEXT_INDEX_OPTIONS',
+    'TextIndex',
+    'TextQuery',
+    'english_stem',
+    'get_terms',
+    'has_text',
+    'is_text_index',
+    'lift_text',
+    'project_text_scores',
+    'text_search',
+    'uses_text_score',
+]
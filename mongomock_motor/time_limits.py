@@ -0,0 +1,106 @@
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable, Iterator, Optional, TypeVar
+
+from pymongo.errors import ExecutionTimeout
+
+T = TypeVar('T')
+
+# Deadline is checked once per this number of processed documents
+CHECK_INTERVAL = 100
+
+_current: ContextVar[Optional['TimeLimit']] = ContextVar(
+    'mongomock_motor_time_limit',
+    default=None,
+)
+
+
+class TimeLimit:
+    """
+    Processing time budget of an operation, same as "maxTimeMS". Only time
+    spent while limit is running is counted, so time between fetching
+    batches of cursor isn't.
+    """
+
+    def __init__(
+        self,
+        max_time_ms: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_time = max_time_ms / 1000
+        self.clock = clock
+        self.spent = 0.0
+        self._started: Optional[float] = None
+
+    @contextlib.contextmanager
+    def running(self) -> Iterator[None]:
+        if self._started is not None:
+            yield
+            return
+
+        self._started = self.clock()
+        token = _current.set(self)
+        try:
+            self.check()
+            yield
+        finally:
+            _current.reset(token)
+            self.spent += self.clock() - self._started
+            self._started = None
+
+    def check(self) -> None:
+        if self._started is None:
+            return
+        if self.spent + self.clock() - self._started > self.max_time:
+            raise ExecutionTimeout('operation exceeded time limit', 50)
+
+
+def get_max_time_ms(kwargs: dict) -> Optional[int]:
+    """Pops time limit passed to operation in either of supported forms."""
+
+    max_time_ms = kwargs.pop('max_time_ms', None)
+    return kwargs.pop('maxTimeMS', max_time_ms)
+
+
+def time_limit(max_time_ms: Optional[int]) -> Any:
+    if not max_time_ms:
+        return contextlib.nullcontext()
+    return TimeLimit(max_time_ms).running()
+
+
+def check_time_limit() -> None:
+    limit = _current.get()
+    if limit is not None:
+        limit.check()
+
+
+def with_time_limit(iterable: Iterable[T]) -> Iterable[T]:
+    """
+    Checks time limit of current operation every CHECK_INTERVAL items of
+    iterable. Limit is taken at the moment of call, so lazy iterables keep
+    being checked against it when consumed later.
+    """
+
+    limit = _current.get()
+    if limit is None:
+        return iterable
+    return _iter_with_time_limit(iterable, limit)
+
+
+def _iter_with_time_limit(iterable: Iterable[T], limit: TimeLimit) -> Iterator[T]:
+    for i, item in enumerate(iterable, 1):
+        if i % CHECK_INTERVAL == 0:
+            limit.check()
+        yield item
+    limit.check()
+
+
+__all__ = [
+    'CHECK_INTERVAL',
+    'TimeLimit',
+    'check_time_limit',
+    'get_max_time_ms',
+    'time_limit',
+    'with_time_limit',
+]
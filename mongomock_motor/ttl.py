@@ -0,0 +1,106 @@
+import asyncio
+import datetime
+import weakref
+from asyncio.events import AbstractEventLoop
+from typing import Iterable, Optional
+
+from mongomock.store import ServerStore, _get_min_datetime_from_value
+
+from .typing import DocumentType
+
+# Same as default value of "ttlMonitorSleepSecs" server parameter
+TTL_MONITOR_INTERVAL = 60.0
+
+
+def get_expire_at(
+    document: DocumentType,
+    ttl_indexes: Iterable[DocumentType],
+) -> Optional[datetime.datetime]:
+    """
+    Returns moment when document expires according to TTL indexes, same
+    rules as in "mongomock" are used: only single field indexes with integer
+    "expireAfterSeconds" are respected and earliest date in array is used.
+    """
+
+    expire_at = None
+    for index in ttl_indexes:
+        try:
+            expiry = int(index['expireAfterSeconds'])
+        except ValueError:
+            continue
+
+        if len(index['key']) > 1:
+            continue
+
+        field = next(iter(index['key']))[0]
+        value = _get_min_datetime_from_value(document.get(field))
+        if not isinstance(value, datetime.datetime) or value == datetime.datetime.max:
+            continue
+
+        try:
+            candidate = value + datetime.timedelta(seconds=expiry)
+        except OverflowError:
+            continue
+
+        if expire_at is None or candidate < expire_at:
+            expire_at = candidate
+
+    return expire_at
+
+
+class TTLMonitor:
+    """
+    Background task that periodically removes expired documents from every
+    collection of the client, so they don't pile up in collections which
+    aren't accessed. Expired documents are also removed on every access.
+    """
+
+    def __init__(
+        self, store: ServerStore, interval: float = TTL_MONITOR_INTERVAL
+    ) -> None:
+        self.interval = interval
+        self._store = weakref.ref(store)
+        self._task: Optional['asyncio.Task[None]'] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def ensure_started(self, loop: AbstractEventLoop) -> None:
+        if self.is_running and self._task.get_loop() is loop:  # type: ignore
+            return
+        try:
+            self._task = loop.create_task(self._run())
+        except RuntimeError:
+            # event loop is closed, expiry on access still works
+            self._task = None
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def run_once(self) -> int:
+        """Removes expired documents and returns number of removed ones."""
+
+        store = self._store()
+        if store is None:
+            return 0
+
+        removed = 0
+        for database in list(store._databases.values()):
+            for collection in list(database._collections.values()):
+                if not collection._ttl_indexes:
+                    continue
+                size = len(collection._documents)
+                collection._remove_expired_documents()
+                removed += size - len(collection._documents)
+        return removed
+
+    async def _run(self) -> None:
+        while self._store() is not None:
+            await asyncio.sleep(self.interval)
+            self.run_once()
+
+
+__all__ = ['TTL_MONITOR_INTERVAL', 'TTLMonitor', 'get_expire_at']
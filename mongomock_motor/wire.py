@@ -0,0 +1,569 @@
+import asyncio
+import datetime
+import itertools
+import struct
+import sys
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import bson
+from bson.codec_options import CodecOptions
+from pymongo import IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from . import AsyncMongoMockClient, AsyncMongoMockDatabase
+from .cursor_manager import DEFAULT_BATCH_SIZE
+from .typing import DocumentType
+
+OP_REPLY = 1
+OP_QUERY = 2004
+OP_COMPRESSED = 2012
+OP_MSG = 2013
+
+# Flags of OP_MSG
+CHECKSUM_PRESENT = 1 << 0
+MORE_TO_COME = 1 << 1
+
+# Ids of compressors, only those not requiring third party packages
+NOOP = 0
+ZLIB = 2
+COMPRESSORS = {'noop': NOOP, 'zlib': ZLIB}
+
+# Same as of MongoDB 5.0, which is version mocked by default
+MAX_WIRE_VERSION = 13
+MAX_BSON_SIZE = 16 * 1024 * 1024
+MAX_MESSAGE_SIZE = 48_000_000
+MAX_WRITE_BATCH_SIZE = 100_000
+
+_HEADER = struct.Struct('<iiii')
+_INT32 = struct.Struct('<i')
+_UINT32 = struct.Struct('<I')
+_COMPRESSED = struct.Struct('<iiB')
+_REPLY = struct.Struct('<iqii')
+
+# Fields of commands which are meaningless for the mock
+_IGNORED_FIELDS = (
+    '$db',
+    '$clusterTime',
+    '$readPreference',
+    'apiDeprecationErrors',
+    'apiStrict',
+    'apiVersion',
+    'autocommit',
+    'lsid',
+    'readConcern',
+    'startTransaction',
+    'txnNumber',
+    'writeConcern',
+)
+
+_CODEC_OPTIONS = CodecOptions(tz_aware=False)
+
+
+def _read_cstring(data: bytes, offset: int) -> Tuple[str, int]:
+    end = data.index(b'\x00', offset)
+    return data[offset:end].decode(), end + 1
+
+
+def _read_document(data: bytes, offset: int) -> Tuple[DocumentType, int]:
+    (size,) = _INT32.unpack_from(data, offset)
+    return bson.decode(data[offset : offset + size], _CODEC_OPTIONS), offset + size
+
+
+def parse_msg(data: bytes) -> Tuple[int, Dict[str, Any]]:
+    """
+    Returns flags and command of OP_MSG, documents of sequences (kind 1
+    sections) are put into the command under their identifiers.
+    """
+
+    (flags,) = _UINT32.unpack_from(data)
+    end = len(data) - 4 if flags & CHECKSUM_PRESENT else len(data)
+    offset = 4
+    command: Dict[str, Any] = {}
+    sequences: Dict[str, List[DocumentType]] = {}
+    while offset < end:
+        kind = data[offset]
+        offset += 1
+        if kind == 0:
+            body, offset = _read_document(data, offset)
+            command.update(body)
+            continue
+        (size,) = _INT32.unpack_from(data, offset)
+        section_end = offset + size
+        identifier, offset = _read_cstring(data, offset + 4)
+        documents = sequences.setdefault(identifier, [])
+        while offset < section_end:
+            document, offset = _read_document(data, offset)
+            documents.append(document)
+    command.update(sequences)
+    return flags, command
+
+
+def _error_reply(error: Exception) -> DocumentType:
+    code = getattr(error, 'code', None) or 8  # UnknownError
+    return {'ok': 0.0, 'errmsg': str(error), 'code': code}
+
+
+def _write_error(index: int, error: PyMongoError) -> DocumentType:
+    write_error: Dict[str, Any] = {
+        'index': index,
+        'code': getattr(error, 'code', None) or 2,  # BadValue
+        'errmsg': str(error),
+    }
+    if isinstance(error, DuplicateKeyError) and error.details:
+        write_error.update(error.details)
+    return write_error
+
+
+class WireProtocolServer:
+    """
+    Serves store of AsyncMongoMockClient over TCP using MongoDB wire protocol
+    (OP_MSG, as well as OP_QUERY for handshake of drivers), so real drivers
+    of other processes can use it as a stand-in for mongod. Only commands
+    needed for CRUD are implemented, noop and zlib compression are
+    supported.
+    """
+
+    def __init__(
+        self,
+        client: Optional[AsyncMongoMockClient] = None,
+        host: str = '127.0.0.1',
+        port: int = 0,
+    ) -> None:
+        self.client = client or AsyncMongoMockClient()
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connection_ids = itertools.count(1)
+        self._connections: Dict['asyncio.Task[None]', asyncio.StreamWriter] = {}
+        self._commands = {
+            'hello': self._hello,
+            'ismaster': self._hello,
+            'ping': self._ping,
+            'endsessions': self._ping,
+            'buildinfo': self._build_info,
+            'find': self._find,
+            'aggregate': self._aggregate,
+            'getmore': self._cursor_command,
+            'killcursors': self._cursor_command,
+            'insert': self._insert,
+            'update': self._update,
+            'delete': self._delete,
+            'findandmodify': self._find_and_modify,
+            'createindexes': self._create_indexes,
+            'drop': self._drop,
+        }
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.host, self.port
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()  # type: ignore
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        # handlers stop once their connections are closed
+        connections, self._connections = self._connections, {}
+        for writer in connections.values():
+            writer.close()
+        await asyncio.gather(*connections, return_exceptions=True)
+
+    async def __aenter__(self) -> 'WireProtocolServer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        connection_id = next(self._connection_ids)
+        task = asyncio.current_task()
+        if task is not None:
+            self._connections[task] = writer
+        self.client.server_stats.connection_opened()
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(_HEADER.size)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                size, request_id, _, op_code = _HEADER.unpack(header)
+                data = await reader.readexactly(size - _HEADER.size)
+                reply = await self._handle_message(op_code, data, connection_id)
+                if reply is not None:
+                    writer.write(self._encode_reply(request_id, *reply))
+                    await writer.drain()
+        finally:
+            self._connections.pop(task, None)  # type: ignore
+            self.client.server_stats.connection_closed()
+            writer.close()
+
+    async def _handle_message(
+        self, op_code: int, data: bytes, connection_id: int
+    ) -> Optional[Tuple[int, bytes, Optional[int]]]:
+        """Returns op code, payload and compressor of the reply, if any."""
+
+        compressor = None
+        if op_code == OP_COMPRESSED:
+            op_code, _, compressor = _COMPRESSED.unpack_from(data)
+            data = data[_COMPRESSED.size :]
+            if compressor == ZLIB:
+                data = zlib.decompress(data)
+            elif compressor != NOOP:
+                raise ConnectionError(f'unsupported compressor: {compressor}')
+
+        if op_code == OP_MSG:
+            flags, command = parse_msg(data)
+            database = command.get('$db', 'admin')
+            reply = await self.run_command(database, command, connection_id)
+            if flags & MORE_TO_COME:
+                return None
+            payload = _UINT32.pack(0) + b'\x00' + bson.encode(reply)
+            return OP_MSG, payload, compressor
+
+        if op_code == OP_QUERY:
+            # only commands are supported, as it's used just for handshake
+            (flags,) = _INT32.unpack_from(data)
+            namespace, offset = _read_cstring(data, 4)
+            command, _ = _read_document(data, offset + 8)
+            command = dict(command)
+            if '$query' in command:
+                command = dict(command['$query'])
+            database = namespace.split('.', 1)[0]
+            reply = await self.run_command(database, command, connection_id)
+            payload = _REPLY.pack(0, 0, 0, 1) + bson.encode(reply)
+            return OP_REPLY, payload, compressor
+
+        raise ConnectionError(f'unsupported op code: {op_code}')
+
+    def _encode_reply(
+        self,
+        response_to: int,
+        op_code: int,
+        payload: bytes,
+        compressor: Optional[int],
+    ) -> bytes:
+        if compressor is not None:
+            compressed = zlib.compress(payload) if compressor == ZLIB else payload
+            payload = _COMPRESSED.pack(op_code, len(payload), compressor) + compressed
+            op_code = OP_COMPRESSED
+        header = _HEADER.pack(_HEADER.size + len(payload), 0, response_to, op_code)
+        return header + payload
+
+    async def run_command(
+        self, database: str, command: DocumentType, connection_id: int = 0
+    ) -> DocumentType:
+        command = {
+            key: value for key, value in command.items() if key not in _IGNORED_FIELDS
+        }
+        if not command:
+            return {'ok': 0.0, 'errmsg': 'no such command', 'code': 59}
+        name = next(iter(command))
+        handler = self._commands.get(name.lower())
+        try:
+            if handler is None:
+                reply = await self.client[database].command(command)
+            else:
+                reply = await handler(self.client[database], command, connection_id)
+        except NotImplementedError:
+            return {
+                'ok': 0.0,
+                'errmsg': f'no such command: {name!r}',
+                'code': 59,
+                'codeName': 'CommandNotFound',
+            }
+        except Exception as error:
+            return _error_reply(error)
+        return reply
+
+    async def _hello(
+        self,
+        database: AsyncMongoMockDatabase,
+        command: Dict[str, Any],
+        connection_id: int,
+    ) -> DocumentType:
+        reply: Dict[str, Any] = {
+            'helloOk': True,
+            'ismaster': True,
+            'isWritablePrimary': True,
+            'maxBsonObjectSize': MAX_BSON_SIZE,
+            'maxMessageSizeBytes': MAX_MESSAGE_SIZE,
+            'maxWriteBatchSize': MAX_WRITE_BATCH_SIZE,
+            'localTime': datetime.datetime.now(datetime.timezone.utc),
+            'logicalSessionTimeoutMinutes': 30,
+            'connectionId': connection_id,
+            'minWireVersion': 0,
+            'maxWireVersion': MAX_WIRE_VERSION,
+            'readOnly': False,
+            'ok': 1.0,
+        }
+        compression = [
+            name for name in command.get('compression', []) if name in COMPRESSORS
+        ]
+        if compression:
+            reply['compression'] = compression
+        return reply
+
+    async def _ping(
+        self,
+        database: AsyncMongoMockDatabase,
+        command: Dict[str, Any],
+        connection_id: int,
+    ) -> DocumentType:
+        return {'ok': 1.0}
+
+    async def _build_info(
+        self,
+        database: AsyncMongoMockDatabase,
+        command: Dict[str, Any],
+        connection_id: int,
+    ) -> DocumentType:
+        return dict(await database.command('buildinfo'))
+
+    async def _find(
+        self,
+        database: AsyncMongoMockDatabase,
+        command: Dict[str, Any],
+        connection_id: int,
+    ) -> DocumentType:
+        cursor = database[command['find']].find(
+            command.get('filter', {}),
+            command.get('projection'),
+            skip=command.get('skip', 0),
+            limit=abs(command.get('limit', 0)),
+            no_cursor_timeout=command.get('noCursorTimeout', False),
+        )
+        if command.get('sort'):
+            cursor.sort(list(command['sort'].items()))
+        if command.get('hint'):
+            hint = command['hint']
+            cursor.hint(list(hint.items()) if isinstance(hint, dict) else hint)
+        if command.get('collation'):
+            cursor.collation(command['collation'])
+        if command.get('maxTimeMS'):
+            cursor.max_time_ms(command['maxTimeMS'])
+        return await self._first_batch(
+            cursor,
+            f'{database.name}.{command["find"]}',
+            command.get('batchSize', 0),
+            command.get('singleBatch', False) or command.get('limit', 0) < 0,
+        )
+
+    async def _aggregate(
+        self,
+        database: AsyncMongoMockDatabase,
+        command: Dict[str, Any],
+        connection_id: int,
+    ) -> DocumentType:
+        target = command['aggregate']
+        source = database if target == 1 else database[target]
+        cursor = source.aggregate(command['pipeline'])
+        namespace = f'{database.name}.{"$cmd.aggregate" if target == 1 else target}'
+        batch_size = command.get('cursor', {}).get('batchSize', 0)
+        return await self._first_batch(cursor, namespace, batch_size, False)
+
+    async def _first_batch(
+        self, cursor: Any, namespace: str, batch_size: int, is_single: bool
+    ) -> DocumentType:
+        batch_size = batch_size or DEFAULT_BATCH_SIZE
+        cursor.batch_size(batch_size)
+        documents = []
+        while len(documents) < batch_size:
+            try:
+                documents.append(await cursor.next())
+            except StopAsyncIteration:
+                break
+        if is_single:
+            await cursor.close()
+        cursor_id = cursor.cursor_id or 0
+        return {
+            'cursor': {'id': cursor_id, 'ns': namespace, 'firstBatch': documents},
+            'ok': 1.0,
+        }
+
+    async def _cursor_command(
+        self,
+        database: AsyncMongoMockDatabase,
+        command: Dict[str, Any],
+        connection_id: int,
+    ) -> DocumentType:
+        return dict(await database.command(command))
+
+    async def _insert(
+        self,
+        database: AsyncMongoMockDatabase,
+        command: Dict[str, Any],
+        connection_id: int,
+    ) -> DocumentType:
+        collection = database[command['insert']]
+        reply: Dict[str, Any] = {'n': 0, 'ok': 1.0}
+        for index, document in enumerate(command.get('documents', [])):
+            try:
+                await collection.insert_one(document)
+            except PyMongoError as error:
+                reply.setdefault('writeErrors', []).append(_write_error(index, error))
+                if command.get('ordered', True):
+                    break
+            else:
+                reply['n'] += 1
+        return reply
+
+    async def _update(
+        self,
+        database: AsyncMongoMockDatabase,
+        command: Dict[str, Any],
+        connection_id: int,
+    ) -> DocumentType:
+        collection = database[command['update']]
+        reply: Dict[str, Any] = {'n': 0, 'nModified': 0, 'ok': 1.0}
+        for index, statement in enumerate(command.get('updates', [])):
+            update = statement['u']
+            options: Dict[str, Any] = {'upsert': statement.get('upsert', False)}
+            method: Any
+            if statement.get('arrayFilters') is not None:
+                options['array_filters'] = statement['arrayFilters']
+            if isinstance(update, list) or next(iter(update), '$').startswith('$'):
+                method = (
+                    collection.update_many
+                    if statement.get('multi')
+                    else collection.update_one
+                )
+            else:
+                method = collection.replace_one
+                options.pop('array_filters', None)
+            try:
+                result = await method(statement['q'], update, **options)
+            except PyMongoError as error:
+                reply.setdefault('writeErrors', []).append(_write_error(index, error))
+                if command.get('ordered', True):
+                    break
+                continue
+            reply['n'] += result.matched_count
+            reply['nModified'] += result.modified_count
+            if result.upserted_id is not None:
+                reply['n'] += 1
+                reply.setdefault('upserted', []).append(
+                    {'index': index, '_id': result.upserted_id}
+                )
+        return reply
+
+    async def _delete(
+        self,
+        database: AsyncMongoMockDatabase,
+        command: Dict[str, Any],
+        connection_id: int,
+    ) -> DocumentType:
+        collection = database[command['delete']]
+        reply: Dict[str, Any] = {'n': 0, 'ok': 1.0}
+        for index, statement in enumerate(command.get('deletes', [])):
+            method = (
+                collection.delete_one
+                if statement.get('limit')
+                else collection.delete_many
+            )
+            try:
+                result = await method(statement['q'])
+            except PyMongoError as error:
+                reply.setdefault('writeErrors', []).append(_write_error(index, error))
+                if command.get('ordered', True):
+                    break
+                continue
+            reply['n'] += result.deleted_count
+        return reply
+
+    async def _find_and_modify(
+        self,
+        database: AsyncMongoMockDatabase,
+        command: Dict[str, Any],
+        connection_id: int,
+    ) -> DocumentType:
+        collection = database[command['findAndModify']]
+        query = command.get('query', {})
+        sort = list(command['sort'].items()) if command.get('sort') else None
+        options: Dict[str, Any] = {'projection': command.get('fields'), 'sort': sort}
+        if command.get('remove'):
+            value = await collection.find_one_and_delete(query, **options)
+            return {
+                'lastErrorObject': {'n': int(value is not None)},
+                'value': value,
+                'ok': 1.0,
+            }
+
+        update = command['update']
+        method: Any
+        if isinstance(update, list) or next(iter(update), '$').startswith('$'):
+            method = collection.find_one_and_update
+            if command.get('arrayFilters') is not None:
+                options['array_filters'] = command['arrayFilters']
+        else:
+            method = collection.find_one_and_replace
+        existing = await collection.find_one(query, {'_id': 1}, sort=sort)
+        value = await method(
+            query,
+            update,
+            upsert=command.get('upsert', False),
+            return_document=(
+                ReturnDocument.AFTER if command.get('new') else ReturnDocument.BEFORE
+            ),
+            **options,
+        )
+        is_upserted = existing is None and command.get('upsert', False)
+        return {
+            'lastErrorObject': {
+                'n': int(existing is not None or is_upserted),
+                'updatedExisting': existing is not None,
+            },
+            'value': value,
+            'ok': 1.0,
+        }
+
+    async def _create_indexes(
+        self,
+        database: AsyncMongoMockDatabase,
+        command: Dict[str, Any],
+        connection_id: int,
+    ) -> DocumentType:
+        collection = database[command['createIndexes']]
+        models = []
+        for index in command['indexes']:
+            options = {key: value for key, value in index.items() if key != 'key'}
+            models.append(IndexModel(list(index['key'].items()), **options))
+        await collection.create_indexes(models)
+        return {'ok': 1.0}
+
+    async def _drop(
+        self,
+        database: AsyncMongoMockDatabase,
+        command: Dict[str, Any],
+        connection_id: int,
+    ) -> DocumentType:
+        await database.drop_collection(command['drop'])
+        return {'ok': 1.0}
+
+
+def run_wire_server(host: str = '127.0.0.1', port: int = 27017) -> None:
+    """Runs wire protocol server until process is terminated."""
+
+    async def serve() -> None:
+        await WireProtocolServer(host=host, port=port).serve_forever()
+
+    asyncio.run(serve())
+
+
+__all__ = ['WireProtocolServer', 'parse_msg', 'run_wire_server']
+
+
+if __name__ == '__main__':
+    run_wire_server(port=int(sys.argv[1]) if len(sys.argv) > 1 else 27017)
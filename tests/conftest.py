@@ -1,6 +1,24 @@
+import mongomock.collection
+import mongomock.filtering
 import pytest
 
+from mongomock_motor import indexes
+
 
 @pytest.fixture
 def anyio_backend():
     return 'asyncio'
+
+
+@pytest.fixture
+def filter_calls(monkeypatch):
+    calls = []
+
+    def counting_filter_applies(*args, **kwargs):
+        calls.append(args)
+        return mongomock.filtering.filter_applies(*args, **kwargs)
+
+    for module in (mongomock.collection, indexes):
+        monkeypatch.setattr(module, 'filter_applies', counting_filter_applies)
+
+    return calls
@@ -0,0 +1,125 @@
+import asyncio
+import time
+
+import pytest
+from mongomock import OperationFailure
+from pymongo import CursorType
+
+from mongomock_motor import AsyncMongoMockClient
+
+
+@pytest.mark.anyio
+async def test_capped_collection_evicts_oldest():
+    database = AsyncMongoMockClient()['tests']
+    collection = await database.create_collection(
+        'log', capped=True, size=100000, max=5
+    )
+    assert await collection.options() == {'capped': True, 'size': 100000, 'max': 5}
+
+    for i in range(12):
+        await collection.insert_one({'i': i})
+
+    docs = await collection.find({}, {'_id': 0}).to_list(None)
+    assert docs == [{'i': i} for i in range(7, 12)]
+    assert await collection.count_documents({'i': {'$lt': 7}}) == 0
+
+    small = await database.create_collection('small', capped=True, size=200)
+    await small.insert_many([{'payload': 'x' * 50} for _ in range(10)])
+    assert 1 < await small.count_documents({}) < 10
+
+    with pytest.raises(OperationFailure):
+        await database.create_collection('invalid', capped=True)
+
+    await small.drop()
+    assert await database['small'].options() == {}
+
+
+@pytest.mark.anyio
+async def test_tailable_await_cursor_wakes_up_on_insert():
+    database = AsyncMongoMockClient()['tests']
+    collection = await database.create_collection('log', capped=True, size=100000)
+    await collection.insert_many([{'i': 0}, {'i': 1}])
+
+    cursor = collection.find(
+        {'i': {'$ne': 2}},
+        cursor_type=CursorType.TAILABLE_AWAIT,
+    ).max_await_time_ms(5000)
+    assert [(await cursor.next())['i'] for _ in range(2)] == [0, 1]
+
+    async def insert_later():
+        await asyncio.sleep(0.05)
+        await collection.insert_many([{'i': 2}, {'i': 3}])
+
+    started = time.monotonic()
+    task = asyncio.ensure_future(insert_later())
+    assert (await cursor.next())['i'] == 3
+    assert time.monotonic() - started < 1
+    await task
+
+    cursor.max_await_time_ms(10)
+    with pytest.raises(StopAsyncIteration):
+        await cursor.next()
+    assert cursor.alive
+
+    await collection.insert_one({'i': 4})
+    assert [doc['i'] for doc in await cursor.to_list(None)] == [4]
+
+    await cursor.close()
+    assert not cursor.alive
+
+
+@pytest.mark.anyio
+async def test_tailable_cursor_errors():
+    database = AsyncMongoMockClient()['tests']
+    await database['regular'].insert_one({'i': 0})
+    with pytest.raises(OperationFailure):
+        await database['regular'].find(cursor_type=CursorType.TAILABLE).next()
+
+    collection = await database.create_collection('log', capped=True, size=10**5, max=2)
+    await collection.insert_one({'i': 0})
+    cursor = collection.find(cursor_type=CursorType.TAILABLE)
+    assert (await cursor.next())['i'] == 0
+    with pytest.raises(StopAsyncIteration):
+        await cursor.next()
+
+    # cursor fell behind the ring buffer
+    await collection.insert_many([{'i': i} for i in range(1, 5)])
+    with pytest.raises(OperationFailure):
+        await cursor.next()
+    assert not cursor.alive
+
+
+@pytest.mark.anyio
+async def test_tailable_cursor_survives_deletes():
+    database = AsyncMongoMockClient()['tests']
+    collection = await database.create_collection('log', capped=True, size=10**5)
+    await collection.insert_one({'i': 0})
+
+    cursor = collection.find(cursor_type=CursorType.TAILABLE)
+    assert (await cursor.next())['i'] == 0
+    await collection.insert_many([{'i': 1}, {'i': 2}])
+    # neither of these was evicted from ring buffer
+    await collection.delete_many({'i': {'$lt': 2}})
+    assert (await cursor.next())['i'] == 2
+    assert cursor.alive
+
+
+@pytest.mark.anyio
+async def test_invalid_capped_options_create_nothing():
+    database = AsyncMongoMockClient()['tests']
+    with pytest.raises(OperationFailure) as exc_info:
+        await database.create_collection('log', capped=True, size=-1)
+    assert exc_info.value.code == 72
+    assert await database.list_collection_names() == []
+
+
+@pytest.mark.anyio
+async def test_tailable_cursor_rewind():
+    database = AsyncMongoMockClient()['tests']
+    collection = await database.create_collection('log', capped=True, size=10**5)
+    await collection.insert_many([{'i': 0}, {'i': 1}])
+
+    cursor = collection.find(cursor_type=CursorType.TAILABLE)
+    assert [doc['i'] for doc in await cursor.to_list(None)] == [0, 1]
+    cursor.rewind()
+    assert [doc['i'] for doc in await cursor.to_list(None)] == [0, 1]
@@ -0,0 +1,95 @@
+import pytest
+from mongomock import WriteError
+
+from mongomock_motor import AsyncMongoMockClient, compiled
+
+
+@pytest.mark.anyio
+async def test_projections():
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.insert_many(
+        [
+            {'_id': 1, 'a': 1, 'b': {'c': 1, 'd': 2}, 'e': [1, 2, 3]},
+            {'_id': 2, 'a': 2, 'b': [{'c': 3}, {'d': 4}]},
+        ]
+    )
+
+    async def find(projection):
+        return await collection.find({}, projection).to_list(None)
+
+    assert await find(['a']) == [{'_id': 1, 'a': 1}, {'_id': 2, 'a': 2}]
+    assert await find({'a': 0, 'b': 0, '_id': 0}) == [{'e': [1, 2, 3]}, {}]
+    assert await find({'b.c': 1, '_id': 0}) == [
+        {'b': {'c': 1}},
+        {'b': [{'c': 3}, {}]},
+    ]
+    assert await find({'e': {'$slice': 1}, 'a': 1}) == [
+        {'_id': 1, 'a': 1, 'e': [1]},
+        {'_id': 2, 'a': 2},
+    ]
+    assert await find({'_id': 1}) == [{'_id': 1}, {'_id': 2}]
+
+    with pytest.raises(ValueError):
+        await find({'a': 1, 'b': 0})
+
+    # projections are copies of stored documents
+    docs = await find({'b': 1})
+    docs[0]['b']['c'] = 10
+    assert (await collection.find_one({'_id': 1}))['b']['c'] == 1
+
+
+@pytest.mark.anyio
+async def test_updates():
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.insert_many([{'_id': i, 'n': i, 'arr': [0, 0]} for i in range(3)])
+
+    await collection.update_many(
+        {},
+        {
+            '$set': {'x.y': [1], 'arr.1': 5},
+            '$inc': {'n': 10},
+            '$unset': {'missing.path': ''},
+            '$push': {'log': 'updated'},
+            '$setOnInsert': {'created': True},
+        },
+    )
+    docs = await collection.find().to_list(None)
+    assert docs == [
+        {'_id': i, 'n': i + 10, 'arr': [0, 5], 'x': {'y': [1]}, 'log': ['updated']}
+        for i in range(3)
+    ]
+
+    # values set from the same update document aren't shared between documents
+    await collection.update_one({'_id': 0}, {'$push': {'x.y': 2}})
+    assert (await collection.find_one({'_id': 1}))['x']['y'] == [1]
+
+    doc = await collection.find_one_and_update(
+        {'_id': 3},
+        {'$set': {'n': 1}, '$setOnInsert': {'created': True}},
+        upsert=True,
+        return_document=True,
+    )
+    assert doc == {'_id': 3, 'n': 1, 'created': True}
+
+    with pytest.raises(WriteError):
+        await collection.update_one({'_id': 0}, {'$set': {'arr.-1': 1}})
+
+
+@pytest.mark.anyio
+async def test_compiled_once_per_shape(monkeypatch):
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.insert_many([{'i': i} for i in range(10)])
+
+    calls = []
+    original = compiled._compile_update_shape
+
+    def counting_compile(document):
+        calls.append(document)
+        return original(document)
+
+    monkeypatch.setattr(compiled, '_compile_update_shape', counting_compile)
+
+    await collection.update_many({}, {'$set': {'compiled_once': 1}})
+    await collection.update_many({}, {'$set': {'compiled_once': 2}})
+    assert len(calls) == 1
+    assert await collection.count_documents({'compiled_once': 2}) == 10
@@ -0,0 +1,97 @@
+import pytest
+
+from mongomock_motor import AsyncMongoMockClient
+
+
+@pytest.mark.anyio
+async def test_count_without_scanning(filter_calls):
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.create_index('kind')
+    await collection.insert_many([{'kind': i % 3, 'i': i} for i in range(30)])
+
+    filter_calls.clear()
+    assert await collection.estimated_document_count() == 30
+    assert await collection.count_documents({}) == 30
+    assert await collection.count_documents({}, skip=25) == 5
+    assert await collection.count_documents({}, limit=7) == 7
+    assert await collection.count_documents({'kind': 1}) == 10
+    assert await collection.count_documents({'kind': {'$in': [0, 2, 5]}}) == 20
+    assert await collection.count_documents({'_id': {'$eq': 'unknown'}}) == 0
+    assert filter_calls == []
+
+    # Filters only partially covered by index verify candidates only
+    assert await collection.count_documents({'kind': 1, 'i': {'$lt': 10}}) == 3
+    assert len(filter_calls) == 10
+
+
+@pytest.mark.anyio
+async def test_count_follows_writes():
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.create_index([('a', 1), ('b', 1)])
+    await collection.insert_many([{'a': 1, 'b': 1}, {'a': 1, 'b': 2}, {'a': 2}])
+
+    assert await collection.count_documents({'a': 1, 'b': 2}) == 1
+    assert await collection.count_documents({'a': 2, 'b': None}) == 1
+
+    await collection.update_many({'a': 1}, {'$set': {'b': 2}})
+    assert await collection.count_documents({'a': 1, 'b': 2}) == 2
+
+    await collection.delete_one({'b': 2})
+    assert await collection.count_documents({'a': 1, 'b': 2}) == 1
+    assert await collection.count_documents({}) == 2
+
+    await collection.drop()
+    assert await collection.count_documents({}) == 0
+    assert await collection.count_documents({'a': 1, 'b': 2}) == 0
+
+
+@pytest.mark.anyio
+async def test_count_multikey_and_sparse():
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.create_index('tags')
+    await collection.create_index('extra', sparse=True)
+    await collection.insert_many(
+        [
+            {'tags': ['a', 'b'], 'extra': 1},
+            {'tags': ['a']},
+            {'tags': 'b', 'extra': None},
+        ]
+    )
+
+    assert await collection.count_documents({'tags': {'$in': ['a', 'b']}}) == 3
+    assert await collection.count_documents({'tags': ['a']}) == 1
+    assert await collection.count_documents({'extra': None}) == 2
+    assert await collection.count_documents({'extra': 1}) == 1
+
+
+@pytest.mark.anyio
+async def test_count_matches_booleans_like_scan():
+    client = AsyncMongoMockClient()
+    indexed, plain = client['tests']['indexed'], client['tests']['plain']
+    await indexed.create_index('v')
+    for collection in (indexed, plain):
+        await collection.insert_many(
+            [
+                {'_id': i, 'v': v}
+                for i, v in enumerate(
+                    [True, 1, 1.0, False, 0, 2, {'x': 1, 'y': 2}, {'y': 2, 'x': 1}]
+                )
+            ]
+        )
+
+    queries = [
+        {'v': 1},
+        {'v': True},
+        {'v': {'$in': [True, 1]}},
+        {'v': {'$in': [False, 2]}},
+        {'v': {'$gte': 1}},
+        {'v': {'$lt': 1}},
+        {'v': {'x': 1, 'y': 2}},
+    ]
+    for query in queries:
+        assert await indexed.count_documents(query) == await plain.count_documents(
+            query
+        ), query
+        assert await indexed.find(query).to_list(None) == await plain.find(
+            query
+        ).to_list(None), query
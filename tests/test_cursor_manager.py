@@ -0,0 +1,164 @@
+import pytest
+from pymongo.errors import CursorNotFound
+
+from mongomock_motor import AsyncMongoMockClient
+
+DOCUMENTS_COUNT = 10
+
+
+async def _prepare_collection(client):
+    collection = client['tests']['test']
+    await collection.insert_many([{'i': i} for i in range(DOCUMENTS_COUNT)])
+    return collection
+
+
+@pytest.mark.anyio
+async def test_cursor_fetches_batches():
+    client = AsyncMongoMockClient()
+    manager = client.cursor_manager
+    collection = await _prepare_collection(client)
+
+    cursor = collection.find().batch_size(3)
+    assert cursor.cursor_id is None
+    assert manager.open_cursors == 0
+
+    assert (await cursor.next())['i'] == 0
+    assert cursor.cursor_id
+    assert manager.open_cursors == 1
+    assert 0 < manager.buffered_bytes < 100
+
+    assert [doc['i'] for doc in await cursor.to_list(None)] == list(range(1, 10))
+    assert not cursor.alive
+    assert manager.open_cursors == 0
+    assert manager.buffered_bytes == 0
+
+
+@pytest.mark.anyio
+async def test_get_more_and_kill_cursors_commands():
+    client = AsyncMongoMockClient()
+    collection = await _prepare_collection(client)
+    database = client['tests']
+
+    cursor = collection.find(projection={'_id': 0}).batch_size(2)
+    await cursor.next()
+
+    result = await database.command(
+        {'getMore': cursor.cursor_id, 'collection': 'test', 'batchSize': 4}
+    )
+    assert result['cursor'] == {
+        'id': cursor.cursor_id,
+        'ns': 'tests.test',
+        'nextBatch': [{'i': 1}, {'i': 2}, {'i': 3}, {'i': 4}],
+    }
+
+    result = await database.command(
+        {'killCursors': 'test', 'cursors': [cursor.cursor_id, 12345]}
+    )
+    assert result['cursorsKilled'] == [cursor.cursor_id]
+    assert result['cursorsNotFound'] == [12345]
+    assert not cursor.alive
+
+    with pytest.raises(CursorNotFound):
+        await cursor.next()
+
+    aggregation = collection.aggregate([{'$project': {'_id': 0}}]).batch_size(5)
+    await aggregation.next()
+    result = await database.command({'getMore': aggregation.cursor_id})
+    assert len(result['cursor']['nextBatch']) == 5
+    result = await database.command({'getMore': aggregation.cursor_id})
+    assert result['cursor'] == {
+        'id': 0,
+        'ns': 'tests.test',
+        'nextBatch': [{'i': 6}, {'i': 7}, {'i': 8}, {'i': 9}],
+    }
+
+
+@pytest.mark.anyio
+async def test_idle_cursors_are_killed():
+    client = AsyncMongoMockClient()
+    manager = client.cursor_manager
+    collection = await _prepare_collection(client)
+
+    now = [0.0]
+    manager.clock = lambda: now[0]
+
+    cursor = collection.find().batch_size(2)
+    immortal_cursor = collection.find(no_cursor_timeout=True).batch_size(2)
+    await cursor.next()
+    await immortal_cursor.next()
+
+    now[0] += manager.timeout / 2
+    await cursor.next()
+    await cursor.next()
+    assert manager.open_cursors == 2
+
+    now[0] += manager.timeout + 1
+    assert manager.open_cursors == 1
+    assert not cursor.alive
+    with pytest.raises(CursorNotFound):
+        await cursor.next()
+
+    assert len(await immortal_cursor.to_list(None)) == DOCUMENTS_COUNT - 1
+
+    closed_cursor = collection.find()
+    await closed_cursor.next()
+    await closed_cursor.close()
+    assert manager.open_cursors == 0
+    with pytest.raises(StopAsyncIteration):
+        await closed_cursor.next()
+
+
+@pytest.mark.anyio
+async def test_idle_cursors_are_not_looked_for_on_every_fetch(monkeypatch):
+    client = AsyncMongoMockClient()
+    manager = client.cursor_manager
+    collection = await _prepare_collection(client)
+
+    now = [0.0]
+    manager.clock = lambda: now[0]
+
+    cursors = [collection.find().batch_size(1) for _ in range(100)]
+    for cursor in cursors:
+        await cursor.next()
+
+    sweeps = []
+    kill_idle = manager._kill_idle
+
+    def counting_kill_idle(*args):
+        sweeps.append(args)
+        kill_idle(*args)
+
+    monkeypatch.setattr(manager, '_kill_idle', counting_kill_idle)
+
+    now[0] += manager.timeout / 2
+    assert len(await cursors[0].to_list(None)) == DOCUMENTS_COUNT - 1
+    assert len(sweeps) == 1
+
+    now[0] += manager.timeout
+    with pytest.raises(CursorNotFound):
+        await cursors[1].next()
+    assert manager.open_cursors == 0
+
+
+@pytest.mark.anyio
+async def test_rewind_restarts_cursor():
+    client = AsyncMongoMockClient()
+    manager = client.cursor_manager
+    collection = await _prepare_collection(client)
+    expected = list(range(DOCUMENTS_COUNT))
+
+    cursor = collection.find().batch_size(3)
+    assert [doc['i'] for doc in await cursor.to_list(None)] == expected
+    assert [doc['i'] for doc in await cursor.rewind().to_list(None)] == expected
+
+    # open cursor is killed on rewind
+    assert (await cursor.rewind().next())['i'] == 0
+    assert manager.open_cursors == 1
+    cursor.rewind()
+    assert manager.open_cursors == 0
+    assert cursor.alive
+    assert [doc['i'] async for doc in cursor] == expected
+
+    cursor = collection.find().batch_size(3).prefetch()
+    assert [doc['i'] for doc in await cursor.to_list(None)] == expected
+    assert [doc['i'] for doc in await cursor.rewind().to_list(None)] == expected
@@ -0,0 +1,89 @@
+import mongomock.collection
+import pytest
+
+from mongomock_motor import AsyncMongoMockClient
+
+DOCUMENTS = [
+    {'v': 1},
+    {'v': 1.0},
+    {'v': True},
+    {'v': [2, 'a']},
+    {'v': {'x': 1}},
+    {'v': None},
+    {'other': 1},
+]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize('with_index', [False, True])
+async def test_distinct_follows_bson_equality(with_index):
+    collection = AsyncMongoMockClient()['tests']['test']
+    if with_index:
+        await collection.create_index('v')
+    await collection.insert_many([dict(doc) for doc in DOCUMENTS])
+
+    values = await collection.distinct('v')
+
+    assert len(values) == 6
+    assert values[0] == 1
+    assert values[1] is True
+    assert values[2:] == [2, 'a', {'x': 1}, None]
+
+    assert await collection.distinct('v', {'v': {'$type': 'number'}}) == [1, 2, 'a']
+
+
+@pytest.mark.anyio
+async def test_distinct_from_index(monkeypatch):
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.create_index('tags')
+    await collection.insert_many(
+        [{'tags': ['a', 'b']}, {'tags': ['b', 'c']}, {'tags': 'd'}]
+    )
+
+    def fail(*args, **kwargs):
+        raise AssertionError('documents should not be scanned')
+
+    monkeypatch.setattr(mongomock.collection, 'filter_applies', fail)
+
+    assert await collection.distinct('tags') == ['a', 'b', 'c', 'd']
+    assert await collection.find().distinct('tags') == ['a', 'b', 'c', 'd']
+
+    monkeypatch.undo()
+
+    await collection.update_one({'tags': 'd'}, {'$set': {'tags': 'e'}})
+    await collection.delete_one({'tags': 'a'})
+    assert await collection.distinct('tags') == ['b', 'c', 'e']
+
+
+@pytest.mark.anyio
+async def test_distinct_returns_copies():
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.create_index('v')
+    await collection.insert_one({'v': {'x': 1}})
+
+    values = await collection.distinct('v')
+    values[0]['x'] = 2
+
+    assert await collection.distinct('v') == [{'x': 1}]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize('with_index', [False, True])
+async def test_distinct_value_of_remaining_document(with_index):
+    collection = AsyncMongoMockClient()['tests']['test']
+    if with_index:
+        await collection.create_index('v')
+    await collection.insert_many([{'_id': 1, 'v': 2}, {'_id': 2, 'v': 2.0}])
+    assert await collection.distinct('v') == [2]
+
+    await collection.update_one({'_id': 1}, {'$set': {'v': 3}})
+    values = await collection.distinct('v')
+    assert sorted((value, type(value)) for value in values) == [(2.0, float), (3, int)]
+
+    await collection.insert_one({'_id': 3, 'v': 3.0})
+    await collection.delete_one({'_id': 1})
+    values = await collection.distinct('v')
+    assert sorted((value, type(value)) for value in values) == [
+        (2.0, float),
+        (3.0, float),
+    ]
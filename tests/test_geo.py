@@ -0,0 +1,160 @@
+import random
+
+import pytest
+from mongomock import OperationFailure
+
+from mongomock_motor import AsyncMongoMockClient, geo
+
+POINTS_COUNT = 2000
+
+
+def point(lng, lat):
+    return {'type': 'Point', 'coordinates': [lng, lat]}
+
+
+@pytest.fixture
+async def places():
+    rng = random.Random(0)
+    collection = AsyncMongoMockClient()['tests']['places']
+    await collection.insert_many(
+        [
+            {
+                '_id': i,
+                'kind': i % 2,
+                'loc': point(rng.uniform(-180, 180), rng.uniform(-90, 90)),
+            }
+            for i in range(POINTS_COUNT)
+        ]
+    )
+    await collection.create_index([('loc', '2dsphere')])
+    return collection
+
+
+def brute_force_nearest(documents, center):
+    return sorted(
+        documents,
+        key=lambda doc: geo.spherical_distance(center, doc['loc']['coordinates']),
+    )
+
+
+@pytest.mark.anyio
+async def test_near_uses_index(places, monkeypatch):
+    documents = await places.find().to_list(None)
+    center = (10.0, 20.0)
+    expected = [doc['_id'] for doc in brute_force_nearest(documents, center)]
+
+    calls = []
+    original = geo.spherical_distance
+    monkeypatch.setattr(
+        geo,
+        'spherical_distance',
+        lambda *args: calls.append(args) or original(*args),
+    )
+
+    query = {'loc': {'$near': {'$geometry': point(*center)}}}
+    found = await places.find(query).limit(10).to_list(None)
+    assert [doc['_id'] for doc in found] == expected[:10]
+    # only closest part of the tree is visited
+    assert len(calls) < POINTS_COUNT / 10
+
+    query = {'loc': {'$near': {'$geometry': point(*center)}}, 'kind': 1}
+    found = await places.find(query).limit(5).to_list(None)
+    assert [doc['_id'] for doc in found] == [i for i in expected if i % 2][:5]
+
+    # 1000 km around the center
+    query = {'loc': {'$nearSphere': {'$geometry': point(*center), '$maxDistance': 1e6}}}
+    found = [doc['_id'] for doc in await places.find(query).to_list(None)]
+    assert found == [
+        doc['_id']
+        for doc in brute_force_nearest(documents, center)
+        if original(center, doc['loc']['coordinates']) * geo.EARTH_RADIUS <= 1e6
+    ]
+
+    await places.delete_one({'_id': expected[0]})
+    await places.update_one({'_id': expected[5]}, {'$set': {'loc': point(*center)}})
+    found = await places.find_one({'loc': {'$near': {'$geometry': point(*center)}}})
+    assert found is not None and found['_id'] == expected[5]
+
+
+@pytest.mark.anyio
+async def test_geo_within_and_intersects(places):
+    documents = await places.find().to_list(None)
+
+    def ids(predicate):
+        return [
+            doc['_id'] for doc in documents if predicate(*doc['loc']['coordinates'])
+        ]
+
+    square = [[0, 0], [30, 0], [30, 30], [0, 30], [0, 0]]
+    query = {
+        'loc': {
+            '$geoWithin': {'$geometry': {'type': 'Polygon', 'coordinates': [square]}}
+        }
+    }
+    found = [doc['_id'] for doc in await places.find(query).to_list(None)]
+    assert found == ids(lambda lng, lat: 0 < lng < 30 and 0 < lat < 30)
+
+    query = {'loc': {'$geoWithin': {'$box': [[-10, -10], [10, 10]]}}, 'kind': 0}
+    found = [doc['_id'] for doc in await places.find(query).to_list(None)]
+    assert found == [
+        i
+        for i in ids(lambda lng, lat: -10 <= lng <= 10 and -10 <= lat <= 10)
+        if i % 2 == 0
+    ]
+
+    query = {'loc': {'$geoWithin': {'$centerSphere': [[0, 0], 0.2]}}}
+    assert await places.count_documents(query) == len(
+        ids(lambda lng, lat: geo.spherical_distance((0, 0), (lng, lat)) <= 0.2)
+    )
+
+    await places.insert_one(
+        {'_id': 'area', 'loc': {'type': 'Polygon', 'coordinates': [square]}}
+    )
+    query = {'loc': {'$geoIntersects': {'$geometry': point(15, 15)}}}
+    assert [doc['_id'] for doc in await places.find(query).to_list(None)] == ['area']
+
+
+@pytest.mark.anyio
+async def test_geo_near_stage(places):
+    center = point(-70, 40)
+    docs = await places.aggregate(
+        [
+            {
+                '$geoNear': {
+                    'near': center,
+                    'distanceField': 'dist.calculated',
+                    'query': {'kind': 0},
+                    'maxDistance': 2e6,
+                    'includeLocs': 'dist.location',
+                }
+            },
+            {'$limit': 3},
+        ]
+    ).to_list(None)
+
+    assert docs
+    assert all(doc['kind'] == 0 for doc in docs)
+    distances = [doc['dist']['calculated'] for doc in docs]
+    assert distances == sorted(distances) and distances[-1] <= 2e6
+    assert docs[0]['dist']['location'] == docs[0]['loc']['coordinates']
+
+
+@pytest.mark.anyio
+async def test_legacy_2d_index():
+    collection = AsyncMongoMockClient()['tests']['grid']
+    await collection.insert_many(
+        [{'_id': x * 10 + y, 'pos': [x, y]} for x in range(10) for y in range(10)]
+    )
+
+    with pytest.raises(OperationFailure) as exc_info:
+        await collection.find_one({'pos': {'$near': [0, 0]}})
+    assert exc_info.value.code == 291
+
+    await collection.create_index([('pos', '2d')])
+    query = {'pos': {'$near': [4.9, 5.2], '$maxDistance': 1}}
+    found = [doc['_id'] for doc in await collection.find(query).to_list(None)]
+    assert found == [55, 56, 45]
+
+    query = {'pos': {'$geoWithin': {'$center': [[0, 0], 1.5]}}}
+    found = [doc['_id'] for doc in await collection.find(query).to_list(None)]
+    assert found == [0, 1, 10, 11]
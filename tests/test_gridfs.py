@@ -1,9 +1,18 @@
 import io
+import mmap
+import os
+import tracemalloc
 
 import pytest
+from gridfs.errors import NoFile
 from motor.motor_asyncio import AsyncIOMotorGridFSBucket
 
-from mongomock_motor import AsyncMongoMockClient, enabled_gridfs_integration
+from mongomock_motor import (
+    AsyncMongoMockClient,
+    AsyncMongoMockGridFSBucket,
+    enabled_gridfs_integration,
+    gridfs,
+)
 
 
 @pytest.mark.anyio
@@ -18,3 +27,118 @@ async def test_gridfs():
         with io.BytesIO() as buffer:
             await fs.download_to_stream(file_id, buffer)
             assert buffer.getvalue() == file_bytes
+
+
+class RecordingStream:
+    def __init__(self):
+        self.pieces = []
+
+    def write(self, data):
+        self.pieces.append(data)
+
+
+@pytest.mark.anyio
+async def test_bucket_streams_chunks():
+    database = AsyncMongoMockClient()['db']
+    fs = AsyncMongoMockGridFSBucket(database, chunk_size_bytes=1000)
+    assert isinstance(fs, AsyncIOMotorGridFSBucket)
+
+    data = bytes(range(256)) * 40
+    grid_in = fs.open_upload_stream('data.bin', metadata={'kind': 'test'})
+    async with grid_in:
+        # writes of all sizes end up in full chunks
+        await grid_in.write(data[:10])
+        await grid_in.write(memoryview(data)[10:2500])
+        await grid_in.write(bytearray(data[2500:]))
+
+    chunks = await database['fs.chunks'].find().sort('n').to_list(None)
+    assert [len(chunk['data']) for chunk in chunks] == [1000] * 10 + [240]
+
+    stream = RecordingStream()
+    await fs.download_to_stream(grid_in._id, stream)
+    assert all(isinstance(piece, memoryview) for piece in stream.pieces)
+    assert len(stream.pieces) == len(chunks)
+    assert b''.join(stream.pieces) == data
+
+    grid_out = await fs.open_download_stream(grid_in._id)
+    assert (grid_out.filename, grid_out.length) == ('data.bin', len(data))
+    assert grid_out.metadata == {'kind': 'test'}
+    grid_out.seek(1990)
+    assert await grid_out.read(20) == data[1990:2010]
+    assert await grid_out.readchunk() == data[2010:3000]
+    assert await grid_out.read() == data[3000:]
+    assert await grid_out.read() == b''
+
+
+@pytest.mark.anyio
+async def test_bucket_files():
+    fs = AsyncMongoMockGridFSBucket(AsyncMongoMockClient()['db'], 'media')
+
+    first = await fs.upload_from_stream('a.txt', io.BytesIO(b'one\ntwo\n'))
+    second = await fs.upload_from_stream('a.txt', b'second')
+    await fs.upload_from_stream_with_id('b', 'b.txt', b'')
+
+    grid_out = await fs.open_download_stream_by_name('a.txt', revision=0)
+    assert grid_out._id == first
+    assert await grid_out.readline() == b'one\n'
+    assert await grid_out.readline() == b'two\n'
+    grid_out = await fs.open_download_stream_by_name('a.txt')
+    assert await grid_out.read() == b'second'
+
+    files = await fs.find({'filename': 'a.txt'}).sort('_id', -1).to_list(None)
+    assert [grid_out._id for grid_out in files] == [second, first]
+
+    await fs.rename('b', 'c.txt')
+    with io.BytesIO() as buffer:
+        await fs.download_to_stream_by_name('c.txt', buffer)
+        assert buffer.getvalue() == b''
+
+    await fs.delete(first)
+    with pytest.raises(NoFile):
+        await fs.open_download_stream(first)
+    with pytest.raises(NoFile):
+        await fs.delete(first)
+
+
+@pytest.mark.anyio
+async def test_large_files_spill_to_disk():
+    database = AsyncMongoMockClient()['db']
+    fs = AsyncMongoMockGridFSBucket(
+        database, chunk_size_bytes=64 * 1024, mock_spill_threshold=256 * 1024
+    )
+
+    small_id = await fs.upload_from_stream('small.bin', b'x' * 1000)
+    data = os.urandom(4 * 1024 * 1024)
+    tracemalloc.start()
+    file_id = await fs.upload_from_stream('large.bin', io.BytesIO(data))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # only a few chunks are in memory at once
+    assert peak < len(data) / 4
+
+    chunks = database['fs.chunks']
+    assert await chunks.count_documents({'files_id': file_id}) == 64
+    # spilled payloads are kept out of chunk documents
+    chunk = await chunks.find_one({'files_id': file_id, 'n': 63})
+    assert chunk['data'] == b''
+    assert await chunks.count_documents({'files_id': file_id, 'data': b''}) == 60
+    stats = await database.command('collStats', 'fs.chunks')
+    assert stats['count'] == 65
+    chunk = await chunks.find_one({'files_id': small_id})
+    assert chunk['data'] == b'x' * 1000
+
+    stream = RecordingStream()
+    await fs.download_to_stream(file_id, stream)
+    assert isinstance(stream.pieces[-1].obj, mmap.mmap)
+    assert b''.join(stream.pieces) == data
+
+    grid_out = await fs.open_download_stream(file_id)
+    grid_out.seek(-10, io.SEEK_END)
+    assert await grid_out.read() == data[-10:]
+
+    # other buckets over the same collections see spilled payloads
+    other = AsyncMongoMockGridFSBucket(database)
+    assert await (await other.open_download_stream(file_id)).read() == data
+
+    await fs.delete(file_id)
+    assert not gridfs._get_spilled_chunks(chunks)
@@ -0,0 +1,182 @@
+import math
+import time
+
+import mongomock
+import pytest
+
+from mongomock_motor import AsyncMongoMockClient, accumulators
+
+PIPELINE = [
+    {
+        '$group': {
+            '_id': '$kind',
+            'total': {'$sum': '$value'},
+            'count': {'$sum': 1},
+            'avg': {'$avg': '$value'},
+            'min': {'$min': '$value'},
+            'max': {'$max': '$value'},
+            'std': {'$stdDevPop': '$value'},
+            'values': {'$push': '$value'},
+            'unique': {'$addToSet': '$value'},
+        }
+    }
+]
+
+
+async def _prepare_metrics(collection):
+    await collection.insert_many(
+        [
+            {'kind': 'b', 'value': 4},
+            {'kind': 'a', 'value': 1},
+            {'kind': 'a', 'value': 3},
+            {'kind': 'b', 'value': 4},
+            {'kind': 'c'},
+        ]
+    )
+
+
+@pytest.mark.anyio
+async def test_group():
+    collection = AsyncMongoMockClient()['tests']['test']
+    await _prepare_metrics(collection)
+
+    docs = await collection.aggregate(PIPELINE).to_list(None)
+
+    assert docs == [
+        {
+            '_id': 'a',
+            'total': 4,
+            'count': 2,
+            'avg': 2.0,
+            'min': 1,
+            'max': 3,
+            'std': 1.0,
+            'values': [1, 3],
+            'unique': [1, 3],
+        },
+        {
+            '_id': 'b',
+            'total': 8,
+            'count': 2,
+            'avg': 4.0,
+            'min': 4,
+            'max': 4,
+            'std': 0.0,
+            'values': [4, 4],
+            'unique': [4],
+        },
+        {
+            '_id': 'c',
+            'total': 0,
+            'count': 1,
+            'avg': None,
+            'min': None,
+            'max': None,
+            'std': None,
+            'values': [],
+            'unique': [],
+        },
+    ]
+
+
+@pytest.mark.anyio
+async def test_group_by_document_and_null():
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.insert_many(
+        [
+            {'a': 1, 'b': 1.0, 'v': 1},
+            {'a': 1, 'b': 1, 'v': 2},
+            {'a': 2, 'v': 3},
+        ]
+    )
+
+    docs = await collection.aggregate(
+        [{'$group': {'_id': {'a': '$a', 'b': '$b'}, 'v': {'$sum': '$v'}}}]
+    ).to_list(None)
+    assert docs == [{'_id': {'a': 1, 'b': 1}, 'v': 3}, {'_id': {'a': 2}, 'v': 3}]
+
+    docs = await collection.aggregate(
+        [{'$group': {'_id': None, 'v': {'$max': '$v'}}}]
+    ).to_list(None)
+    assert docs == [{'_id': None, 'v': 3}]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize('make_value', [lambda i: i * 3, lambda i: i / 7])
+async def test_group_vectorized(monkeypatch, make_value):
+    pytest.importorskip('numpy')
+
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.insert_many(
+        [{'kind': i % 3, 'value': make_value(i)} for i in range(20)]
+        + [{'kind': 'empty'}],
+    )
+
+    expected = await collection.aggregate(PIPELINE).to_list(None)
+
+    monkeypatch.setattr(accumulators, 'VECTORIZE_THRESHOLD', 0)
+    docs = await collection.aggregate(PIPELINE).to_list(None)
+
+    assert [doc['_id'] for doc in docs] == [0, 1, 2, 'empty']
+    for doc, expected_doc in zip(docs, expected):
+        for field, value in expected_doc.items():
+            assert type(doc[field]) is type(value)
+            if isinstance(value, float):
+                assert math.isclose(doc[field], value)
+            else:
+                assert doc[field] == value
+
+
+@pytest.mark.anyio
+async def test_group_is_faster_than_mongomock():
+    documents = [{'_id': i, 'kind': i % 10, 'value': i} for i in range(5000)]
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.insert_many([dict(doc) for doc in documents])
+    plain = mongomock.MongoClient()['tests']['test']
+    plain.insert_many([dict(doc) for doc in documents])
+    pipeline = [{'$group': {'_id': '$kind', 'total': {'$sum': '$value'}}}]
+
+    async def measure(run):
+        # best of a few runs, so that warming up isn't measured
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            result = await run()
+            timings.append(time.perf_counter() - start)
+        return result, min(timings)
+
+    docs, elapsed = await measure(
+        lambda: collection.aggregate(pipeline).to_list(None),
+    )
+
+    async def aggregate_plain():
+        return list(plain.aggregate(pipeline))
+
+    expected, baseline = await measure(aggregate_plain)
+
+    assert sorted(docs, key=lambda doc: doc['_id']) == expected
+    assert elapsed < baseline / 2
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize('threshold', [0, accumulators.VECTORIZE_THRESHOLD])
+async def test_group_min_max_sort_nan_below_numbers(monkeypatch, threshold):
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.insert_many(
+        [{'v': 1.0}, {'v': float('nan')}, {'v': 3.0}, {'v': 2.0}]
+    )
+    monkeypatch.setattr(accumulators, 'VECTORIZE_THRESHOLD', threshold)
+
+    docs = await collection.aggregate(
+        [{'$group': {'_id': None, 'min': {'$min': '$v'}, 'max': {'$max': '$v'}}}]
+    ).to_list(None)
+
+    assert len(docs) == 1 and math.isnan(docs[0]['min']) and docs[0]['max'] == 3.0
+
+
+@pytest.mark.parametrize('values', [[math.nan, 1.0], [1.0, math.nan]])
+def test_min_max_with_nan_regardless_of_order(values):
+    assert math.isnan(accumulators.ACCUMULATORS['$min'](values))
+    assert accumulators.ACCUMULATORS['$max'](values) == 1.0
+    assert accumulators.ACCUMULATORS['$max']([*values, 'a']) == 'a'
+    assert math.isnan(accumulators.ACCUMULATORS['$max']([math.nan, None]))
@@ -0,0 +1,29 @@
+import subprocess
+import sys
+
+SCRIPT = """
+import asyncio, sys
+import mongomock_motor
+
+heavy = ('motor', 'gridfs', 'beanie', 'numpy')
+assert not [name for name in heavy if name in sys.modules], sys.modules.keys()
+
+async def main():
+    client = mongomock_motor.AsyncMongoMockClient()
+    collection = client['tests']['test']
+    await collection.insert_one({'a': 1})
+    assert await collection.find({'a': 1}).to_list(None)
+    assert 'motor' not in sys.modules
+
+    # motor is imported once mock has to pretend to be motor
+    from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+    assert isinstance(client, AsyncIOMotorClient)
+    assert isinstance(collection, AsyncIOMotorCollection)
+    assert type(collection).__name__ == 'AsyncIOMotorCollection'
+
+asyncio.run(main())
+"""
+
+
+def test_heavy_modules_are_imported_lazily():
+    subprocess.run([sys.executable, '-c', SCRIPT], check=True)
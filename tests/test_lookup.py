@@ -0,0 +1,213 @@
+import pytest
+
+from mongomock_motor import AsyncMongoMockClient
+
+
+async def _prepare_orders(db):
+    await db.orders.insert_many(
+        [
+            {'_id': 1, 'items': ['a', 'b']},
+            {'_id': 2, 'items': ['c']},
+            {'_id': 3},
+        ]
+    )
+    await db.lines.insert_many(
+        [
+            {'_id': 'l1', 'order': 1, 'sku': 'a', 'qty': 2},
+            {'_id': 'l2', 'order': 1, 'sku': 'b', 'qty': 1},
+            {'_id': 'l3', 'order': 2, 'sku': 'c', 'qty': 5},
+            {'_id': 'l4', 'sku': 'd', 'qty': 7},
+        ]
+    )
+
+
+@pytest.mark.anyio
+async def test_lookup_equality():
+    db = AsyncMongoMockClient()['tests']
+    await _prepare_orders(db)
+
+    docs = await db.orders.aggregate(
+        [
+            {
+                '$lookup': {
+                    'from': 'lines',
+                    'localField': '_id',
+                    'foreignField': 'order',
+                    'as': 'lines',
+                }
+            },
+            {'$project': {'lines': '$lines._id'}},
+        ]
+    ).to_list(None)
+
+    assert docs == [
+        {'_id': 1, 'lines': ['l1', 'l2']},
+        {'_id': 2, 'lines': ['l3']},
+        {'_id': 3, 'lines': []},
+    ]
+
+
+@pytest.mark.anyio
+async def test_lookup_array_and_missing_local_field():
+    db = AsyncMongoMockClient()['tests']
+    await _prepare_orders(db)
+
+    docs = await db.orders.aggregate(
+        [
+            {
+                '$lookup': {
+                    'from': 'lines',
+                    'localField': 'items',
+                    'foreignField': 'sku',
+                    'as': 'lines',
+                }
+            },
+        ]
+    ).to_list(None)
+
+    assert [[line['_id'] for line in doc['lines']] for doc in docs] == [
+        ['l1', 'l2'],
+        ['l3'],
+        [],
+    ]
+
+    # Documents without local field match documents without foreign field
+    docs = await db.lines.aggregate(
+        [
+            {
+                '$lookup': {
+                    'from': 'orders',
+                    'localField': 'order',
+                    'foreignField': 'items',
+                    'as': 'orders',
+                }
+            },
+        ]
+    ).to_list(None)
+
+    assert [[order['_id'] for order in doc['orders']] for doc in docs] == [
+        [],
+        [],
+        [],
+        [3],
+    ]
+
+
+@pytest.mark.anyio
+async def test_lookup_uses_maintained_index():
+    db = AsyncMongoMockClient()['tests']
+    await _prepare_orders(db)
+    await db.lines.create_index('order')
+
+    pipeline = [
+        {
+            '$lookup': {
+                'from': 'lines',
+                'localField': '_id',
+                'foreignField': 'order',
+                'as': 'lines',
+            }
+        },
+        {'$project': {'lines': '$lines._id'}},
+    ]
+
+    assert (await db.orders.aggregate(pipeline).to_list(None))[0]['lines'] == [
+        'l1',
+        'l2',
+    ]
+
+    await db.lines.update_one({'_id': 'l3'}, {'$set': {'order': 1}})
+    await db.lines.delete_one({'_id': 'l1'})
+    await db.lines.insert_one({'_id': 'l5', 'order': 1})
+
+    docs = await db.orders.aggregate(pipeline).to_list(None)
+    assert docs == [
+        {'_id': 1, 'lines': ['l2', 'l3', 'l5']},
+        {'_id': 2, 'lines': []},
+        {'_id': 3, 'lines': []},
+    ]
+
+
+@pytest.mark.anyio
+async def test_lookup_pipeline_with_let():
+    db = AsyncMongoMockClient()['tests']
+    await _prepare_orders(db)
+
+    docs = await db.orders.aggregate(
+        [
+            {
+                '$lookup': {
+                    'from': 'lines',
+                    'let': {'order_id': '$_id'},
+                    'pipeline': [
+                        {'$match': {'order': {'$exists': True}}},
+                        {'$match': {'$expr': {'$eq': ['$order', '$$order_id']}}},
+                        {'$match': {'qty': {'$gt': 1}}},
+                        {'$project': {'_id': 0, 'sku': 1}},
+                    ],
+                    'as': 'big_lines',
+                }
+            },
+        ]
+    ).to_list(None)
+
+    assert [doc['big_lines'] for doc in docs] == [
+        [{'sku': 'a'}],
+        [{'sku': 'c'}],
+        [],
+    ]
+
+
+@pytest.mark.anyio
+async def test_lookup_results_are_independent_copies():
+    db = AsyncMongoMockClient()['tests']
+    await db.left.insert_many([{'_id': 1, 'k': 'x'}, {'_id': 2, 'k': 'x'}])
+    await db.right.insert_one({'_id': 1, 'k': 'x', 'tags': []})
+
+    docs = await db.left.aggregate(
+        [
+            {
+                '$lookup': {
+                    'from': 'right',
+                    'localField': 'k',
+                    'foreignField': 'k',
+                    'as': 'right',
+                }
+            },
+        ]
+    ).to_list(None)
+
+    docs[0]['right'][0]['tags'].append('changed')
+    assert docs[1]['right'][0]['tags'] == []
+    assert (await db.right.find_one({'_id': 1}))['tags'] == []
+
+
+@pytest.mark.anyio
+async def test_lookup_matches_booleans_like_mongomock():
+    db = AsyncMongoMockClient()['tests']
+    await db.left.insert_many(
+        [{'_id': 1, 'k': True}, {'_id': 2, 'k': 0}, {'_id': 3, 'k': {'x': 1, 'y': 2}}]
+    )
+    await db.right.insert_many(
+        [{'_id': 1, 'k': 1}, {'_id': 2, 'k': False}, {'_id': 3, 'k': {'y': 2, 'x': 1}}]
+    )
+
+    docs = await db.left.aggregate(
+        [
+            {
+                '$lookup': {
+                    'from': 'right',
+                    'localField': 'k',
+                    'foreignField': 'k',
+                    'as': 'right',
+                }
+            },
+            {'$project': {'right': '$right._id'}},
+        ]
+    ).to_list(None)
+
+    assert docs == [
+        {'_id': 1, 'right': [1]},
+        {'_id': 2, 'right': [2]},
+        {'_id': 3, 'right': [3]},
+    ]
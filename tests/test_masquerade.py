@@ -0,0 +1,93 @@
+from unittest.mock import patch
+
+import pytest
+from mongomock.collection import Collection as MongoMockCollection
+from motor.motor_asyncio import (
+    AsyncIOMotorClient,
+    AsyncIOMotorCollection,
+    AsyncIOMotorCommandCursor,
+    AsyncIOMotorCursor,
+    AsyncIOMotorDatabase,
+    AsyncIOMotorLatentCommandCursor,
+)
+
+from mongomock_motor import (
+    AsyncCommandCursor,
+    AsyncCursor,
+    AsyncLatentCommandCursor,
+    AsyncMongoMockClient,
+    AsyncMongoMockCollection,
+    AsyncMongoMockDatabase,
+    masquerade_class,
+)
+
+
+def test_instances_pretend_to_be_motor_ones():
+    client = AsyncMongoMockClient()
+    collection = client['tests']['test']
+    cases = [
+        (client, AsyncMongoMockClient, AsyncIOMotorClient),
+        (client['tests'], AsyncMongoMockDatabase, AsyncIOMotorDatabase),
+        (collection, AsyncMongoMockCollection, AsyncIOMotorCollection),
+        (collection.find(), AsyncCursor, AsyncIOMotorCursor),
+        (collection.list_indexes(), AsyncCommandCursor, AsyncIOMotorCommandCursor),
+        (
+            collection.aggregate([]),
+            AsyncLatentCommandCursor,
+            AsyncIOMotorLatentCommandCursor,
+        ),
+    ]
+
+    for instance, mock_class, motor_class in cases:
+        assert isinstance(instance, motor_class)
+        assert isinstance(instance, (dict, motor_class))
+        assert isinstance(instance, mock_class)
+        assert not isinstance(instance, dict)
+        assert instance.__class__ is motor_class
+        assert type(instance).__name__ == mock_class.__name__ == motor_class.__name__
+        assert type(instance).__module__ == motor_class.__module__
+
+
+def test_unknown_target_and_subclasses():
+    @masquerade_class('missing_module.Missing')
+    class Mock:
+        pass
+
+    mock = Mock()
+    assert mock.__class__ is type(mock) is Mock
+    assert type(mock).__name__ == 'Missing'
+
+    class CustomCollection(AsyncMongoMockCollection):
+        pass
+
+    database = AsyncMongoMockClient()['tests']
+    collection = CustomCollection(database, database.delegate['test'])
+    assert isinstance(collection, AsyncIOMotorCollection)
+    assert type(collection) is CustomCollection
+
+
+@pytest.mark.anyio
+async def test_attribute_delegation():
+    database = AsyncMongoMockClient()['tests']
+    collection = database['test']
+
+    assert collection.name == 'test'
+    assert database.name == 'tests'
+    assert isinstance(database.other, AsyncIOMotorCollection)
+    # sub-collections are still looked up by "mongomock"
+    assert collection.sub.full_name == 'tests.test.sub'
+    assert database['other'].full_name == 'tests.other'
+
+    # attribute of the instance takes precedence
+    with patch.object(collection, 'name', 'patched'):
+        assert collection.name == 'patched'
+    assert collection.name == 'test'
+
+    # attributes are looked up at the wrapped object every time
+    with patch.object(MongoMockCollection, 'find_raw_batches', 'patched'):
+        assert collection.find_raw_batches == 'patched'
+    assert collection.find_raw_batches != 'patched'
+
+    await collection.insert_one({'_id': 1})
+    assert await database.other.count_documents({}) == 0
+    assert await database.test.count_documents({}) == 1
@@ -0,0 +1,106 @@
+import os
+import socket
+import tempfile
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from mongomock_motor import AsyncMongoMockClient
+from mongomock_motor.server import MockServer, start_server_process
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope='module', params=['unix', 'tcp'])
+def server_address(request):
+    if request.param == 'tcp':
+        address = f'127.0.0.1:{_free_port()}'
+    elif hasattr(socket, 'AF_UNIX'):
+        address = os.path.join(tempfile.mkdtemp(), 'mongomock.sock')
+    else:
+        pytest.skip('Unix sockets are not supported')
+    process = start_server_process(address)
+    yield address
+    process.terminate()
+    process.join()
+
+
+@pytest.mark.anyio
+async def test_workers_share_server(server_address):
+    seeder = AsyncMongoMockClient(mock_server_address=server_address)
+    await seeder['fixtures']['users'].insert_many(
+        [{'_id': i, 'name': f'user{i}'} for i in range(2500)]
+    )
+
+    workers = [
+        AsyncMongoMockClient(
+            mock_server_address=server_address,
+            mock_namespace=f'gw{i}',
+            mock_shared_databases=['fixtures'],
+        )
+        for i in range(2)
+    ]
+    for i, worker in enumerate(workers):
+        users = worker['fixtures']['users']
+        # documents are received in several batches
+        found = await users.find({}, {'name': 0}).sort('_id', -1).to_list(None)
+        assert found == [{'_id': n} for n in reversed(range(2500))]
+        assert await users.find({'_id': {'$lt': 5}}).distinct('_id') == list(range(5))
+
+        # databases of workers are isolated
+        tests = worker['tests']
+        assert tests.name == 'tests'
+        await tests['test'].insert_one({'worker': i})
+        assert await tests['test'].count_documents({}) == 1
+        assert await worker.list_database_names() == ['fixtures', 'tests']
+
+    assert sorted(await seeder.list_database_names()) == [
+        'fixtures',
+        'gw0_tests',
+        'gw1_tests',
+    ]
+    for worker in workers:
+        await worker.drop_database('tests')
+        worker.close()
+
+
+@pytest.mark.anyio
+async def test_remote_collection(server_address):
+    client = AsyncMongoMockClient(
+        mock_server_address=server_address,
+        mock_namespace='test',
+        mock_build_info={'ok': 1.0, 'version': '4.4.0', 'versionArray': [4, 4, 0]},
+    )
+    database = client['tests']
+    collection = database['test']
+
+    document = {'a': 1}
+    await collection.insert_one(document)
+    assert '_id' in document
+    assert await collection.find_one({'a': 1}) == document
+
+    await collection.create_index('a', unique=True)
+    with pytest.raises(DuplicateKeyError) as exc_info:
+        await collection.insert_one({'a': 1})
+    assert exc_info.value.details == {'keyValue': {'a': 1}, 'keyPattern': {'a': 1}}
+
+    # cursor left behind is killed along with the next request
+    cursor = collection.aggregate([{'$project': {'_id': 0}}])
+    assert await cursor.next() == {'a': 1}
+    await cursor.close()
+
+    await database.create_collection('log', capped=True, size=1000)
+    assert await database['log'].options() == {'capped': True, 'size': 1000}
+    assert (await database.command('buildinfo'))['version'] == '4.4.0'
+    assert (await database.command({'ping': 1}))['ok'] == 1.0
+    assert sorted(await database.list_collection_names()) == ['log', 'test']
+
+
+@pytest.mark.anyio
+async def test_server_refuses_non_loopback_address():
+    with pytest.raises(ValueError):
+        await MockServer(f'0.0.0.0:{_free_port()}').start()
@@ -0,0 +1,103 @@
+import pytest
+from pymongo import IndexModel
+from pymongo.errors import DuplicateKeyError
+
+from mongomock_motor import AsyncMongoMockClient
+
+USERS_COUNT = 300
+
+
+@pytest.fixture
+async def users():
+    collection = AsyncMongoMockClient()['tests']['users']
+    await collection.insert_many(
+        [
+            {'_id': i, 'email': f'user{i % 100}@example.com', 'active': i < 100}
+            for i in range(USERS_COUNT)
+        ]
+    )
+    return collection
+
+
+@pytest.mark.anyio
+async def test_unique_among_active_users(users):
+    # inactive users share emails, which doesn't prevent index creation
+    await users.create_index(
+        'email', unique=True, partialFilterExpression={'active': True}
+    )
+    # same index again is fine
+    await users.create_index(
+        'email', unique=True, partialFilterExpression={'active': True}
+    )
+
+    await users.insert_one({'_id': 'a', 'email': 'user1@example.com'})
+    with pytest.raises(DuplicateKeyError) as exc_info:
+        await users.insert_one(
+            {'_id': 'b', 'email': 'user1@example.com', 'active': True}
+        )
+    assert exc_info.value.details == {
+        'keyValue': {'email': 'user1@example.com'},
+        'keyPattern': {'email': 1},
+    }
+
+    await users.update_one({'_id': 1}, {'$set': {'active': False}})
+    await users.insert_one({'_id': 'b', 'email': 'user1@example.com', 'active': True})
+    with pytest.raises(DuplicateKeyError):
+        await users.update_one({'_id': 1}, {'$set': {'active': True}})
+
+    with pytest.raises(DuplicateKeyError):
+        await users.create_index(
+            'email',
+            unique=True,
+            partialFilterExpression={'active': False},
+            name='inactive_email',
+        )
+    assert 'inactive_email' not in await users.index_information()
+
+
+@pytest.mark.anyio
+async def test_partial_index_is_used_when_implied(users, filter_calls):
+    await users.create_indexes(
+        [IndexModel('email', partialFilterExpression={'active': True})]
+    )
+    info = await users.index_information()
+    assert info['email_1']['partialFilterExpression'] == {'active': True}
+
+    index = users._store.get_indexes()[0]
+    assert len(index) == 100
+
+    filter_calls.clear()
+    query = {'email': 'user7@example.com', 'active': True}
+    assert [doc['_id'] for doc in await users.find(query).to_list(None)] == [7]
+    assert len(filter_calls) < 5
+
+    # documents missing from the index are found by scanning
+    filter_calls.clear()
+    found = await users.find({'email': 'user7@example.com'}).to_list(None)
+    assert [doc['_id'] for doc in found] == [7, 107, 207]
+    assert len(filter_calls) >= USERS_COUNT
+
+    await users.update_many({'_id': {'$lt': 50}}, {'$set': {'active': False}})
+    assert len(index) == 50
+    assert await users.count_documents(query) == 0
+
+
+@pytest.mark.anyio
+async def test_partial_index_range_implication(filter_calls):
+    collection = AsyncMongoMockClient()['tests']['people']
+    await collection.insert_many([{'_id': i, 'age': i % 90} for i in range(300)])
+    await collection.create_index('age', partialFilterExpression={'age': {'$gte': 18}})
+    assert len(collection._store.get_indexes()[0]) == 300 - 18 * 4
+
+    async def ids(query):
+        filter_calls.clear()
+        return [doc['_id'] for doc in await collection.find(query).to_list(None)]
+
+    assert await ids({'age': {'$gt': 85}}) == [i for i in range(300) if i % 90 > 85]
+    assert len(filter_calls) < 20
+
+    assert await ids({'age': {'$lt': 2}}) == [i for i in range(300) if i % 90 < 2]
+    assert len(filter_calls) >= 300
+
+    assert await ids({'$and': [{'age': {'$gte': 18}}, {'age': 40}]}) == [40, 130, 220]
+    assert len(filter_calls) == 3
@@ -0,0 +1,196 @@
+import datetime
+import random
+
+import pytest
+
+from mongomock_motor import AsyncMongoMockClient
+
+TENANTS_COUNT = 10
+DOCUMENTS_COUNT = 500
+
+
+async def make_collections(documents, *index_specs):
+    client = AsyncMongoMockClient()
+    indexed, plain = client['tests']['indexed'], client['tests']['plain']
+    for spec in index_specs:
+        await indexed.create_index(spec)
+    for collection in (indexed, plain):
+        await collection.insert_many([dict(doc) for doc in documents])
+    return indexed, plain
+
+
+@pytest.mark.anyio
+async def test_compound_index_serves_filter_and_sort(filter_calls):
+    rng = random.Random(0)
+    start = datetime.datetime(2024, 1, 1)
+    indexed, plain = await make_collections(
+        [
+            {
+                '_id': i,
+                'tenant': i % TENANTS_COUNT,
+                'created': start + datetime.timedelta(hours=rng.randrange(100)),
+            }
+            for i in range(DOCUMENTS_COUNT)
+        ],
+        [('tenant', 1), ('created', -1)],
+    )
+
+    async def both(query, sort, limit):
+        results = []
+        for collection in (indexed, plain):
+            cursor = collection.find(query).sort(sort).limit(limit)
+            results.append(await cursor.to_list(None))
+        return results
+
+    filter_calls.clear()
+    found, expected = await both({'tenant': 3}, [('created', -1)], 5)
+    assert found == expected
+    # documents of other tenants aren't looked at, nothing is sorted in memory
+    calls = len(filter_calls)
+    found, _ = await both({'tenant': 3}, [('tenant', 1), ('created', 1)], 5)
+    assert found == sorted(found, key=lambda doc: (doc['created'], doc['_id']))
+
+    filter_calls.clear()
+    await indexed.find({'tenant': 3}).sort('created', -1).limit(5).to_list(None)
+    assert len(filter_calls) < DOCUMENTS_COUNT / TENANTS_COUNT
+    assert calls > len(filter_calls)
+
+    # equality, sort and range
+    query = {'tenant': 7, 'created': {'$gte': start + datetime.timedelta(hours=50)}}
+    found, expected = await both(query, [('created', 1), ('_id', -1)], 20)
+    assert found == expected
+
+    filter_calls.clear()
+    assert await indexed.count_documents({'tenant': 7}) == DOCUMENTS_COUNT // 10
+    assert filter_calls == []
+
+    await indexed.delete_many(
+        {'tenant': 7, 'created': {'$lt': start + datetime.timedelta(hours=50)}}
+    )
+    await plain.delete_many(
+        {'tenant': 7, 'created': {'$lt': start + datetime.timedelta(hours=50)}}
+    )
+    found, expected = await both({'tenant': 7}, [('created', -1)], 0)
+    assert found == expected
+
+
+@pytest.mark.anyio
+async def test_index_order_matches_sorting():
+    rng = random.Random(1)
+    values = [
+        None,
+        1,
+        2.5,
+        -3,
+        'a',
+        'B',
+        '',
+        True,
+        False,
+        datetime.datetime(2020, 1, 1),
+    ]
+    documents = []
+    for i in range(200):
+        document = {'_id': i, 'g': rng.randrange(3)}
+        if rng.random() < 0.9:
+            document['v'] = rng.choice(values)
+        documents.append(document)
+    indexed, plain = await make_collections(documents, [('g', 1), ('v', 1)], 'v')
+
+    queries = [
+        {},
+        {'g': 1},
+        {'g': 2, 'v': {'$gt': 0}},
+        {'v': {'$lte': 'a'}},
+        {'v': {'$gte': 1, '$lt': 3}},
+        {'g': {'$in': [0, 1]}},
+    ]
+    for query in queries:
+        for sort in ([('v', 1)], [('v', -1)], [('v', -1), ('g', 1)]):
+            for skip, limit in ((0, 0), (3, 7)):
+                results = [
+                    await collection.find(
+                        query, sort=sort, skip=skip, limit=limit
+                    ).to_list(None)
+                    for collection in (indexed, plain)
+                ]
+                assert results[0] == results[1], (query, sort, skip, limit)
+
+
+@pytest.mark.anyio
+async def test_multikey_index(filter_calls):
+    indexed, plain = await make_collections(
+        [{'_id': i, 'tags': [f't{i % 7}', f't{i % 5}'], 'n': i} for i in range(100)],
+        'tags',
+    )
+
+    filter_calls.clear()
+    found = await indexed.find({'tags': 't3', 'n': {'$gt': 50}}).to_list(None)
+    assert len(filter_calls) < 100
+    assert found == await plain.find({'tags': 't3', 'n': {'$gt': 50}}).to_list(None)
+
+    # arrays are sorted by their first element, which index doesn't know
+    for collection in (indexed, plain):
+        await collection.update_many({}, {'$set': {'n': 0}})
+    results = [
+        await collection.find().sort('tags', -1).limit(10).to_list(None)
+        for collection in (indexed, plain)
+    ]
+    assert results[0] == results[1]
+
+
+@pytest.mark.anyio
+async def test_index_matches_values_like_scan():
+    rng = random.Random(2)
+    values = [
+        *(True, False, 0, 1, 1.0, 2, None, 'a', [1, True]),
+        *({'x': 1}, {'x': True}, {'x': 1, 'y': 2}, {'y': 2, 'x': 1}),
+    ]
+    documents = []
+    for i in range(100):
+        document = {'_id': i}
+        for field in ('a', 'b'):
+            if rng.random() < 0.9:
+                document[field] = rng.choice(values)
+        documents.append(document)
+
+    queries = [
+        {'a': 1},
+        {'a': True},
+        {'a': False},
+        {'a': 0.0},
+        {'a': {'$in': [True, 2]}},
+        {'a': {'x': 1}},
+        {'a': {'x': 1, 'y': 2}},
+        {'a': {'$in': [{'y': 2, 'x': 1}]}},
+        {'a': [True, 1]},
+        {'a': 1, 'b': True},
+        {'a': {'$gte': 1}},
+        {'a': {'$lte': True}},
+    ]
+    specs = ['a', [('a', 1), ('b', 1)]]
+
+    for query in queries:
+        indexed, plain = await make_collections(documents, *specs)
+
+        results = []
+        for collection in (indexed, plain):
+            results.append(
+                [
+                    await collection.find(query).to_list(None),
+                    await collection.find(query).sort('a', -1).to_list(None),
+                    await collection.count_documents(query),
+                    await collection.find_one(query),
+                    await collection.distinct('a', query),
+                ]
+            )
+        assert results[0] == results[1], query
+
+        for collection in (indexed, plain):
+            await collection.update_one(query, {'$set': {'u': 1}})
+            await collection.update_many(query, {'$inc': {'m': 1}})
+            await collection.delete_one(query)
+            await collection.delete_many({'b': query.get('a', 2)})
+        assert await indexed.find().to_list(None) == await plain.find().to_list(None), (
+            query
+        )
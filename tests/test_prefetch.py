@@ -0,0 +1,89 @@
+import asyncio
+import gc
+
+import pytest
+from mongomock import OperationFailure
+
+from mongomock_motor import AsyncMongoMockClient
+
+DOCUMENTS_COUNT = 95
+
+
+@pytest.fixture
+async def client():
+    client = AsyncMongoMockClient()
+    await client['tests']['test'].insert_many(
+        [{'_id': i, 'n': i} for i in range(DOCUMENTS_COUNT)]
+    )
+    return client
+
+
+@pytest.mark.anyio
+async def test_batches_are_produced_while_consumer_awaits(client, filter_calls):
+    collection = client['tests']['test']
+    cursor = collection.find({'n': {'$gte': 0}}).batch_size(10).prefetch(2)  # type: ignore
+
+    filter_calls.clear()
+    assert (await cursor.next())['_id'] == 0
+    assert len(filter_calls) == 10
+    await asyncio.sleep(0.01)
+    # current batch and two batches ahead of it
+    assert len(filter_calls) == 30
+
+    found = [0]
+    async for document in cursor:
+        found.append(document['_id'])
+        await asyncio.sleep(0)
+    assert found == list(range(DOCUMENTS_COUNT))
+    assert not cursor.alive
+    assert client.cursor_manager.open_cursors == 0
+
+
+@pytest.mark.anyio
+async def test_prefetching_command_cursors(client):
+    collection = client['tests']['test']
+    pipeline = [{'$match': {'n': {'$lt': 50}}}, {'$project': {'_id': 0}}]
+
+    cursor = collection.aggregate(pipeline).batch_size(7).prefetch()  # type: ignore
+    assert (await cursor.next()) == {'n': 0}
+    assert await cursor.to_list(None) == [{'n': n} for n in range(1, 50)]
+
+    cursor = collection.list_indexes().prefetch()  # type: ignore
+    assert [index['name'] async for index in cursor] == ['_id_']
+
+
+@pytest.mark.anyio
+async def test_closing_and_errors(client):
+    collection = client['tests']['test']
+
+    cursor = collection.find().batch_size(10).prefetch()  # type: ignore
+    await cursor.next()
+    await asyncio.sleep(0.01)
+    assert client.cursor_manager.open_cursors == 1
+    await cursor.close()
+    assert client.cursor_manager.open_cursors == 0
+    with pytest.raises(StopAsyncIteration):
+        await cursor.next()
+
+    cursor = collection.find({'n': {'$unknown': 1}}).prefetch()  # type: ignore
+    with pytest.raises(OperationFailure):
+        await cursor.to_list(None)
+
+
+@pytest.mark.anyio
+async def test_abandoned_cursor_leaves_no_pending_tasks(client):
+    collection = client['tests']['test']
+    tasks = asyncio.all_tasks()
+
+    cursor = collection.find().batch_size(10).prefetch(1)  # type: ignore
+    await cursor.next()
+    await asyncio.sleep(0.01)
+    assert asyncio.all_tasks() - tasks
+
+    del cursor
+    gc.collect()
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+    assert not asyncio.all_tasks() - tasks
+    assert client.cursor_manager.open_cursors == 0
@@ -0,0 +1,45 @@
+import pytest
+
+from mongomock_motor import AsyncMongoMockClient
+
+DOCUMENTS_COUNT = 100
+
+
+@pytest.mark.anyio
+async def test_skip_and_limit_stop_scanning(filter_calls):
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.insert_many([{'i': i} for i in range(DOCUMENTS_COUNT)])
+
+    filter_calls.clear()
+    docs = await collection.find({'i': {'$gte': 10}}).skip(5).limit(3).to_list(None)
+
+    assert [doc['i'] for doc in docs] == [15, 16, 17]
+    assert len(filter_calls) == 18
+
+
+@pytest.mark.anyio
+async def test_find_one_stops_on_first_match(filter_calls):
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.insert_many([{'i': i} for i in range(DOCUMENTS_COUNT)])
+
+    filter_calls.clear()
+    doc = await collection.find_one({'i': {'$gte': 3}}, projection={'_id': 0})
+
+    assert doc == {'i': 3}
+    assert len(filter_calls) == 4
+
+    assert await collection.find_one({'i': -1}) is None
+    assert (await collection.find_one(sort=[('i', -1)]))['i'] == DOCUMENTS_COUNT - 1
+
+
+@pytest.mark.anyio
+async def test_limited_cursor_is_not_alive_after_exhaustion():
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.insert_many([{'i': i} for i in range(DOCUMENTS_COUNT)])
+
+    cursor = collection.find().limit(2)
+    assert cursor.alive
+
+    await cursor.next()
+    await cursor.next()
+    assert not cursor.alive
@@ -0,0 +1,114 @@
+import asyncio
+import io
+import uuid
+
+import pytest
+from pymongo import IndexModel
+from pymongo.errors import DuplicateKeyError
+
+from mongomock_motor import AsyncMongoMockClient, AsyncMongoMockCollection
+from mongomock_motor.recording import Recorder, Replayer, read_records
+
+
+async def workload(client: AsyncMongoMockClient) -> None:
+    collection = client['tests']['test']
+    await collection.create_indexes([IndexModel('key', unique=True)])
+
+    async def writer(offset: int) -> None:
+        for i in range(offset, offset + 20):
+            await collection.insert_one({'key': i, 'group': i % 3})
+            await asyncio.sleep(0.001)
+        with pytest.raises(DuplicateKeyError):
+            await collection.insert_one({'key': offset})
+
+    await asyncio.gather(writer(0), writer(100))
+    await collection.update_many({'group': 1}, {'$inc': {'key': 1000}})
+    async for _ in collection.find({'group': 0}).sort('key', -1).limit(5):
+        pass
+    await collection.aggregate([{'$group': {'_id': '$group'}}]).to_list(None)
+    await client['tests'].drop_collection('other')
+
+
+async def dump(collection: AsyncMongoMockCollection):
+    return await collection.find({}, {'_id': 0}).sort('key').to_list(None)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize('format', ['json', 'bson'])
+async def test_record_and_replay(format):
+    file = io.BytesIO() if format == 'bson' else io.StringIO()
+    client = AsyncMongoMockClient()
+    with Recorder(file, format=format):
+        await workload(client)
+    # nothing is recorded once recording is stopped
+    size = file.tell()
+    await client['tests']['test'].find_one()
+    assert file.tell() == size
+
+    file.seek(0)
+    records = list(read_records(file, format=format))
+    assert len({record['task'] for record in records}) == 3
+    cursor_operations = [
+        record['op'] for record in records if record.get('cursor') == 1
+    ]
+    assert cursor_operations == ['find', 'sort', 'limit'] + ['next'] * 6
+    assert sum(record.get('error') == 'DuplicateKeyError' for record in records) == 2
+
+    report = await Replayer(records, speed=None).run()
+    assert sum(report.errors.values()) == 0
+    assert len(report.latencies['insert_one']) == 42
+    assert len(report.latencies['next']) == 6  # including StopAsyncIteration
+    assert set(report.percentiles('insert_one')) == {50, 90, 99}
+    assert 'insert_one' in report.format()
+
+
+@pytest.mark.anyio
+async def test_replay_speed():
+    file = io.StringIO()
+    client = AsyncMongoMockClient()
+    with Recorder(file):
+        await workload(client)
+    file.seek(0)
+    records = list(read_records(file))
+
+    replayed = AsyncMongoMockClient()
+    report = await Replayer(records, replayed, speed=2.0).run()
+    duration = records[-1]['start']
+    assert duration / 2 <= report.elapsed < duration
+    assert await dump(replayed['tests']['test']) == await dump(client['tests']['test'])
+
+    fast = await Replayer(records, speed=None).run()
+    assert fast.elapsed < report.elapsed
+
+
+@pytest.mark.anyio
+async def test_operations_with_unencodable_arguments():
+    file = io.StringIO()
+    client = AsyncMongoMockClient()
+    collection = client['tests']['test']
+    await collection.insert_one({'key': 1})
+    with Recorder(file), pytest.warns(RuntimeWarning):
+        await collection.find({'_id': uuid.uuid4()}).sort('key').to_list(None)
+        await collection.count_documents({'_id': uuid.uuid4()})
+    file.seek(0)
+    records = list(read_records(file))
+
+    assert [(record['op'], record.get('skipped', False)) for record in records] == [
+        ('find', True),
+        ('sort', False),
+        ('to_list', False),
+        ('count_documents', True),
+    ]
+    report = await Replayer(records, speed=None).run()
+    assert sum(report.errors.values()) == 0
+
+
+class UnwritableFile(io.StringIO):
+    def write(self, data):
+        raise OSError('disk is full')
+
+
+@pytest.mark.anyio
+async def test_write_errors_are_raised():
+    with Recorder(UnwritableFile()), pytest.raises(OSError):
+        await AsyncMongoMockClient()['tests']['test'].find_one()
@@ -0,0 +1,129 @@
+import bson
+import pytest
+from mongomock import OperationFailure
+from pymongo import DeleteOne, InsertOne, UpdateOne
+
+from mongomock_motor import AsyncMongoMockClient
+
+DOCUMENTS = [{'_id': i, 'tags': ['a', 'b'], 'n': i} for i in range(10)]
+
+
+@pytest.fixture
+async def client():
+    client = AsyncMongoMockClient(mock_server_stats=True)
+    collection = client['tests']['test']
+    await collection.insert_many(DOCUMENTS)
+    await collection.create_index('tags')
+    await collection.create_index('n', partialFilterExpression={'n': {'$gte': 5}})
+    return client
+
+
+@pytest.mark.anyio
+async def test_coll_stats(client):
+    database = client['tests']
+    size = sum(len(bson.encode(document)) for document in DOCUMENTS)
+
+    stats = await database.command('collStats', 'test')
+    assert stats['ns'] == 'tests.test'
+    assert stats['count'] == 10
+    assert stats['size'] == size
+    assert stats['avgObjSize'] == size // 10
+    assert stats['nindexes'] == 3
+    assert set(stats['indexSizes']) == {'_id_', 'tags_1', 'n_1'}
+    # multikey index has key per tag, partial one only covers half of documents
+    assert stats['indexSizes']['tags_1'] > stats['indexSizes']['_id_']
+    assert stats['indexSizes']['n_1'] < stats['indexSizes']['_id_']
+    assert stats['totalSize'] == size + stats['totalIndexSize']
+
+    scaled = await database.command({'collStats': 'test', 'scale': 1024})
+    assert scaled['size'] == size // 1024
+    assert scaled['scaleFactor'] == 1024
+    with pytest.raises(OperationFailure):
+        await database.command({'collStats': 'test', 'scale': 0})
+
+    missing = await database.command({'collStats': 'missing'})
+    assert (missing['count'], missing['size'], missing['nindexes']) == (0, 0, 0)
+
+    await database.create_collection('capped', capped=True, size=4096, max=5)
+    capped = await database.command({'collStats': 'capped'})
+    assert (capped['capped'], capped['maxSize'], capped['max']) == (True, 4096, 5)
+
+
+@pytest.mark.anyio
+async def test_db_stats(client):
+    database = client['tests']
+    await database['other'].insert_one({'_id': 'x'})
+    collection_stats = await database.command('collStats', 'test')
+
+    stats = await database.command('dbStats')
+    assert stats['db'] == 'tests'
+    assert stats['collections'] == 2
+    assert stats['objects'] == 11
+    assert stats['indexes'] == 4
+    other_size = len(bson.encode({'_id': 'x'}))
+    assert stats['dataSize'] == collection_stats['size'] + other_size
+    assert stats['indexSize'] > collection_stats['totalIndexSize']
+
+
+@pytest.mark.anyio
+async def test_server_status_counters(client):
+    database = client['tests']
+    collection = database['test']
+    before = (await database.command('serverStatus'))['opcounters']
+
+    await collection.insert_many([{'n': n} for n in range(3)])
+    await collection.update_many({}, {'$inc': {'n': 1}})
+    await collection.delete_one({'n': 1})
+    await collection.find_one()
+    await collection.find().batch_size(2).to_list(None)
+    await collection.count_documents({})
+    await collection.bulk_write([InsertOne({}), UpdateOne({}, {'$set': {'n': 0}})])
+    await collection.bulk_write([DeleteOne({})])
+
+    status = await database.command({'serverStatus': 1})
+    counters = status['opcounters']
+    assert counters['insert'] - before['insert'] == 4
+    assert counters['update'] - before['update'] == 2
+    assert counters['delete'] - before['delete'] == 2
+    assert counters['query'] - before['query'] == 2
+    assert counters['getmore'] - before['getmore'] == 6
+    # count_documents and serverStatus itself, bulk writes are counted per request
+    assert counters['command'] - before['command'] == 2
+
+    assert status['connections']['current'] == 1
+    assert status['mem']['bits'] == 64
+    assert status['mem']['resident'] > 0
+    assert status['uptimeMillis'] >= 0
+    assert status['version'] == '5.0.5'
+
+
+@pytest.mark.anyio
+async def test_coll_stats_stage(client):
+    collection = client['tests']['test']
+    await collection.find_one({'_id': 1})
+
+    pipeline = [
+        {'$collStats': {'latencyStats': {}, 'storageStats': {}, 'count': {}}},
+        {'$project': {'latencyStats': 1, 'count': 1, 'size': '$storageStats.size'}},
+    ]
+    (stats,) = await collection.aggregate(pipeline).to_list(None)
+    assert stats['count'] == 10
+    assert stats['size'] == sum(len(bson.encode(document)) for document in DOCUMENTS)
+    # insert_many and find_one, indexes creation
+    assert stats['latencyStats']['writes']['ops'] == 1
+    assert stats['latencyStats']['reads']['ops'] == 1
+    assert stats['latencyStats']['commands']['ops'] == 2
+    assert stats['latencyStats']['reads']['latency'] > 0
+
+
+@pytest.mark.anyio
+async def test_operations_are_not_counted_by_default():
+    client = AsyncMongoMockClient()
+    database = client['tests']
+    await database['test'].insert_many([{} for _ in range(5)])
+    await database['test'].find_one()
+    await database['test'].find().batch_size(2).to_list(None)
+    await database.command('ping')
+
+    status = await database.command('serverStatus')
+    assert set(status['opcounters'].values()) == {0}
@@ -0,0 +1,148 @@
+import pytest
+from mongomock import OperationFailure
+
+from mongomock_motor import AsyncMongoMockClient
+from mongomock_motor.text import english_stem
+
+
+@pytest.fixture
+async def articles():
+    collection = AsyncMongoMockClient()['tests']['articles']
+    await collection.insert_many(
+        [
+            {'_id': 1, 'title': 'Running shoes', 'body': 'Shoes for runners'},
+            {'_id': 2, 'title': 'Coffee shop', 'body': 'Best café in town'},
+            {'_id': 3, 'title': 'The coffee', 'body': 'coffee coffee coffee'},
+            {'_id': 4, 'title': 'Tea', 'body': 'Not a Coffee drink'},
+            {'_id': 5, 'title': 'Un café', 'language': 'none'},
+        ]
+    )
+    await collection.create_index(
+        [('title', 'text'), ('body', 'text')],
+        weights={'title': 10},
+    )
+    return collection
+
+
+def test_english_stem():
+    assert {english_stem(word) for word in ['run', 'runs', 'running']} == {'run'}
+    assert english_stem('bakes') == english_stem('baking') == 'bake'
+    assert english_stem('ponies') == 'poni'
+
+
+@pytest.mark.anyio
+async def test_text_search(articles):
+    async def search(text, **kwargs):
+        cursor = articles.find({'$text': {'$search': text, **kwargs}})
+        return sorted(doc['_id'] for doc in await cursor.to_list(None))
+
+    assert await search('run') == [1]
+    assert await search('COFFEE') == [2, 3, 4]
+    assert await search('cafe') == [2, 5]
+    assert await search('coffee -drink') == [2, 3]
+    assert await search('"coffee shop"') == [2]
+    assert await search('"drink coffee"') == []
+    assert await search('Coffee', **{'$caseSensitive': True}) == [2, 4]
+    assert await search('café', **{'$diacriticSensitive': True}) == [2, 5]
+    assert await search('the') == []
+
+    assert await articles.count_documents({'$text': {'$search': 'coffee'}}) == 3
+    assert (
+        await articles.count_documents(
+            {'$text': {'$search': 'coffee'}, '_id': {'$gt': 2}}
+        )
+        == 2
+    )
+
+    await articles.update_one({'_id': 1}, {'$set': {'body': 'Coffee to go'}})
+    await articles.delete_one({'_id': 3})
+    assert await search('coffee') == [1, 2, 4]
+    assert await search('runner') == []
+
+    pipeline = [{'$match': {'$text': {'$search': 'tea'}}}, {'$project': {'_id': 1}}]
+    assert await articles.aggregate(pipeline).to_list(None) == [{'_id': 4}]
+
+
+@pytest.mark.anyio
+async def test_text_score(articles):
+    cursor = articles.find(
+        {'$text': {'$search': 'coffee'}},
+        {'score': {'$meta': 'textScore'}, 'title': 1},
+        sort=[('score', {'$meta': 'textScore'})],
+    )
+    docs = await cursor.to_list(None)
+
+    # title is weighted higher and repeated occurrences add to the score
+    assert [doc['_id'] for doc in docs] == [3, 2, 4]
+    assert docs[2] == {'_id': 4, 'title': 'Tea', 'score': pytest.approx(0.75)}
+    assert docs[0]['score'] > docs[1]['score'] > docs[2]['score']
+
+    doc = await articles.find_one(
+        {'$text': {'$search': 'tea'}}, {'score': {'$meta': 'textScore'}}
+    )
+    assert doc is not None and doc['score'] == pytest.approx(10.0)
+
+
+@pytest.mark.anyio
+async def test_text_search_errors(articles):
+    with pytest.raises(OperationFailure) as exc_info:
+        await articles.create_index([('other', 'text')])
+    assert exc_info.value.code == 85
+
+    other = articles.database['other']
+    await other.insert_one({'title': 'coffee'})
+    with pytest.raises(OperationFailure) as exc_info:
+        await other.find_one({'$text': {'$search': 'coffee'}})
+    assert exc_info.value.code == 27
+
+    with pytest.raises(OperationFailure):
+        await articles.find_one({'$text': {'$search': 'coffee', '$language': 'xx'}})
+
+
+@pytest.mark.anyio
+async def test_text_search_in_and(articles):
+    docs = await articles.find(
+        {'$and': [{'$text': {'$search': 'coffee'}}, {'_id': {'$gt': 2}}]},
+        {'score': {'$meta': 'textScore'}},
+    ).to_list(None)
+    assert sorted(doc['_id'] for doc in docs) == [3, 4]
+    assert all(doc['score'] > 0 for doc in docs)
+
+    count = await articles.count_documents(
+        {'$and': [{'$text': {'$search': 'coffee'}, '_id': 4}]}
+    )
+    assert count == 1
+
+    with pytest.raises(OperationFailure) as exc_info:
+        await articles.find_one(
+            {
+                '$text': {'$search': 'tea'},
+                '$and': [{'$text': {'$search': 'coffee'}}],
+            }
+        )
+    assert exc_info.value.code == 2
+
+
+@pytest.mark.anyio
+async def test_text_search_in_or(articles):
+    query = {'$or': [{'$text': {'$search': 'run'}}, {'_id': 3}]}
+    assert [doc['_id'] async for doc in articles.find(query)] == [1, 3]
+    assert await articles.count_documents(query) == 2
+
+    docs = await articles.find(
+        {**query, 'title': {'$ne': 'The coffee'}},
+        {'score': {'$meta': 'textScore'}},
+    ).to_list(None)
+    assert [doc['_id'] for doc in docs] == [1]
+
+    docs = await articles.find(
+        query,
+        {'score': {'$meta': 'textScore'}},
+        sort=[('score', {'$meta': 'textScore'})],
+    ).to_list(None)
+    assert [doc['_id'] for doc in docs] == [1, 3]
+    assert docs[0]['score'] > docs[1]['score'] == 0
+
+    with pytest.raises(OperationFailure) as exc_info:
+        await articles.find_one({'$text': {'$search': 'tea'}, **query})
+    assert exc_info.value.code == 2
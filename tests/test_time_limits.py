@@ -0,0 +1,76 @@
+import time
+
+import mongomock.collection
+import mongomock.filtering
+import pytest
+from pymongo.errors import ExecutionTimeout
+
+from mongomock_motor import AsyncMongoMockClient, time_limits
+
+DOCUMENTS_COUNT = 200
+
+
+@pytest.fixture
+async def slow_collection(monkeypatch):
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.insert_many([{'i': i} for i in range(DOCUMENTS_COUNT)])
+
+    original = mongomock.collection.filter_applies
+
+    def slow_filter_applies(*args, **kwargs):
+        time.sleep(0.001)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection, 'filter_applies', slow_filter_applies)
+    monkeypatch.setattr(mongomock.filtering, 'filter_applies', slow_filter_applies)
+    monkeypatch.setattr(time_limits, 'CHECK_INTERVAL', 10)
+    return collection
+
+
+@pytest.mark.anyio
+async def test_cursor_time_limit(slow_collection):
+    with pytest.raises(ExecutionTimeout):
+        await slow_collection.find().max_time_ms(20).to_list(None)
+
+    with pytest.raises(ExecutionTimeout):
+        await slow_collection.find({}, max_time_ms=20).sort('i', -1).to_list(None)
+
+    with pytest.raises(ExecutionTimeout):
+        await slow_collection.find_one({'i': -1}, max_time_ms=20)
+
+    docs = await slow_collection.find().max_time_ms(10000).to_list(None)
+    assert len(docs) == DOCUMENTS_COUNT
+
+
+@pytest.mark.anyio
+async def test_cursor_time_between_batches_is_not_counted(slow_collection):
+    cursor = slow_collection.find().batch_size(5).max_time_ms(50)
+
+    for _ in range(20):
+        await cursor.next()
+        time.sleep(0.005)
+
+    assert cursor.alive
+
+
+@pytest.mark.anyio
+async def test_operations_time_limit(slow_collection):
+    with pytest.raises(ExecutionTimeout):
+        await slow_collection.update_many({}, {'$set': {'a': 1}}, maxTimeMS=20)
+
+    with pytest.raises(ExecutionTimeout):
+        await slow_collection.delete_many({'i': {'$gte': 0}}, max_time_ms=20)
+
+    with pytest.raises(ExecutionTimeout):
+        await slow_collection.aggregate(
+            [{'$match': {'i': {'$gte': 0}}}], maxTimeMS=20
+        ).to_list(None)
+
+    with pytest.raises(ExecutionTimeout):
+        await slow_collection.count_documents({'i': {'$gte': 0}}, maxTimeMS=20)
+
+    # like multi-document writes of server, timed out update isn't rolled back
+    assert await slow_collection.count_documents({'a': 1}) > 0
+
+    result = await slow_collection.update_many({}, {'$set': {'a': 2}}, maxTimeMS=10000)
+    assert result.modified_count == DOCUMENTS_COUNT
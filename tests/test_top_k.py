@@ -0,0 +1,77 @@
+import random
+
+import pymongo
+import pytest
+
+from mongomock_motor import AsyncMongoMockClient
+
+SORT = [('a', pymongo.ASCENDING), ('b', pymongo.DESCENDING)]
+
+
+async def _prepare_documents(collection):
+    rng = random.Random(42)
+    documents = []
+    for i in range(200):
+        document = {'i': i, 'a': rng.randint(0, 5)}
+        if i % 7:
+            document['b'] = rng.choice([1, 2.5, 'x', None, [3, 1]])
+        documents.append(document)
+    await collection.insert_many(documents)
+
+
+@pytest.mark.anyio
+async def test_sort_and_limit_match_full_sort():
+    collection = AsyncMongoMockClient()['tests']['test']
+    await _prepare_documents(collection)
+
+    expected = await collection.find(sort=SORT, projection={'_id': 0}).to_list(None)
+
+    for skip, limit in [(0, 1), (0, 10), (5, 10), (190, 20), (0, 500)]:
+        docs = await (
+            collection.find(projection={'_id': 0})
+            .sort(SORT)
+            .skip(skip)
+            .limit(limit)
+            .to_list(None)
+        )
+        assert docs == expected[skip : skip + limit]
+
+
+@pytest.mark.anyio
+async def test_sort_and_limit_with_next_and_clone():
+    collection = AsyncMongoMockClient()['tests']['test']
+    await _prepare_documents(collection)
+
+    cursor = collection.find({'a': {'$gt': 2}}).sort('i', -1).limit(3)
+    docs = [(await cursor.next())['i'] for _ in range(3)]
+    with pytest.raises(StopAsyncIteration):
+        await cursor.next()
+
+    expected = await collection.find({'a': {'$gt': 2}}, sort=[('i', -1)]).to_list(None)
+    assert docs == [doc['i'] for doc in expected[:3]]
+    assert [doc['i'] for doc in await cursor.clone().to_list(None)] == docs
+
+
+@pytest.mark.anyio
+async def test_sort_and_limit_in_pipeline():
+    collection = AsyncMongoMockClient()['tests']['test']
+    await _prepare_documents(collection)
+
+    expected = await collection.aggregate(
+        [{'$sort': {'a': 1, 'b': -1}}, {'$project': {'_id': 0}}]
+    ).to_list(None)
+
+    docs = await collection.aggregate(
+        [
+            {'$sort': {'a': 1, 'b': -1}},
+            {'$skip': 3},
+            {'$limit': 5},
+            {'$project': {'_id': 0}},
+        ]
+    ).to_list(None)
+    assert docs == expected[3:8]
+
+    docs = await collection.aggregate(
+        [{'$sort': {'a': 1, 'b': -1}}, {'$limit': 4}, {'$project': {'_id': 0}}]
+    ).to_list(None)
+    assert docs == expected[:4]
@@ -0,0 +1,74 @@
+import asyncio
+import datetime
+
+import mongomock
+import pytest
+
+from mongomock_motor import AsyncMongoMockClient, indexes
+
+NOW = datetime.datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [NOW]
+    monkeypatch.setattr(mongomock, 'utcnow', lambda: now[0])
+    return now
+
+
+@pytest.mark.anyio
+async def test_expiry_on_access(clock, monkeypatch):
+    collection = AsyncMongoMockClient()['tests']['test']
+    await collection.create_index('created_at', expireAfterSeconds=60)
+    await collection.insert_many(
+        [
+            {'i': i, 'created_at': NOW + datetime.timedelta(seconds=i)}
+            for i in range(100)
+        ]
+        + [{'i': 100}, {'i': 101, 'created_at': 'not a date'}]
+    )
+    assert await collection.count_documents({}) == 102
+
+    # expired documents are taken from the heap, collection isn't rescanned
+    calls = []
+    original = indexes.get_expire_at
+    monkeypatch.setattr(
+        indexes,
+        'get_expire_at',
+        lambda *args: calls.append(args) or original(*args),
+    )
+
+    clock[0] = NOW + datetime.timedelta(seconds=60 + 49)
+    assert await collection.count_documents({}) == 52
+    assert (await collection.find_one(sort=[('i', 1)]))['i'] == 50
+    assert calls == []
+
+    await collection.update_one({'i': 50}, {'$set': {'created_at': clock[0]}})
+    await collection.update_one({'i': 100}, {'$set': {'created_at': NOW}})
+    clock[0] += datetime.timedelta(seconds=1)
+    assert [doc['i'] for doc in await collection.find().to_list(None)] == [
+        *range(50, 100),
+        101,
+    ]
+    assert await collection.count_documents({'i': {'$in': [50, 51, 100]}}) == 2
+
+
+@pytest.mark.anyio
+async def test_monitor_removes_documents_in_background(clock):
+    client = AsyncMongoMockClient()
+    client.ttl_monitor.interval = 0.01
+    collection = client['tests']['test']
+    await collection.insert_many([{'created_at': NOW} for _ in range(10)])
+    await collection.create_index('created_at', expireAfterSeconds=0)
+    assert client.ttl_monitor.is_running
+
+    store = collection._store
+    clock[0] = NOW + datetime.timedelta(seconds=1)
+    for _ in range(100):
+        if not store._documents:
+            break
+        await asyncio.sleep(0.01)
+
+    assert not store._documents
+    client.ttl_monitor.stop()
+    assert not client.ttl_monitor.is_running
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+from mongomock_motor import AsyncMongoMockClient
+from mongomock_motor.wire import OP_COMPRESSED, WireProtocolServer
+
+
+@pytest.fixture
+async def server():
+    async with WireProtocolServer(AsyncMongoMockClient()) as server:
+        yield server
+
+
+@pytest.fixture
+def op_codes(server, monkeypatch):
+    op_codes = []
+    handle_message = server._handle_message
+
+    async def recording_handle_message(op_code, *args):
+        op_codes.append(op_code)
+        return await handle_message(op_code, *args)
+
+    monkeypatch.setattr(server, '_handle_message', recording_handle_message)
+    return op_codes
+
+
+@pytest.fixture
+async def driver(server):
+    host, port = server.address
+    client = AsyncIOMotorClient(
+        f'mongodb://{host}:{port}/?directConnection=true',
+        compressors='zlib',
+        maxPoolSize=4,
+    )
+    yield client
+    # closing sends "endSessions" synchronously, so loop can't be blocked
+    await asyncio.get_running_loop().run_in_executor(None, client.close)
+
+
+@pytest.mark.anyio
+async def test_real_driver_crud(server, driver, op_codes):
+    collection = driver['tests']['test']
+    assert (await driver.admin.command('ping'))['ok'] == 1.0
+    assert (await driver.server_info())['version'] == '5.0.5'
+
+    await collection.insert_many([{'_id': i, 'n': i % 10} for i in range(1000)])
+    # same storage is seen by mock client
+    assert await server.client['tests']['test'].count_documents({}) == 1000
+
+    # documents are fetched with several "getMore"
+    found = await collection.find({'n': 3}).sort('_id', -1).to_list(None)
+    assert [doc['_id'] for doc in found] == list(range(993, -1, -10))
+    assert len(await collection.find().batch_size(7).to_list(None)) == 1000
+    assert await collection.find_one({'_id': 5}, {'_id': 0}) == {'n': 5}
+    assert await collection.count_documents({'n': {'$lt': 2}}) == 200
+
+    cursor = collection.find().batch_size(2)
+    assert (await cursor.next())['_id'] == 0
+    await cursor.close()
+    assert server.client.cursor_manager.open_cursors == 0
+
+    result = await collection.update_many({'n': 1}, {'$inc': {'n': 100}})
+    assert (result.matched_count, result.modified_count) == (100, 100)
+    result = await collection.update_one({'_id': 'x'}, {'$set': {'n': 1}}, upsert=True)
+    assert result.upserted_id == 'x'
+    document = await collection.find_one_and_update(
+        {'_id': 'x'}, [{'$set': {'m': '$n'}}], return_document=ReturnDocument.AFTER
+    )
+    assert document == {'_id': 'x', 'n': 1, 'm': 1}
+    await collection.replace_one({'_id': 'x'}, {'replaced': True})
+    assert await collection.find_one({'_id': 'x'}) == {'_id': 'x', 'replaced': True}
+
+    assert (await collection.delete_many({'n': {'$gte': 100}})).deleted_count == 100
+    assert (await collection.delete_one({'n': 0})).deleted_count == 1
+
+    pipeline = [{'$group': {'_id': '$n', 'count': {'$sum': 1}}}, {'$sort': {'_id': 1}}]
+    groups = await collection.aggregate(pipeline).to_list(None)
+    assert groups[:2] == [{'_id': None, 'count': 1}, {'_id': 0, 'count': 99}]
+
+    # pool has several connections in use at once
+    await asyncio.gather(*(collection.find_one({'_id': i}) for i in range(20)))
+    assert OP_COMPRESSED in op_codes
+
+
+@pytest.mark.anyio
+async def test_real_driver_errors(driver):
+    collection = driver['tests']['test']
+    await collection.create_index('a', unique=True)
+    await collection.insert_one({'_id': 1, 'a': 1})
+
+    with pytest.raises(DuplicateKeyError) as exc_info:
+        await collection.insert_one({'a': 1})
+    assert exc_info.value.details['keyValue'] == {'a': 1}
+
+    with pytest.raises(BulkWriteError) as bulk_exc_info:
+        await collection.insert_many(
+            [{'a': 2}, {'a': 1}, {'a': 3}],
+            ordered=False,
+        )
+    details = bulk_exc_info.value.details
+    assert details['nInserted'] == 2
+    assert [error['index'] for error in details['writeErrors']] == [1]
+
+    with pytest.raises(OperationFailure) as failure_info:
+        await collection.database.command('noSuchCommand')
+    assert failure_info.value.code == 59
+
+    await collection.drop()
+    assert await collection.count_documents({}) == 0